@@ -11,9 +11,81 @@ class Settings(BaseSettings):
     DB_PORT: str
     DB_NAME: str
     TEST_DB_URL: str | None = None
+    DATABASE_URL: str | None = None  # полный URL вместо DB_*, например sqlite+aiosqlite:///load.db для нагрузочного теста
+
+    # Пул соединений на процесс: всего соединений до воркеров * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # секунд ожидания свободного соединения
+    DB_POOL_RECYCLE: int = 1800  # пересоздавать соединения старше, секунд; -1 — никогда
+    DB_POOL_PRE_PING: bool = False  # проверять соединение перед выдачей из пула
+    DB_STATEMENT_CACHE_SIZE: int = 100  # кэш подготовленных запросов asyncpg; 0 — за pgbouncer в режиме transaction
     BASE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+    # Пул процессов анализа видео
+    ANALYSIS_WORKERS: int | None = None  # None — по числу ядер
+    ANALYSIS_QUEUE_SIZE: int = 16
+    ANALYSIS_SHUTDOWN_TIMEOUT: float = 30.0
+    JOB_QUEUE_SIZE: int = 256  # асинхронные задачи, ожидающие пул анализа
+    ANALYSIS_SEGMENTS: int = 0  # отрезков на одно длинное видео: 0 — по числу воркеров, 1 — не делить
+    ANALYSIS_SEGMENT_MIN_FRAMES: int = 300  # минимум выбранных кадров в отрезке
+    ANALYSIS_TIMING_SAMPLE_RATE: float = 0.0  # доля анализов с покадровым замером стадий; 0 — только ?debug=true
+    ANALYSIS_PREWARM: bool = True  # запускать процессы пула при старте, в фоне, а не на первом анализе
+
+    # Кэш результатов по содержимому файла
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL: float = 3600.0
+
+    # Приём загрузок
+    UPLOAD_MAX_SIZE: int = 2 * 1024 ** 3
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    BATCH_MAX_FILES: int = 500  # видео в одном запросе /analyze/batch, включая содержимое архивов
+    BATCH_MAX_SIZE: int = 8 * 1024 ** 3  # тело запроса /analyze/batch целиком
+
+    # Отложенная пакетная запись результатов /analyze (write-behind)
+    WRITE_BEHIND: bool = False
+    WRITE_BATCH_SIZE: int = 100  # записей в одном INSERT
+    WRITE_FLUSH_INTERVAL: float = 0.05  # секунд ожидания добора пачки после первой записи
+    WRITE_QUEUE_SIZE: int = 10000
+
+    # Выбор кадров для анализа: fixed_fps, fixed_count или keyframes
+    SAMPLING_STRATEGY: str = "fixed_fps"
+    SAMPLING_FPS: float = 2.0
+    SAMPLING_FRAME_COUNT: int = 100
+    ANALYSIS_WIDTH: int | None = 640  # кадры шире уменьшаются до этой ширины перед анализом
+    MOTION_METRIC: str = "contours"  # оценка области движения: contours, components или blocks
+    MOTION_DETECTOR: str = "frame_diff"  # frame_diff, mog2 или knn; запрос может выбрать другой (?detector=)
+    MOTION_DETECTOR_PARAMS: dict = {}  # параметры детектора MOTION_DETECTOR, JSON; другие детекторы из запроса — по умолчанию
+
+    # Анализ потоков (/streams)
+    STREAM_MAX: int = 32  # одновременно анализируемых потоков в процессе
+    STREAM_SAMPLE_FPS: float = 2.0
+    STREAM_WINDOW: int = 4  # кадров в скользящем окне
+    STREAM_START_RATIO: float = 0.5  # доля кадров окна с движением для начала события
+    STREAM_ANALYSIS_THREADS: int | None = None  # None — по числу ядер
+    # http/https и "file" (локальные пути) — только явно: иначе POST /streams позволяет обращаться к внутренним адресам
+    STREAM_ALLOWED_SCHEMES: list[str] = ["rtsp", "rtsps"]
+    STREAMS_ENABLED: bool = True  # потоки живут в памяти процесса: при нескольких воркерах — отдельный процесс
+
+    # Запуск в продакшене: gunicorn с воркерами uvicorn (gunicorn.conf.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None  # None — по ядрам с учётом квоты CPU контейнера
+    SERVER_MAX_WORKERS: int = 4  # предел автоматического числа воркеров; остальные ядра — пулам анализа
+    SERVER_LOOP: str = "uvloop"  # цикл событий uvicorn: auto, asyncio или uvloop
+    SERVER_HTTP: str = "httptools"  # HTTP-парсер uvicorn: auto, h11 или httptools
+    SERVER_PRELOAD: bool = True  # импортировать приложение до fork: общий код и память воркеров
+    SERVER_TIMEOUT: int = 60  # секунд без ответа воркера до перезапуска
+    SERVER_KEEPALIVE: int = 5
+    PROMETHEUS_MULTIPROC_DIR: str = "/tmp/prometheus_multiproc"  # метрики воркеров для общего /metrics
+
+    # События прогресса и движения (Server-Sent Events)
+    EVENT_BUFFER_SIZE: int = 100  # событий в буфере подписчика; при переполнении вытесняются старые
+
     @property
     def DB_URL(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
     model_config = SettingsConfigDict(env_file=f"{BASE_DIR}/.env", extra="ignore")
@@ -33,9 +105,3 @@ def get_database_url(for_tests: bool = False) -> str:
         if get_settings().TEST_DB_URL:
             return get_settings().TEST_DB_URL
     return get_settings().DB_URL
-
-
-settings = get_settings()
-database_url = settings.DB_URL
-
-print("DB URL =>", settings.DB_URL)
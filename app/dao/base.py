@@ -3,8 +3,10 @@ from uuid import UUID
 
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy import delete as sqlalchemy_delete, func
-from sqlalchemy import update as sqlalchemy_update
+from sqlalchemy import bindparam, cast, column, delete as sqlalchemy_delete, func, insert
+from sqlalchemy import update as sqlalchemy_update, values as sqlalchemy_values
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -12,6 +14,14 @@ from sqlalchemy.future import select
 from app.dao.database import Base
 
 
+def _loggable(values: dict) -> dict:
+    """Значения для лога: двоичные поля (например, таймлайн движения) заменяются их размером"""
+    return {
+        key: f"<{len(value)} байт>" if isinstance(value, (bytes, bytearray, memoryview)) else value
+        for key, value in values.items()
+    }
+
+
 class BaseDAO[T: Base]:
     model: ClassVar[type[T]]
 
@@ -77,7 +87,7 @@ class BaseDAO[T: Base]:
     async def add(cls, session: AsyncSession, values: BaseModel):
         # Добавить одну запись
         values_dict = values.model_dump(exclude_unset=True)
-        logger.info(f"Добавление записи {cls.model.__name__} с параметрами: {values_dict}")
+        logger.info(f"Добавление записи {cls.model.__name__} с параметрами: {_loggable(values_dict)}")
         new_instance = cls.model(**values_dict)
         session.add(new_instance)
         try:
@@ -103,6 +113,30 @@ class BaseDAO[T: Base]:
             raise
         return objs
 
+    @classmethod
+    async def insert_returning_ids(cls, session: AsyncSession, values: list[BaseModel]) -> list:
+        # Добавить несколько записей многострочным INSERT ... RETURNING без загрузки объектов в сессию.
+        # Строки с разным набором заданных полей вставляются отдельными пачками, чтобы
+        # незаданные поля получали значения по умолчанию из базы; id возвращаются в порядке `values`
+        rows = [val.model_dump(exclude_unset=True) for val in values]
+        groups: dict[tuple, list[int]] = {}
+        for position, row in enumerate(rows):
+            groups.setdefault(tuple(sorted(row)), []).append(position)
+
+        ids = [None] * len(rows)
+        try:
+            for positions in groups.values():
+                query = insert(cls.model).returning(cls.model.id, sort_by_parameter_order=True)
+                result = await session.execute(query, [rows[position] for position in positions])
+                for position, row_id in zip(positions, result.scalars().all()):
+                    ids[position] = row_id
+            logger.info(f"Добавлено {len(rows)} записей {cls.model.__name__} за {len(groups)} INSERT.")
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error(f"Ошибка при пакетной вставке записей: {e}")
+            raise
+        return ids
+
     @classmethod
     async def delete_many(cls, session: AsyncSession, filters: BaseModel):
         # Удалить несколько записей
@@ -127,7 +161,7 @@ class BaseDAO[T: Base]:
         filter_dict = filters.model_dump(exclude_unset=True)
         values_dict = values.model_dump(exclude_unset=True)
         logger.info(
-            f"Обновление записей {cls.model.__name__} по фильтру: {filter_dict} с параметрами: {values_dict}"
+            f"Обновление записей {cls.model.__name__} по фильтру: {filter_dict} с параметрами: {_loggable(values_dict)}"
         )
         query = (
             sqlalchemy_update(cls.model)
@@ -180,23 +214,40 @@ class BaseDAO[T: Base]:
             raise
 
     @classmethod
-    async def bulk_update(cls, session: AsyncSession, records: List[BaseModel]):
-        logger.info(f"Массовое обновление записей {cls.model.__name__}")
+    async def bulk_update(cls, session: AsyncSession, records: List[BaseModel], chunk_size: int = 1000):
+        # Обновить записи по id пачками: на PostgreSQL — один UPDATE ... FROM (VALUES ...) на пачку,
+        # на остальных базах — executemany. Записи без id пропускаются. Возвращает число обновлённых строк
+        logger.info(f"Массовое обновление {len(records)} записей {cls.model.__name__}")
+        rows = [record.model_dump(exclude_unset=True) for record in records]
+        rows = [row for row in rows if 'id' in row and len(row) > 1]
+        table = cls.model.__table__
+        use_values = session.get_bind().dialect.name == "postgresql"
         try:
             updated_count = 0
-            for record in records:
-                record_dict = record.model_dump(exclude_unset=True)
-                if 'id' not in record_dict:
-                    continue
-
-                update_data = {k: v for k, v in record_dict.items() if k != 'id'}
-                stmt = (
-                    sqlalchemy_update(cls.model)
-                    .filter_by(id=record_dict['id'])
-                    .values(**update_data)
-                )
-                result = await session.execute(stmt)
-                updated_count += result.rowcount
+            for keys, group in _group_by_keys(rows).items():
+                fields = [key for key in keys if key != 'id']
+                for chunk in _chunks(group, _rows_per_statement(chunk_size, len(keys))):
+                    if use_values:
+                        source = sqlalchemy_values(
+                            *[column(key, table.c[key].type) for key in keys], name="source"
+                        ).data([tuple(row[key] for key in keys) for row in chunk])
+                        stmt = (
+                            sqlalchemy_update(table)
+                            .where(table.c.id == source.c.id)
+                            # CAST: столбец VALUES из одних NULL PostgreSQL считает текстовым
+                            .values({field: cast(source.c[field], table.c[field].type) for field in fields})
+                        )
+                        result = await session.execute(stmt)
+                    else:
+                        stmt = (
+                            sqlalchemy_update(table)
+                            .where(table.c.id == bindparam("b_id"))
+                            .values({field: bindparam(f"b_{field}") for field in fields})
+                        )
+                        result = await session.execute(
+                            stmt, [{f"b_{key}": row[key] for key in keys} for row in chunk]
+                        )
+                    updated_count += result.rowcount
 
             logger.info(f"Обновлено {updated_count} записей")
             await session.flush()
@@ -204,3 +255,89 @@ class BaseDAO[T: Base]:
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при массовом обновлении: {e}")
             raise
+
+    @classmethod
+    async def upsert_many(
+            cls,
+            session: AsyncSession,
+            values: List[BaseModel],
+            index_elements: List[str],
+            update_fields: List[str] | None = None,
+            chunk_size: int = 1000,
+            increment_fields: List[str] | None = None,
+    ):
+        # Вставить записи или обновить существующие по уникальному ключу `index_elements`
+        # (INSERT ... ON CONFLICT). Обновляются `update_fields`, по умолчанию — все заданные поля
+        # кроме ключа; пустой список — ON CONFLICT DO NOTHING. Поля `increment_fields` прибавляются
+        # к сохранённым значениям (счётчики). Повторы ключа внутри вызова схлопываются: побеждает
+        # последний, а `increment_fields` суммируются. Возвращает число вставленных и обновлённых строк
+        logger.info(f"Upsert {len(values)} записей {cls.model.__name__} по ключу {index_elements}")
+        dialect = session.get_bind().dialect.name
+        dialect_insert = _UPSERT_INSERTS.get(dialect)
+        if dialect_insert is None:
+            raise ValueError(f"upsert_many не поддерживает диалект {dialect!r}")
+
+        increment_fields = increment_fields or []
+        unique_rows = {}
+        for val in values:
+            row = val.model_dump(exclude_unset=True)
+            key = tuple(row[field] for field in index_elements)
+            previous = unique_rows.get(key)
+            if previous is not None:
+                for field in increment_fields:
+                    row[field] = row.get(field, 0) + previous.get(field, 0)
+            unique_rows[key] = row
+
+        try:
+            affected = 0
+            for keys, group in _group_by_keys(list(unique_rows.values())).items():
+                fields = update_fields if update_fields is not None else [
+                    key for key in keys if key not in index_elements and key not in increment_fields
+                ]
+                increments = [field for field in increment_fields if field in keys]
+                table = cls.model.__table__
+                for chunk in _chunks(group, _rows_per_statement(chunk_size, len(keys))):
+                    stmt = dialect_insert(cls.model).values(chunk)
+                    if fields or increments:
+                        set_ = {field: stmt.excluded[field] for field in fields}
+                        set_.update({field: table.c[field] + stmt.excluded[field] for field in increments})
+                        if "updated_at" in cls.model.__table__.c and "updated_at" not in set_:
+                            set_["updated_at"] = func.now()
+                        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+                    else:
+                        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+                    result = await session.execute(stmt)
+                    affected += result.rowcount
+            logger.info(f"Вставлено или обновлено {affected} записей {cls.model.__name__}.")
+            return affected
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error(f"Ошибка при upsert записей: {e}")
+            raise
+
+
+# INSERT с поддержкой ON CONFLICT для диалектов, в которых работает upsert_many
+_UPSERT_INSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+# Предел числа параметров в одном запросе PostgreSQL
+_MAX_STATEMENT_PARAMS = 32767
+
+
+def _group_by_keys(rows: list[dict]) -> dict[tuple, list[dict]]:
+    """Группирует строки по набору заданных полей: в одном запросе у всех строк должны быть одни столбцы"""
+    groups: dict[tuple, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
+
+def _rows_per_statement(chunk_size: int, columns: int) -> int:
+    return max(1, min(chunk_size, _MAX_STATEMENT_PARAMS // max(1, columns)))
+
+
+def _chunks(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
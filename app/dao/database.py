@@ -1,14 +1,59 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import Annotated, Any
 from sqlalchemy import func, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, declared_attr
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession
-from app.config import database_url
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
+from app.config import Settings, get_settings
+from app.dao.pool import InstrumentedAsyncQueuePool
 
 
+def create_engine_from_settings(url: str, config: Settings) -> AsyncEngine:
+    """Движок с пулом соединений из настроек"""
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args["prepared_statement_cache_size"] = config.DB_STATEMENT_CACHE_SIZE
+    return create_async_engine(
+        url=url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """
+    Движок сервиса, создаётся при первом обращении к базе.
+
+    Импорт модуля (ради моделей — в тестах, миграциях) не создаёт движок и не загружает
+    драйвер базы, а воркер быстрее проходит запуск.
+    """
+    settings = get_settings()
+    return create_engine_from_settings(settings.DB_URL, settings)
+
+
+def current_engine() -> AsyncEngine | None:
+    """Движок сервиса, если он уже создан; сам движок не создаёт"""
+    return get_engine() if get_engine.cache_info().currsize else None
+
+
+@lru_cache(maxsize=1)
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+
+
+async def dispose_engine() -> None:
+    """Закрывает соединения пула, если движок создавался; вызывается при остановке приложения"""
+    engine = current_engine()
+    if engine is not None:
+        await engine.dispose()
+
 
-engine = create_async_engine(url=database_url)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 str_uniq = Annotated[str, mapped_column(unique=True, nullable=False)]
 
 
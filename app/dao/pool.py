@@ -0,0 +1,54 @@
+import time
+from collections.abc import Callable
+
+from prometheus_client import Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent waiting for a database connection from the pool',
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0]
+)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет время получения соединения, включая ожидание свободного"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+class PoolCollector(Collector):
+    """
+    Состояние пула соединений движка на момент сбора метрик.
+
+    Вместо движка можно передать функцию, которая возвращает его или None, пока движок
+    не создан: тогда коллектор регистрируется заранее и ничего не отдаёт до первого обращения к базе.
+    """
+
+    def __init__(self, engine: AsyncEngine | Callable[[], AsyncEngine | None]):
+        self._engine = engine
+
+    @property
+    def engine(self) -> AsyncEngine | None:
+        return self._engine() if callable(self._engine) else self._engine
+
+    def collect(self):
+        engine = self.engine
+        if engine is None:
+            return
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return
+        yield GaugeMetricFamily('db_pool_size', 'Configured number of persistent pool connections', value=pool.size())
+        yield GaugeMetricFamily('db_pool_checked_out', 'Connections currently in use', value=pool.checkedout())
+        yield GaugeMetricFamily('db_pool_idle', 'Open connections waiting in the pool', value=pool.checkedin())
+        # overflow() отрицателен, пока пул не открыл все size() соединений
+        yield GaugeMetricFamily('db_pool_overflow', 'Connections open above pool size', value=max(0, pool.overflow()))
@@ -7,14 +7,28 @@ from loguru import logger
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.dao.database import async_session_maker
+from app.dao.database import get_session_maker
 
 
 class DatabaseSessionManager:
-    """Менеджер асинхронных сессий"""
+    """
+    Менеджер асинхронных сессий.
 
-    def __init__(self, session_maker: async_sessionmaker[AsyncSession]):
-        self.session_maker = session_maker
+    `session_maker` — фабрика сессий или функция без аргументов, которая её возвращает:
+    тогда фабрика (и движок) создаётся при первой сессии.
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession] | Callable[[], async_sessionmaker[AsyncSession]],
+    ):
+        self._session_maker = session_maker
+
+    @property
+    def session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if not isinstance(self._session_maker, async_sessionmaker):
+            self._session_maker = self._session_maker()
+        return self._session_maker
 
     @asynccontextmanager
     async def create_session(self) -> AsyncGenerator[AsyncSession, None]:
@@ -110,7 +124,7 @@ class DatabaseSessionManager:
 
 
 # Инициализация менеджера сессий базы данных
-session_manager = DatabaseSessionManager(async_session_maker)
+session_manager = DatabaseSessionManager(get_session_maker)
 
 # Зависимости FastAPI для использования сессий
 SessionDep = session_manager.session_dependency
@@ -1,6 +1,52 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.opencv_cam.router import router
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.dao.database import dispose_engine
+from app.opencv_cam.ingest import MULTIPART_OVERHEAD, RequestSizeLimitMiddleware
+from app.opencv_cam.router import (
+    router,
+    get_analysis_executor,
+    get_analysis_writer,
+    get_job_runner,
+    get_stream_monitor,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Настройки и сервисы создаются здесь, а не при импорте приложения
+    settings = get_settings()
+    analysis_executor = get_analysis_executor()
+    analysis_writer = get_analysis_writer()
+    job_runner = get_job_runner()
+    stream_monitor = get_stream_monitor()
+    analysis_executor.start()
+    if settings.ANALYSIS_PREWARM:
+        analysis_executor.prewarm()
+    if settings.WRITE_BEHIND:
+        analysis_writer.start()
+    yield
+    await run_in_threadpool(stream_monitor.shutdown, settings.ANALYSIS_SHUTDOWN_TIMEOUT)
+    await job_runner.shutdown(timeout=settings.ANALYSIS_SHUTDOWN_TIMEOUT)
+    await analysis_writer.shutdown(timeout=settings.ANALYSIS_SHUTDOWN_TIMEOUT)
+    await analysis_executor.shutdown(timeout=settings.ANALYSIS_SHUTDOWN_TIMEOUT)
+    # Соединения пула закрываются явно: потоки драйвера иначе задерживают выход процесса
+    await dispose_engine()
+
+
+def upload_limits() -> dict[str, int]:
+    settings = get_settings()
+    return {
+        "/analyze": settings.UPLOAD_MAX_SIZE + MULTIPART_OVERHEAD,
+        "/analyze/batch": settings.BATCH_MAX_SIZE,
+    }
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Лимит проверяется до того, как Starlette примет и сохранит тело запроса
+app.add_middleware(RequestSizeLimitMiddleware, limits=upload_limits)
 
 app.include_router(router)
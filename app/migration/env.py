@@ -9,11 +9,11 @@ from alembic import context
 from sqlalchemy import engine_from_config, pool
 
 from app.opencv_cam.models import Base
-from app.config import settings
+from app.config import get_settings
 
 config = context.config
 
-_database_url_sync = settings.DB_URL.replace("postgresql+asyncpg", "postgresql+psycopg2")
+_database_url_sync = get_settings().DB_URL.replace("postgresql+asyncpg", "postgresql+psycopg2")
 config.set_main_option("sqlalchemy.url", _database_url_sync)
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
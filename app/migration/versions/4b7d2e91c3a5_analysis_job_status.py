@@ -0,0 +1,35 @@
+"""analysis job status
+
+Revision ID: 4b7d2e91c3a5
+Revises: ee128dcc2ea3
+Create Date: 2026-10-18 10:12:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7d2e91c3a5'
+down_revision: Union[str, Sequence[str], None] = 'ee128dcc2ea3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('videoanalysiss', sa.Column('status', sa.String(), server_default='completed', nullable=False))
+    op.add_column('videoanalysiss', sa.Column('progress', sa.Float(), server_default='100', nullable=False))
+    op.alter_column('videoanalysiss', 'processing_time', existing_type=sa.Float(), nullable=True)
+    op.alter_column('videoanalysiss', 'movement_detected', existing_type=sa.Boolean(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM videoanalysiss WHERE processing_time IS NULL OR movement_detected IS NULL")
+    op.alter_column('videoanalysiss', 'movement_detected', existing_type=sa.Boolean(), nullable=False)
+    op.alter_column('videoanalysiss', 'processing_time', existing_type=sa.Float(), nullable=False)
+    op.drop_column('videoanalysiss', 'progress')
+    op.drop_column('videoanalysiss', 'status')
@@ -0,0 +1,36 @@
+"""result cache columns
+
+Revision ID: 9c5e1f3a8d20
+Revises: 4b7d2e91c3a5
+Create Date: 2026-10-18 11:40:07.118964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c5e1f3a8d20'
+down_revision: Union[str, Sequence[str], None] = '4b7d2e91c3a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('videoanalysiss', sa.Column('movement_percentage', sa.Float(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('duration', sa.Float(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('params_fingerprint', sa.String(length=16), nullable=True))
+    op.create_index('ix_videoanalysiss_content_hash', 'videoanalysiss', ['content_hash', 'params_fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_videoanalysiss_content_hash', table_name='videoanalysiss')
+    op.drop_column('videoanalysiss', 'params_fingerprint')
+    op.drop_column('videoanalysiss', 'content_hash')
+    op.drop_column('videoanalysiss', 'duration')
+    op.drop_column('videoanalysiss', 'movement_percentage')
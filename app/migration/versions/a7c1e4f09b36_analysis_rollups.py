@@ -0,0 +1,79 @@
+"""analysis rollups
+
+Revision ID: a7c1e4f09b36
+Revises: f2a9d6c4b815
+Create Date: 2026-10-18 15:48:02.736120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c1e4f09b36'
+down_revision: Union[str, Sequence[str], None] = 'f2a9d6c4b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копия PROCESSING_TIME_BUCKETS на момент миграции
+PROCESSING_TIME_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+
+def counter(name: str) -> sa.Column:
+    return sa.Column(name, sa.Integer(), server_default='0', nullable=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analysisrollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.TIMESTAMP(), nullable=False),
+        counter('total'),
+        counter('completed'),
+        counter('failed'),
+        counter('with_movement'),
+        sa.Column('processing_time_sum', sa.Float(), server_default='0', nullable=False),
+        sa.Column('duration_sum', sa.Float(), server_default='0', nullable=False),
+        *[counter(f'pt_bucket_{i}') for i in range(len(PROCESSING_TIME_BUCKETS) + 1)],
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bucket_start'),
+    )
+
+    # Итоги по уже записанным анализам; время завершения — последнее обновление записи
+    conditions, lower = [], None
+    for upper in PROCESSING_TIME_BUCKETS:
+        conditions.append(
+            f"processing_time <= {upper}" if lower is None
+            else f"processing_time > {lower} AND processing_time <= {upper}"
+        )
+        lower = upper
+    conditions.append(f"processing_time > {lower}")
+    histogram = [f"count(*) FILTER (WHERE status = 'completed' AND {condition})" for condition in conditions]
+    op.execute(f"""
+        INSERT INTO analysisrollups (
+            bucket_start, total, completed, failed, with_movement, processing_time_sum, duration_sum,
+            {', '.join(f'pt_bucket_{i}' for i in range(len(histogram)))}
+        )
+        SELECT
+            date_trunc('hour', updated_at),
+            count(*),
+            count(*) FILTER (WHERE status = 'completed'),
+            count(*) FILTER (WHERE status = 'failed'),
+            count(*) FILTER (WHERE status = 'completed' AND movement_detected),
+            coalesce(sum(processing_time) FILTER (WHERE status = 'completed'), 0),
+            coalesce(sum(duration) FILTER (WHERE status = 'completed'), 0),
+            {', '.join(histogram)}
+        FROM videoanalysiss
+        WHERE status IN ('completed', 'failed')
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analysisrollups')
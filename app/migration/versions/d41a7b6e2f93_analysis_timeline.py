@@ -0,0 +1,28 @@
+"""analysis timeline
+
+Revision ID: d41a7b6e2f93
+Revises: 9c5e1f3a8d20
+Create Date: 2026-10-18 13:05:52.640112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7b6e2f93'
+down_revision: Union[str, Sequence[str], None] = '9c5e1f3a8d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('videoanalysiss', sa.Column('timeline', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('videoanalysiss', 'timeline')
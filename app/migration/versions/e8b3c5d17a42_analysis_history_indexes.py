@@ -0,0 +1,38 @@
+"""analysis history indexes
+
+Revision ID: e8b3c5d17a42
+Revises: d41a7b6e2f93
+Create Date: 2026-10-18 14:22:31.507316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c5d17a42'
+down_revision: Union[str, Sequence[str], None] = 'd41a7b6e2f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_videoanalysiss_created_at_id', 'videoanalysiss', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_videoanalysiss_movement_created_at_id', 'videoanalysiss', ['created_at', 'id'], unique=False,
+        postgresql_where=sa.text('movement_detected IS TRUE'),
+    )
+    op.create_index(
+        'ix_videoanalysiss_filename_prefix', 'videoanalysiss', ['filename'], unique=False,
+        postgresql_ops={'filename': 'varchar_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_videoanalysiss_filename_prefix', table_name='videoanalysiss')
+    op.drop_index('ix_videoanalysiss_movement_created_at_id', table_name='videoanalysiss')
+    op.drop_index('ix_videoanalysiss_created_at_id', table_name='videoanalysiss')
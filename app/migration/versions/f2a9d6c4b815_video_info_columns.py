@@ -0,0 +1,38 @@
+"""video info columns
+
+Revision ID: f2a9d6c4b815
+Revises: e8b3c5d17a42
+Create Date: 2026-10-18 15:10:44.281937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a9d6c4b815'
+down_revision: Union[str, Sequence[str], None] = 'e8b3c5d17a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('videoanalysiss', sa.Column('fps', sa.Float(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('total_frames', sa.Integer(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('analyzed_frames', sa.Integer(), nullable=True))
+    op.add_column('videoanalysiss', sa.Column('analyzer_params', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('videoanalysiss', 'analyzer_params')
+    op.drop_column('videoanalysiss', 'analyzed_frames')
+    op.drop_column('videoanalysiss', 'total_frames')
+    op.drop_column('videoanalysiss', 'height')
+    op.drop_column('videoanalysiss', 'width')
+    op.drop_column('videoanalysiss', 'fps')
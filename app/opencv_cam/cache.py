@@ -0,0 +1,44 @@
+import time
+from collections import OrderedDict
+from typing import Dict
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов анализа в памяти процесса.
+
+    Ключ — (sha256 содержимого, отпечаток параметров анализатора). Записи вытесняются
+    по размеру (`max_size`) и по возрасту (`ttl` секунд).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[tuple[str, str], tuple[float, Dict]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, content_hash: str, fingerprint: str) -> Dict | None:
+        key = (content_hash, fingerprint)
+        item = self._items.get(key)
+        if item is None:
+            return None
+        stored_at, result = item
+        if time.monotonic() - stored_at > self.ttl:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return dict(result)
+
+    def set(self, content_hash: str, fingerprint: str, result: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        key = (content_hash, fingerprint)
+        self._items[key] = (time.monotonic(), dict(result))
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
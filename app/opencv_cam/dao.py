@@ -1,6 +1,148 @@
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from loguru import logger
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from sqlalchemy.orm import undefer
+
 from app.dao.base import BaseDAO
-from app.opencv_cam.models import VideoAnalysis
+from app.opencv_cam.models import (
+    PROCESSING_TIME_BUCKETS,
+    ROLLUP_COUNTERS,
+    VIDEO_INFO_FIELDS,
+    AnalysisRollup,
+    AnalysisStatus,
+    VideoAnalysis,
+)
+from app.opencv_cam.schemas import AnalysisCursor, AnalysisListFilter, AnalysisRollupIncrement
 
 
 class VideoAnalysisDAO(BaseDAO[VideoAnalysis]):
-    model = VideoAnalysis
\ No newline at end of file
+    model = VideoAnalysis
+
+    @classmethod
+    async def find_cached_result(cls, session: AsyncSession, content_hash: str, params_fingerprint: str) -> Dict | None:
+        # Последний успешный анализ того же содержимого с теми же параметрами
+        try:
+            query = (
+                select(cls.model)
+                .options(undefer(cls.model.timeline))
+                .filter_by(
+                    content_hash=content_hash,
+                    params_fingerprint=params_fingerprint,
+                    status=AnalysisStatus.COMPLETED,
+                )
+                .order_by(cls.model.id.desc())
+                .limit(1)
+            )
+            result = await session.execute(query)
+            record = result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске результата по хэшу {content_hash}: {e}")
+            raise
+        if record is None or record.movement_percentage is None:
+            return None
+        return {
+            "has_movement": record.movement_detected,
+            "movement_percentage": record.movement_percentage,
+            "duration": record.duration,
+            "processing_time": record.processing_time,
+            "status": record.status,
+            "timeline": record.timeline,
+            **{field: getattr(record, field) for field in VIDEO_INFO_FIELDS},
+        }
+
+    @classmethod
+    async def find_timeline(cls, session: AsyncSession, data_id: int) -> tuple[bool, bytes | None]:
+        # Только шкала движения, без загрузки остальных полей; первый элемент — найдена ли запись
+        try:
+            result = await session.execute(select(cls.model.timeline).filter_by(id=data_id))
+            row = result.one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке шкалы движения для ID {data_id}: {e}")
+            raise
+        if row is None:
+            return False, None
+        return True, row.timeline
+
+    @classmethod
+    async def find_page(
+            cls,
+            session: AsyncSession,
+            filters: AnalysisListFilter,
+            limit: int,
+            after: AnalysisCursor | None = None,
+    ) -> list[VideoAnalysis]:
+        # Страница истории от новых к старым с курсором по (created_at, id) вместо OFFSET:
+        # условие по ключу индекса делает выборку любой страницы одинаково дешёвой
+        logger.info(f"Поиск страницы {cls.model.__name__} по фильтрам: {filters.model_dump(exclude_none=True)}")
+        query = select(cls.model)
+        if filters.movement_detected is not None:
+            query = query.where(cls.model.movement_detected.is_(filters.movement_detected))
+        if filters.filename_prefix:
+            query = query.where(cls.model.filename.startswith(filters.filename_prefix, autoescape=True))
+        if filters.created_from is not None:
+            query = query.where(cls.model.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            query = query.where(cls.model.created_at < filters.created_to)
+        if after is not None:
+            query = query.where(tuple_(cls.model.created_at, cls.model.id) < tuple_(after.created_at, after.id))
+        query = query.order_by(cls.model.created_at.desc(), cls.model.id.desc()).limit(limit)
+        try:
+            result = await session.execute(query)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске страницы истории анализов: {e}")
+            raise
+
+
+class AnalysisRollupDAO(BaseDAO[AnalysisRollup]):
+    model = AnalysisRollup
+
+    @classmethod
+    async def record(cls, session: AsyncSession, results: List[BaseModel], at: datetime | None = None) -> None:
+        # Прибавить завершённые анализы к итогам часа завершения одним upsert в транзакции записи результатов.
+        # Записи в других статусах (pending, processing) не учитываются
+        at = at or datetime.now(timezone.utc).replace(tzinfo=None)
+        increment = AnalysisRollupIncrement(bucket_start=at.replace(minute=0, second=0, microsecond=0))
+        for result in results:
+            status = getattr(result, "status", None)
+            if status not in (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED):
+                continue
+            increment.total += 1
+            if status == AnalysisStatus.FAILED:
+                increment.failed += 1
+                continue
+            increment.completed += 1
+            if result.movement_detected:
+                increment.with_movement += 1
+            if result.duration:
+                increment.duration_sum += result.duration
+            if result.processing_time is not None:
+                increment.processing_time_sum += result.processing_time
+                bucket = f"pt_bucket_{bisect_left(PROCESSING_TIME_BUCKETS, result.processing_time)}"
+                setattr(increment, bucket, getattr(increment, bucket) + 1)
+        if not increment.total:
+            return
+        await cls.upsert_many(
+            session, [increment], index_elements=["bucket_start"], increment_fields=list(ROLLUP_COUNTERS),
+        )
+
+    @classmethod
+    async def find_range(cls, session: AsyncSession, start: datetime, end: datetime) -> list[AnalysisRollup]:
+        # Почасовые итоги за [start, end) по возрастанию времени
+        try:
+            query = (
+                select(cls.model)
+                .where(cls.model.bucket_start >= start, cls.model.bucket_start < end)
+                .order_by(cls.model.bucket_start)
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке итогов за {start} - {end}: {e}")
+            raise
@@ -0,0 +1,239 @@
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from enum import StrEnum
+from typing import ClassVar
+
+import cv2
+import numpy as np
+
+from app.opencv_cam.motion import MotionMetric, score_mask
+
+
+class DetectorKind(StrEnum):
+    FRAME_DIFF = "frame_diff"  # разница соседних выбранных кадров
+    MOG2 = "mog2"  # модель фона из смеси гауссиан (BackgroundSubtractorMOG2)
+    KNN = "knn"  # модель фона по ближайшим соседям (BackgroundSubtractorKNN)
+
+
+@dataclass(frozen=True)
+class DetectorCost:
+    """
+    Профиль стоимости детектора.
+
+    `relative_cost` — время на кадр относительно frame_diff при той же ширине анализа,
+    `recommended_width` — ширина, при которой детектор обычно используется,
+    `splittable` — можно ли анализировать видео по отрезкам с тем же результатом
+    (детектору хватает одного опорного кадра на границе отрезка).
+    """
+    relative_cost: float
+    recommended_width: int | None
+    splittable: bool
+    description: str
+
+
+class MotionDetector(ABC):
+    """
+    Детектор движения для последовательности кадров одного видео или потока.
+
+    Экземпляр хранит состояние (предыдущий кадр, модель фона), поэтому на каждое видео
+    создаётся новый — через `VideoAnalyzer.new_detector`.
+    """
+    kind: ClassVar[DetectorKind]
+    cost: ClassVar[DetectorCost]
+
+    def __init__(self, scale: float, min_area: float, motion_metric: MotionMetric):
+        self.scale = scale
+        self.min_area = min_area
+        self.motion_metric = motion_metric
+
+    @property
+    @abstractmethod
+    def params(self) -> dict:
+        """Параметры, от которых зависит результат (без масштаба — он задаётся анализатором)"""
+
+    @abstractmethod
+    def preprocess(self, frame: np.ndarray) -> np.ndarray:
+        """Кадр BGR, приведённый к виду, в котором детектор его сравнивает"""
+
+    @abstractmethod
+    def update(self, prepared: np.ndarray) -> tuple[float, float] | None:
+        """Сравнивает подготовленный кадр с предыдущими и запоминает его"""
+
+    def process(self, frame: np.ndarray) -> tuple[float, float] | None:
+        """
+        Площадь наибольшей области движения (в пикселях масштаба анализа) и доля
+        изменившихся пикселей; None — пока кадров недостаточно для сравнения.
+        """
+        return self.update(self.preprocess(frame))
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale < 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _score(self, mask: np.ndarray, dilate_iterations: int) -> tuple[float, float]:
+        mask = cv2.dilate(mask, None, iterations=dilate_iterations)
+        largest_area, changed_pixels = score_mask(mask, self.motion_metric, self.min_area)
+        return largest_area, changed_pixels / mask.size
+
+
+class FrameDiffDetector(MotionDetector):
+    """
+    Разница соседних выбранных кадров: размытие, порог по модулю разности, dilate.
+
+    Размер ядра размытия и число итераций dilate задаются для исходного разрешения
+    и пересчитываются под масштаб, чтобы решение не зависело от разрешения видео.
+    """
+    kind = DetectorKind.FRAME_DIFF
+    cost = DetectorCost(
+        relative_cost=1.0,
+        recommended_width=640,
+        splittable=True,
+        description="Два соседних кадра; чувствителен к шуму и дрожанию камеры",
+    )
+
+    def __init__(
+            self,
+            scale: float,
+            min_area: float,
+            motion_metric: MotionMetric = MotionMetric.CONTOURS,
+            diff_threshold: int = 25,
+            blur_size: int = 21,
+            dilate_iterations: int = 2,
+    ):
+        super().__init__(scale, min_area, motion_metric)
+        self.diff_threshold = diff_threshold
+        self.base_blur_size = blur_size
+        self.base_dilate_iterations = dilate_iterations
+        self.blur_size = max(3, int(round(blur_size * scale)) | 1)
+        self.dilate_iterations = max(1, int(round(dilate_iterations * scale)))
+        self._prev_gray: np.ndarray | None = None
+
+    @property
+    def params(self) -> dict:
+        return {
+            "diff_threshold": self.diff_threshold,
+            "blur_size": self.base_blur_size,
+            "dilate_iterations": self.base_dilate_iterations,
+        }
+
+    def preprocess(self, frame: np.ndarray) -> np.ndarray:
+        """Серый, уменьшенный до масштаба анализа и размытый кадр"""
+        return cv2.GaussianBlur(self._gray(frame), (self.blur_size, self.blur_size), 0)
+
+    def compare(self, prev_gray: np.ndarray, gray: np.ndarray) -> tuple[float, float]:
+        frame_diff = cv2.absdiff(prev_gray, gray)
+        thresh = cv2.threshold(frame_diff, self.diff_threshold, 255, cv2.THRESH_BINARY)[1]
+        return self._score(thresh, self.dilate_iterations)
+
+    def update(self, gray: np.ndarray) -> tuple[float, float] | None:
+        prev_gray, self._prev_gray = self._prev_gray, gray
+        if prev_gray is None:
+            return None
+        return self.compare(prev_gray, gray)
+
+
+class BackgroundSubtractorDetector(MotionDetector):
+    """
+    Движение как отличие кадра от модели фона OpenCV (MOG2 или KNN).
+
+    Модель учитывает историю из `history` кадров, поэтому шум сенсора, рябь листвы и
+    медленная смена освещения уходят в фон, а не дают ложных срабатываний, как у разницы
+    двух кадров. Сильное размытие не нужно, и детектор рассчитан на малую ширину анализа.
+    Первый кадр заполняет модель (`warmup_frames` раз — KNN нужно несколько образцов).
+    Результат зависит от всей истории кадров, поэтому видео не делится на отрезки.
+    """
+    cost = DetectorCost(
+        relative_cost=3.5,
+        recommended_width=320,
+        splittable=False,
+        description="Модель фона; устойчив к шуму, дешевле frame_diff при вдвое меньшей ширине",
+    )
+    default_threshold: ClassVar[float]
+    warmup_frames: ClassVar[int] = 1
+
+    def __init__(
+            self,
+            scale: float,
+            min_area: float,
+            motion_metric: MotionMetric = MotionMetric.CONTOURS,
+            history: int = 200,
+            threshold: float | None = None,
+            open_size: int = 3,
+            dilate_iterations: int = 1,
+    ):
+        super().__init__(scale, min_area, motion_metric)
+        self.history = history
+        self.threshold = self.default_threshold if threshold is None else threshold
+        self.open_size = open_size
+        self.dilate_iterations = dilate_iterations
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (open_size, open_size)) if open_size > 1 else None
+        self._subtractor = self._create_subtractor()
+        self._primed = False
+
+    @abstractmethod
+    def _create_subtractor(self) -> cv2.BackgroundSubtractor:
+        ...
+
+    @property
+    def params(self) -> dict:
+        return {
+            "history": self.history,
+            "threshold": self.threshold,
+            "open_size": self.open_size,
+            "dilate_iterations": self.dilate_iterations,
+        }
+
+    def preprocess(self, frame: np.ndarray) -> np.ndarray:
+        return self._gray(frame)
+
+    def update(self, gray: np.ndarray) -> tuple[float, float] | None:
+        if not self._primed:
+            for _ in range(self.warmup_frames):
+                self._subtractor.apply(gray)
+            self._primed = True
+            return None
+
+        mask = self._subtractor.apply(gray)
+        if self._kernel is not None:
+            # Открытие убирает одиночные пиксели шума до оценки площади
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+        return self._score(mask, self.dilate_iterations)
+
+
+class MOG2Detector(BackgroundSubtractorDetector):
+    kind = DetectorKind.MOG2
+    default_threshold = 16.0  # varThreshold: квадрат расстояния Махаланобиса
+
+    def _create_subtractor(self) -> cv2.BackgroundSubtractor:
+        return cv2.createBackgroundSubtractorMOG2(
+            history=self.history, varThreshold=self.threshold, detectShadows=False,
+        )
+
+
+class KNNDetector(BackgroundSubtractorDetector):
+    kind = DetectorKind.KNN
+    cost = DetectorCost(
+        relative_cost=4.0,
+        recommended_width=320,
+        splittable=False,
+        description="Модель фона по ближайшим соседям; устойчивее MOG2 к сложному фону, дороже",
+    )
+    default_threshold = 400.0  # dist2Threshold: квадрат расстояния до образцов фона
+    warmup_frames = 4
+
+    def _create_subtractor(self) -> cv2.BackgroundSubtractor:
+        return cv2.createBackgroundSubtractorKNN(
+            history=self.history, dist2Threshold=self.threshold, detectShadows=False,
+        )
+
+
+DETECTORS: dict[DetectorKind, type[MotionDetector]] = {
+    detector.kind: detector for detector in (FrameDiffDetector, MOG2Detector, KNNDetector)
+}
+
+
+def detector_profiles() -> list[dict]:
+    """Доступные детекторы и их профили стоимости"""
+    return [{"detector": str(kind), **asdict(detector.cost)} for kind, detector in DETECTORS.items()]
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Collection, Iterator
+
+from app.opencv_cam.metrics import EVENT_SUBSCRIBERS, EVENTS_DROPPED
+
+
+def analysis_topic(analysis_id: int) -> str:
+    return f"analysis:{analysis_id}"
+
+
+def stream_topic(stream_id: str) -> str:
+    return f"stream:{stream_id}"
+
+
+@dataclass(frozen=True)
+class EventMessage:
+    """Событие вместе с уже закодированным кадром Server-Sent Events"""
+    data: dict
+    encoded: bytes
+
+    @classmethod
+    def create(cls, data: dict) -> "EventMessage":
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        return cls(data, f"event: {data.get('event', 'message')}\ndata: {payload}\n\n".encode())
+
+
+# Признак закрытия темы в очереди подписчика
+_CLOSED = object()
+
+
+class Subscription:
+    """
+    Подписка на тему с ограниченным буфером.
+
+    Если подписчик не успевает читать, из буфера вытесняются самые старые события:
+    для прогресса важнее последнее значение, а последнее событие темы всегда доходит.
+    """
+
+    def __init__(self, topic: str, buffer_size: int):
+        self.topic = topic
+        self.dropped = 0
+        self.closed = False
+        self.buffer_size = buffer_size
+        # Лишнее место — под признак закрытия, чтобы он не вытеснял последнее событие
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size + 1)
+
+    def _push(self, message: EventMessage) -> None:
+        if self._queue.qsize() >= self.buffer_size:
+            self._queue.get_nowait()
+            self.dropped += 1
+            EVENTS_DROPPED.inc()
+        self._queue.put_nowait(message)
+
+    def _close(self) -> None:
+        self._queue.put_nowait(_CLOSED)
+
+    async def get(self, timeout: float | None = None) -> EventMessage | None:
+        """Следующее событие; None — по истечении `timeout` или после закрытия темы (`closed`)"""
+        if self.closed:
+            return None
+        try:
+            item = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if item is _CLOSED:
+            self.closed = True
+            return None
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> EventMessage:
+        message = await self.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class EventBroadcaster:
+    """
+    Рассылка событий по темам внутри процесса.
+
+    Событие кодируется один раз и раскладывается по буферам подписчиков темы, так что
+    число подписчиков не умножает работу анализа и сериализации. Без подписчиков
+    `publish` ничего не делает. Вызывается из event loop; из других потоков —
+    через `threadsafe_publisher`.
+    """
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._topics: dict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribers(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[Subscription]:
+        subscription = Subscription(topic, self.buffer_size)
+        self._topics[topic].add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        try:
+            yield subscription
+        finally:
+            EVENT_SUBSCRIBERS.dec()
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def publish(self, topic: str, data: dict, final: bool = False) -> None:
+        """Рассылает событие; `final` закрывает тему — подписки после него завершаются"""
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return
+        message = EventMessage.create(data)
+        for subscription in subscribers:
+            subscription._push(message)
+            if final:
+                subscription._close()
+        if final:
+            del self._topics[topic]
+
+    def threadsafe_publisher(self, topic: str, final_events: Collection[str] = ()) -> Callable[[dict], None]:
+        """
+        Функция публикации в тему из другого потока (через event loop, в котором вызвана).
+
+        Событие с `event` из `final_events` закрывает тему.
+        """
+        loop = asyncio.get_running_loop()
+
+        def publish(data: dict) -> None:
+            loop.call_soon_threadsafe(self.publish, topic, data, data.get("event") in final_events)
+
+        return publish
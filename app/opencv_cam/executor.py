@@ -0,0 +1,366 @@
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.queues
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, partial
+from typing import Callable, Dict
+
+from loguru import logger
+
+from app.opencv_cam.metrics import (
+    ANALYSIS_IN_FLIGHT,
+    ANALYSIS_REJECTED,
+    FRAMES_ANALYZED,
+    FRAMES_DECODED,
+    record_stage_timings,
+)
+from app.opencv_cam.timing import Stage, StageTimer
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer, params_with_detector
+from app.server import available_cpus
+
+
+class AnalysisQueueFullError(Exception):
+    """Очередь анализа заполнена или пул останавливается"""
+
+
+# Сообщений о прогрессе, ожидающих передачи из воркеров; при переполнении новые отбрасываются
+PROGRESS_QUEUE_SIZE = 1000
+
+# Анализаторы внутри процесса-воркера: по умолчанию (ключ None) создаётся при старте процесса,
+# с другим детектором — при первом запросе с ним
+_worker_params: dict = {}
+_worker_analyzers: dict[str | None, VideoAnalyzer] = {}
+_worker_progress: multiprocessing.queues.Queue | None = None
+
+
+def _init_worker(analyzer_params: dict, progress_queue: multiprocessing.queues.Queue | None = None) -> None:
+    global _worker_params, _worker_progress
+    _worker_params = analyzer_params
+    _worker_analyzers[None] = VideoAnalyzer(**analyzer_params)
+    _worker_progress = progress_queue
+
+
+def _warm_up_worker() -> None:
+    # Анализатор уже создан в _init_worker; задача нужна только чтобы пул запустил процесс
+    pass
+
+
+def _worker_analyzer(detector: str | None) -> VideoAnalyzer:
+    analyzer = _worker_analyzers.get(detector)
+    if analyzer is None:
+        analyzer = _worker_analyzers[detector] = VideoAnalyzer(**params_with_detector(_worker_params, detector))
+    return analyzer
+
+
+def _report_progress(progress_key: int, progress: Dict) -> None:
+    try:
+        _worker_progress.put_nowait((progress_key, progress))
+    except queue.Full:
+        pass
+
+
+def _start_timer(submitted_at: float | None, timed: bool) -> StageTimer:
+    timer = StageTimer(sampled=timed)
+    if submitted_at is not None:
+        timer.add(Stage.QUEUE, max(0.0, time.time() - submitted_at))
+    return timer
+
+
+def _analyze_in_worker(
+        video_path: str,
+        decision_only: bool,
+        progress_key: int | None = None,
+        detector: str | None = None,
+        submitted_at: float | None = None,
+        timed: bool = False,
+        timer: StageTimer | None = None,
+) -> Dict:
+    on_progress = None
+    if progress_key is not None and _worker_progress is not None:
+        on_progress = partial(_report_progress, progress_key)
+    timer = timer or _start_timer(submitted_at, timed)
+    return _worker_analyzer(detector).analyze_path(video_path, decision_only, on_progress, timer)
+
+
+def _plan_or_analyze_in_worker(
+        video_path: str,
+        progress_key: int | None,
+        max_segments: int,
+        min_segment_frames: int,
+        detector: str | None = None,
+        submitted_at: float | None = None,
+        timed: bool = False,
+) -> tuple[Dict | None, Dict | None]:
+    """
+    План деления видео на отрезки или, если делить не на что, сразу результат анализа целиком.
+
+    Возвращает пару (результат, план), заполнен один из элементов.
+    """
+    timer = _start_timer(submitted_at, timed)
+    try:
+        with timer.measure(Stage.OPEN):
+            plan = _worker_analyzer(detector).plan_segments(video_path, max_segments, min_segment_frames)
+    except Exception:
+        # Ошибку открытия видео вернёт обычный анализ в виде результата
+        plan = None
+    if plan is not None and len(plan["segments"]) > 1:
+        plan["timings"] = timer.to_dict()
+        return None, plan
+    return _analyze_in_worker(video_path, False, progress_key, detector, timer=timer), None
+
+
+def _analyze_segment_in_worker(
+        video_path: str, plan: Dict, segment: Dict, detector: str | None = None, timed: bool = False,
+) -> Dict:
+    return _worker_analyzer(detector).analyze_segment(video_path, plan, segment, StageTimer(sampled=timed))
+
+
+class AnalysisExecutor:
+    """
+    Пул процессов для CPU-тяжёлого анализа видео.
+
+    Держит не больше `max_workers + queue_size` задач одновременно: сверх этого
+    `analyze` либо сразу отказывает (`AnalysisQueueFullError`), либо ждёт свободного места.
+
+    Длинное видео делится на отрезки, которые анализируются в разных воркерах: не больше
+    `segments` отрезков (0 — по числу воркеров, 1 — не делить) и не меньше
+    `segment_min_frames` выбранных кадров в отрезке. Задача с отрезками занимает одно место в очереди.
+
+    Время стадий анализа каждого видео попадает в `analysis_stage_seconds`; покадровые стадии
+    замеряются в доле `timing_sample_rate` анализов и в анализах с `timed=True`.
+    """
+
+    def __init__(
+            self,
+            max_workers: int | None = None,
+            queue_size: int = 16,
+            analyzer_params: dict | None = None,
+            segments: int = 1,
+            segment_min_frames: int = 300,
+            timing_sample_rate: float = 0.0,
+    ):
+        self.max_workers = max_workers or available_cpus()
+        self.queue_size = queue_size
+        self.analyzer_params = analyzer_params or {}
+        self.max_segments = segments or self.max_workers
+        self.segment_min_frames = segment_min_frames
+        self.timing_sample_rate = timing_sample_rate
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._closing = False
+        # Прогресс из воркеров приходит через очередь процессов и раздаётся в event loop подписчика
+        self._progress_queue: multiprocessing.queues.Queue | None = None
+        self._progress_thread: threading.Thread | None = None
+        self._progress_handlers: dict[int, tuple[asyncio.AbstractEventLoop, Callable[[Dict], None]]] = {}
+        self._progress_keys = itertools.count()
+        self._analyzers: dict[str | None, VideoAnalyzer] = {}
+
+    def _analyzer(self, detector: str | None) -> VideoAnalyzer:
+        analyzer = self._analyzers.get(detector)
+        if analyzer is None:
+            analyzer = self._analyzers[detector] = VideoAnalyzer(**params_with_detector(self.analyzer_params, detector))
+        return analyzer
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Отпечаток параметров анализаторов в воркерах"""
+        return self.fingerprint_for(None)
+
+    @cached_property
+    def params(self) -> Dict:
+        """Параметры анализаторов в воркерах в виде, пригодном для JSON"""
+        return self.params_for(None)
+
+    def fingerprint_for(self, detector: str | None) -> str:
+        """Отпечаток параметров при анализе детектором `detector` (None — заданным в analyzer_params)"""
+        return self._analyzer(detector).fingerprint
+
+    def params_for(self, detector: str | None) -> Dict:
+        return self._analyzer(detector).params
+
+    def detector_name(self, detector: str | None) -> str:
+        """Детектор, которым будет проанализировано видео, — метка метрик"""
+        return str(self._analyzer(detector).detector)
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_size
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        # spawn вместо fork: OpenCV и event loop плохо переживают fork
+        context = multiprocessing.get_context("spawn")
+        self._progress_queue = context.Queue(maxsize=PROGRESS_QUEUE_SIZE)
+        self._progress_thread = threading.Thread(
+            target=self._dispatch_progress, args=(self._progress_queue,), name="analysis-progress", daemon=True,
+        )
+        self._progress_thread.start()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.analyzer_params, self._progress_queue),
+        )
+        self._slots = asyncio.Semaphore(self.capacity)
+        self._closing = False
+        logger.info(f"Пул анализа запущен: воркеров {self.max_workers}, очередь {self.queue_size}")
+
+    def prewarm(self) -> None:
+        """
+        Запускает все процессы пула, не дожидаясь их готовности.
+
+        Иначе процесс запускается на первом анализе, и запрос ждёт старт интерпретатора
+        и импорт OpenCV. Процессы поднимаются в фоне, приложение готово к запросам сразу.
+        """
+        for _ in range(self.max_workers):
+            self._pool.submit(_warm_up_worker)
+
+    async def shutdown(self, timeout: float | None = None) -> None:
+        """Перестаёт принимать задачи и ждёт завершения текущих не дольше `timeout` секунд"""
+        if self._pool is None:
+            return
+        self._closing = True
+        pool, self._pool = self._pool, None
+        try:
+            await asyncio.wait_for(asyncio.to_thread(pool.shutdown, wait=True), timeout)
+            logger.info("Пул анализа остановлен")
+        except asyncio.TimeoutError:
+            logger.warning(f"Пул анализа не завершился за {timeout} с, оставшиеся задачи отменены")
+            pool.shutdown(wait=False, cancel_futures=True)
+        finally:
+            self._stop_progress()
+
+    def _stop_progress(self) -> None:
+        progress_queue, self._progress_queue = self._progress_queue, None
+        thread, self._progress_thread = self._progress_thread, None
+        if progress_queue is None:
+            return
+        progress_queue.put(None)
+        thread.join()
+        progress_queue.close()
+
+    def _dispatch_progress(self, progress_queue: multiprocessing.queues.Queue) -> None:
+        while True:
+            message = progress_queue.get()
+            if message is None:
+                return
+            progress_key, progress = message
+            handler = self._progress_handlers.get(progress_key)
+            if handler is None:
+                continue
+            loop, on_progress = handler
+            try:
+                loop.call_soon_threadsafe(on_progress, progress)
+            except RuntimeError:
+                # event loop подписчика уже закрыт
+                pass
+
+    async def analyze(
+            self,
+            video_path: str,
+            wait: bool = False,
+            decision_only: bool = False,
+            on_progress: Callable[[Dict], None] | None = None,
+            detector: str | None = None,
+            timed: bool = False,
+    ) -> Dict:
+        """
+        Анализирует видео в пуле процессов.
+
+        При `wait=False` и заполненной очереди сразу выбрасывает `AnalysisQueueFullError`.
+        `on_progress` вызывается в текущем event loop с промежуточным прогрессом анализа.
+        `detector` заменяет детектор из analyzer_params для этого видео.
+        `timed=True` включает покадровый замер стадий независимо от `timing_sample_rate`;
+        замеры возвращаются в поле `timings` результата.
+        """
+        if self._pool is None and not self._closing:
+            self.start()
+        if self._closing:
+            ANALYSIS_REJECTED.inc()
+            raise AnalysisQueueFullError("Пул анализа останавливается")
+        if not wait and self._slots.locked():
+            ANALYSIS_REJECTED.inc()
+            raise AnalysisQueueFullError("Очередь анализа заполнена")
+
+        submitted_at = time.time()
+        timed = timed or (self.timing_sample_rate > 0 and random.random() < self.timing_sample_rate)
+        async with self._slots:
+            if self._pool is None:
+                raise AnalysisQueueFullError("Пул анализа останавливается")
+            ANALYSIS_IN_FLIGHT.inc()
+            loop = asyncio.get_running_loop()
+            progress_key = None
+            if on_progress is not None:
+                progress_key = next(self._progress_keys)
+                self._progress_handlers[progress_key] = (loop, on_progress)
+            try:
+                # decision_only останавливается по ходу чтения, поэтому не делится на отрезки
+                if self.max_segments > 1 and not decision_only:
+                    result = await self._analyze_split(
+                        video_path, progress_key, on_progress, detector, submitted_at, timed,
+                    )
+                else:
+                    result = await loop.run_in_executor(
+                        self._pool, _analyze_in_worker,
+                        video_path, decision_only, progress_key, detector, submitted_at, timed,
+                    )
+                self._record_timings(result, detector)
+                return result
+            finally:
+                ANALYSIS_IN_FLIGHT.dec()
+                if progress_key is not None:
+                    self._progress_handlers.pop(progress_key, None)
+
+    async def _analyze_split(
+            self,
+            video_path: str,
+            progress_key: int | None,
+            on_progress: Callable[[Dict], None] | None,
+            detector: str | None,
+            submitted_at: float,
+            timed: bool,
+    ) -> Dict:
+        loop = asyncio.get_running_loop()
+        started = time.time()
+        result, plan = await loop.run_in_executor(
+            self._pool, _plan_or_analyze_in_worker,
+            video_path, progress_key, self.max_segments, self.segment_min_frames, detector, submitted_at, timed,
+        )
+        if result is not None:
+            return result
+
+        segments = plan.pop("segments")
+        done = {"analyzed_frames": 0, "frames_with_movement": 0}
+
+        async def run_segment(segment: Dict) -> Dict:
+            part = await loop.run_in_executor(
+                self._pool, _analyze_segment_in_worker, video_path, plan, segment, detector, timed,
+            )
+            if on_progress is not None:
+                done["analyzed_frames"] += part["analyzed_frames"]
+                done["frames_with_movement"] += part["frames_with_movement"]
+                on_progress(VideoAnalyzer._progress(
+                    done["analyzed_frames"], plan["expected_frames"], done["frames_with_movement"],
+                ))
+            return part
+
+        try:
+            parts = await asyncio.gather(*(run_segment(segment) for segment in segments))
+        except Exception as e:
+            return VideoAnalyzer._failed_result(time.time() - started, e)
+        return VideoAnalyzer.merge_segments(plan, parts, time.time() - started)
+
+    def _record_timings(self, result: Dict, detector: str | None) -> None:
+        timings = result.get("timings")
+        if timings is None:
+            return
+        name = self.detector_name(detector)
+        record_stage_timings(name, timings["stages"])
+        FRAMES_DECODED.labels(detector=name).inc(timings["decoded_frames"])
+        FRAMES_ANALYZED.labels(detector=name).inc(result.get("analyzed_frames") or 0)
@@ -0,0 +1,236 @@
+import hashlib
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zipfile
+from typing import BinaryIO, Callable
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+# Запас на заголовки частей multipart сверх размера самого файла
+MULTIPART_OVERHEAD = 64 * 1024
+TOO_LARGE_DETAIL = "Файл слишком большой"
+
+
+class UploadTooLargeError(Exception):
+    """Загруженный файл превышает допустимый размер"""
+
+
+class NotAVideoError(Exception):
+    """Файл не является видео"""
+
+
+class IngestedVideo:
+    """Видео на диске, готовое к передаче в OpenCV"""
+
+    def __init__(self, path: str, size: int, owned: bool, content_hash: str | None = None):
+        self.path = path
+        self.size = size
+        # owned=False — путь указывает на файл загрузки Starlette, удалять его нельзя
+        self.owned = owned
+        self.content_hash = content_hash  # sha256 содержимого
+
+    def cleanup(self) -> None:
+        if self.owned and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Ограничение размера тела запросов с загрузками, до разбора multipart.
+
+    Starlette читает и сохраняет форму целиком ещё до вызова эндпоинта, поэтому проверка
+    в `ingest_upload` срабатывает, только когда файл уже принят. Здесь запрос с Content-Length
+    больше лимита пути отклоняется с 413 без чтения тела, а тело без длины (chunked)
+    прерывается на первом куске сверх лимита.
+
+    `limits` — лимиты по путям или функция без аргументов, которая их возвращает:
+    тогда лимиты (и настройки) читаются при первом запросе, а не при создании приложения.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int] | Callable[[], dict[str, int]]):
+        self.app = app
+        self._limits = limits
+
+    @property
+    def limits(self) -> dict[str, int]:
+        if not isinstance(self._limits, dict):
+            self._limits = self._limits()
+        return self._limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI пропускает HTTPException из разбора тела как есть, без замены на 400
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _spooled_file_path(upload: UploadFile) -> str | None:
+    """
+    Путь к уже сброшенному на диск файлу загрузки через /proc/<pid>/fd.
+
+    Starlette хранит загрузку в SpooledTemporaryFile: крупные файлы уже лежат во
+    временном файле без имени, и его можно открыть повторно без копирования.
+    """
+    if not getattr(upload.file, "_rolled", False):
+        return None
+    path = f"/proc/{os.getpid()}/fd/{upload.file.fileno()}"
+    return path if os.path.exists(path) else None
+
+
+def _write_chunk(tmp_file, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    tmp_file.write(chunk)
+
+
+def _hash_file(path: str, chunk_size: int) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def ingest_upload(
+        upload: UploadFile,
+        max_size: int,
+        chunk_size: int = 1024 * 1024,
+        allow_zero_copy: bool = False,
+) -> IngestedVideo:
+    """
+    Сохраняет загрузку на диск кусками по `chunk_size`, проверяя `max_size` и считая sha256 по ходу копирования.
+
+    При `allow_zero_copy=True` отдаёт путь к файлу самой загрузки, если он есть, —
+    такой путь действителен только пока жив запрос.
+    """
+    if allow_zero_copy:
+        path = _spooled_file_path(upload)
+        if path is not None:
+            await run_in_threadpool(upload.file.flush)
+            size = os.fstat(upload.file.fileno()).st_size
+            if size > max_size:
+                raise UploadTooLargeError(f"Файл больше {max_size} байт")
+            content_hash = await run_in_threadpool(_hash_file, path, chunk_size)
+            return IngestedVideo(path, size, owned=False, content_hash=content_hash)
+
+    suffix = os.path.splitext(upload.filename or "")[1] or ".mp4"
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    video = IngestedVideo(tmp_file.name, 0, owned=True)
+    hasher = hashlib.sha256()
+    try:
+        with tmp_file:
+            await upload.seek(0)
+            while chunk := await upload.read(chunk_size):
+                video.size += len(chunk)
+                if video.size > max_size:
+                    raise UploadTooLargeError(f"Файл больше {max_size} байт")
+                await run_in_threadpool(_write_chunk, tmp_file, hasher, chunk)
+    except BaseException:
+        video.cleanup()
+        raise
+    video.content_hash = hasher.hexdigest()
+    return video
+
+
+def is_archive(filename: str | None) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_video_name(filename: str) -> bool:
+    mime_type, _ = mimetypes.guess_type(filename)
+    return bool(mime_type and mime_type.startswith("video/"))
+
+
+def _copy_stream(src: BinaryIO, suffix: str, max_size: int, chunk_size: int) -> IngestedVideo:
+    """Синхронная версия потокового копирования: для файлов внутри архива"""
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    video = IngestedVideo(tmp_file.name, 0, owned=True)
+    hasher = hashlib.sha256()
+    try:
+        with tmp_file:
+            while chunk := src.read(chunk_size):
+                video.size += len(chunk)
+                if video.size > max_size:
+                    raise UploadTooLargeError(f"Файл больше {max_size} байт")
+                _write_chunk(tmp_file, hasher, chunk)
+    except BaseException:
+        video.cleanup()
+        raise
+    video.content_hash = hasher.hexdigest()
+    return video
+
+
+def _iter_archive_members(fileobj: BinaryIO, filename: str):
+    """Отдаёт пары (имя, открытый поток) для обычных файлов zip/tar-архива"""
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    else:
+        with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+            for info in archive:
+                if info.isfile():
+                    yield info.name, archive.extractfile(info)
+
+
+def extract_archive(
+        fileobj: BinaryIO,
+        filename: str,
+        max_size: int,
+        max_files: int,
+        chunk_size: int = 1024 * 1024,
+) -> list[tuple[str, IngestedVideo | Exception]]:
+    """
+    Распаковывает видео из архива во временные файлы, не загружая их целиком в память.
+
+    Ошибки отдельных файлов возвращаются вместо результата и не прерывают распаковку.
+    Файлов больше `max_files` — UploadTooLargeError для всего архива.
+    """
+    items: list[tuple[str, IngestedVideo | Exception]] = []
+    try:
+        fileobj.seek(0)
+        for name, member in _iter_archive_members(fileobj, filename):
+            if len(items) >= max_files:
+                raise UploadTooLargeError(f"В архиве больше {max_files} файлов")
+            if not is_video_name(name):
+                items.append((name, NotAVideoError("File must be a video")))
+                continue
+            try:
+                items.append((name, _copy_stream(member, os.path.splitext(name)[1], max_size, chunk_size)))
+            except UploadTooLargeError as e:
+                items.append((name, e))
+    except BaseException:
+        for _, item in items:
+            if isinstance(item, IngestedVideo):
+                item.cleanup()
+        raise
+    return items
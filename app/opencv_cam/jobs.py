@@ -0,0 +1,180 @@
+import asyncio
+import os
+
+from loguru import logger
+
+from app.dao.session_maker import DatabaseSessionManager
+from app.opencv_cam.dao import AnalysisRollupDAO, VideoAnalysisDAO
+from app.opencv_cam.events import EventBroadcaster, analysis_topic
+from app.opencv_cam.executor import AnalysisExecutor, AnalysisQueueFullError
+from app.opencv_cam.models import VIDEO_INFO_FIELDS, AnalysisStatus
+from app.opencv_cam.schemas import VideoIdFilter, VideoUpdate
+
+
+class AnalysisJobRunner:
+    """
+    Фоновое выполнение асинхронных задач анализа.
+
+    Задача получает уже сохранённую запись в статусе `pending` и путь к временному файлу,
+    ждёт свободного места в пуле анализа и записывает результат в ту же запись.
+    Смена статуса, прогресс и итог публикуются в `broadcaster` в тему `analysis:<id>`.
+    """
+
+    def __init__(
+            self,
+            executor: AnalysisExecutor,
+            session_manager: DatabaseSessionManager,
+            max_pending: int = 256,
+            broadcaster: EventBroadcaster | None = None,
+    ):
+        self.executor = executor
+        self.session_manager = session_manager
+        self.max_pending = max_pending
+        self.broadcaster = broadcaster or EventBroadcaster()
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._finished: dict[int, asyncio.Event] = {}
+        self._reserved = 0
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._tasks) + self._reserved >= self.max_pending
+
+    def reserve(self) -> None:
+        """
+        Занимает место в очереди до записи `pending` в базу.
+
+        Пока запрос ждёт коммита, очередь могут заполнить другие запросы; без резерва
+        submit после коммита отказал бы, и запись осталась бы `pending` без задачи.
+        Место переходит задаче в `submit(..., reserved=True)` или возвращается в `release`.
+        """
+        if self.is_full:
+            raise AnalysisQueueFullError("Очередь задач анализа заполнена")
+        self._reserved += 1
+
+    def release(self) -> None:
+        """Возвращает место, занятое `reserve`, если задача так и не была поставлена"""
+        self._reserved -= 1
+
+    def submit(self, analysis_id: int, video_path: str, detector: str | None = None, reserved: bool = False) -> None:
+        """Ставит задачу в очередь. Временный файл переходит во владение задачи"""
+        if not reserved and self.is_full:
+            raise AnalysisQueueFullError("Очередь задач анализа заполнена")
+        self._finished[analysis_id] = asyncio.Event()
+        task = asyncio.create_task(self._run(analysis_id, video_path, detector))
+        self._tasks[analysis_id] = task
+        task.add_done_callback(lambda _: self._on_done(analysis_id))
+        if reserved:
+            self._reserved -= 1
+
+    async def fail(self, analysis_id: int, error: str) -> None:
+        """Завершает с ошибкой запись `pending`, для которой задача не была поставлена"""
+        update = VideoUpdate(status=AnalysisStatus.FAILED, error=error[:500])
+        await self._update(analysis_id, update)
+        self._publish_result(analysis_id, update)
+
+    def has_job(self, analysis_id: int) -> bool:
+        """Выполняется ли задача в этом процессе"""
+        return analysis_id in self._tasks
+
+    async def wait(self, analysis_id: int, timeout: float) -> bool:
+        """Ждёт завершения задачи этого процесса. Возвращает False, если задача не завершилась за `timeout`"""
+        event = self._finished.get(analysis_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def shutdown(self, timeout: float | None = None) -> None:
+        """Дожидается текущих задач, незавершённые за `timeout` отменяются и помечаются как failed"""
+        if not self._tasks:
+            return
+        tasks = list(self._tasks.values())
+        logger.info(f"Ожидание завершения {len(tasks)} задач анализа")
+        _, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            await asyncio.wait(not_done)
+
+    def _on_done(self, analysis_id: int) -> None:
+        self._tasks.pop(analysis_id, None)
+        event = self._finished.pop(analysis_id, None)
+        if event is not None:
+            event.set()
+
+    def _publish_progress(self, analysis_id: int, progress: dict) -> None:
+        self.broadcaster.publish(analysis_topic(analysis_id), {
+            "event": "progress",
+            "analysis_id": analysis_id,
+            **progress,
+        })
+
+    def _publish_result(self, analysis_id: int, update: VideoUpdate) -> None:
+        data = {
+            "event": "result",
+            "analysis_id": analysis_id,
+            "status": update.status,
+            "progress": update.progress,
+            "has_movement": update.movement_detected,
+            "movement_percentage": update.movement_percentage,
+            "duration": update.duration,
+            "processing_time": update.processing_time,
+        }
+        if update.error:
+            data["error_message"] = update.error
+        self.broadcaster.publish(analysis_topic(analysis_id), data, final=True)
+
+    async def _run(self, analysis_id: int, video_path: str, detector: str | None = None) -> None:
+        try:
+            await self._update(analysis_id, VideoUpdate(status=AnalysisStatus.PROCESSING))
+            self.broadcaster.publish(analysis_topic(analysis_id), {
+                "event": "status",
+                "analysis_id": analysis_id,
+                "status": AnalysisStatus.PROCESSING,
+            })
+            result = await self.executor.analyze(
+                video_path,
+                wait=True,
+                on_progress=lambda progress: self._publish_progress(analysis_id, progress),
+                detector=detector,
+            )
+            update = VideoUpdate(
+                processing_time=result["processing_time"],
+                movement_detected=result["has_movement"],
+                error=result.get("error_message"),
+                status=result["status"],
+                progress=100.0,
+                movement_percentage=result["movement_percentage"],
+                duration=result["duration"],
+                timeline=result.get("timeline"),
+                analyzer_params=self.executor.params_for(detector),
+                **{field: result.get(field) for field in VIDEO_INFO_FIELDS},
+            )
+        except asyncio.CancelledError:
+            update = VideoUpdate(status=AnalysisStatus.FAILED, error="Анализ прерван остановкой сервиса")
+            await asyncio.shield(self._update(analysis_id, update))
+            self._publish_result(analysis_id, update)
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка задачи анализа {analysis_id}: {e}")
+            update = VideoUpdate(status=AnalysisStatus.FAILED, error=str(e)[:500])
+        finally:
+            if os.path.exists(video_path):
+                os.unlink(video_path)
+
+        await self._update(analysis_id, update)
+        self._publish_result(analysis_id, update)
+
+    async def _update(self, analysis_id: int, values: VideoUpdate) -> None:
+        try:
+            async with self.session_manager.create_session() as session:
+                async with self.session_manager.transaction(session):
+                    await VideoAnalysisDAO.update(session, filters=VideoIdFilter(id=analysis_id), values=values)
+                    # Завершённая задача попадает в итоги для /analyses/stats
+                    await AnalysisRollupDAO.record(session, [values])
+        except Exception as e:
+            logger.error(f"Не удалось обновить задачу анализа {analysis_id}: {e}")
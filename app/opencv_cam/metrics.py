@@ -1,4 +1,6 @@
-from prometheus_client import Counter, Histogram, Gauge
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, Gauge, multiprocess
 
 
 # Metrics
@@ -27,9 +29,109 @@ MOVEMENT_DETECTED = Counter(
 
 ACTIVE_REQUESTS = Gauge(
     'active_requests',
-    'Number of active requests being processed'
+    'Number of active requests being processed',
+    multiprocess_mode='livesum'
+)
+
+ANALYSIS_IN_FLIGHT = Gauge(
+    'analysis_in_flight',
+    'Number of videos currently analyzed or queued in the analysis pool',
+    multiprocess_mode='livesum'
+)
+
+ANALYSIS_REJECTED = Counter(
+    'analysis_rejected_total',
+    'Total number of analysis requests rejected because the pool was saturated'
+)
+
+RESULT_CACHE_HITS = Counter(
+    'result_cache_hits_total',
+    'Total number of analysis results served from cache',
+    ['tier']
+)
+
+RESULT_CACHE_MISSES = Counter(
+    'result_cache_misses_total',
+    'Total number of uploads that had to be analyzed'
+)
+
+WRITE_QUEUE_DEPTH = Gauge(
+    'analysis_write_queue_depth',
+    'Number of analysis records waiting for the write-behind flush',
+    multiprocess_mode='livesum'
+)
+
+WRITE_FLUSH_SECONDS = Histogram(
+    'analysis_write_flush_seconds',
+    'Time spent flushing one write-behind batch to the database',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+WRITE_BATCH_ROWS = Histogram(
+    'analysis_write_batch_rows',
+    'Number of analysis records inserted per write-behind flush',
+    buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500]
+)
+
+EVENT_SUBSCRIBERS = Gauge(
+    'event_subscribers',
+    'Number of connected progress and motion event subscribers',
+    multiprocess_mode='livesum'
 )
 
+EVENTS_DROPPED = Counter(
+    'events_dropped_total',
+    'Total number of events evicted from subscriber buffers because the client fell behind'
+)
+
+
+ANALYSIS_STAGE_SECONDS = Histogram(
+    'analysis_stage_seconds',
+    'Time spent in one stage of the analysis pipeline per video',
+    ['stage', 'detector'],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+FRAMES_DECODED = Counter(
+    'frames_decoded_total',
+    'Total number of video frames decoded, including frames skipped by sampling',
+    ['detector']
+)
+
+FRAMES_ANALYZED = Counter(
+    'frames_analyzed_total',
+    'Total number of sampled frames passed to the motion detector',
+    ['detector']
+)
+
+
+# Collectors computed on scrape from the state of this process (e.g. the DB pool);
+# the multiprocess registry cannot aggregate them, so they report the scraped worker only
+_PROCESS_COLLECTORS = []
+
+
+def register_process_collector(collector):
+    """Register a custom collector that reads the state of the current process"""
+    REGISTRY.register(collector)
+    _PROCESS_COLLECTORS.append(collector)
+
+
+def metrics_registry():
+    """Registry for /metrics: summed over all gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _PROCESS_COLLECTORS:
+        registry.register(collector)
+    return registry
+
+
+def record_stage_timings(detector: str, stages: dict[str, float]):
+    """Record per-stage timings of one analysis"""
+    for stage, seconds in stages.items():
+        ANALYSIS_STAGE_SECONDS.labels(stage=stage, detector=detector).observe(seconds)
+
 
 def record_video_metrics(status: str, processing_time: float, duration: float, has_movement: bool):
     """Record metrics for video processing"""
@@ -1,17 +1,93 @@
+from datetime import datetime
+from enum import StrEnum
+
 from sqlalchemy import (
+    TIMESTAMP,
     Integer,
     String,
     Boolean,
     Float,
+    Index,
+    JSON,
+    LargeBinary,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.dao.database import Base
 
 
+class AnalysisStatus(StrEnum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+# Сведения о видео, которые анализатор возвращает вместе с результатом
+VIDEO_INFO_FIELDS = ("fps", "width", "height", "total_frames", "analyzed_frames")
+
+
 class VideoAnalysis(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     filename: Mapped[str] = mapped_column(String, nullable=False)
-    processing_time: Mapped[float] = mapped_column(Float, nullable=False) # время анализа
-    movement_detected: Mapped[bool] = mapped_column(Boolean, nullable=False) # обнаружены движения или нет
+    processing_time: Mapped[float | None] = mapped_column(Float, nullable=True) # время анализа, пусто пока задача не завершена
+    movement_detected: Mapped[bool | None] = mapped_column(Boolean, nullable=True) # обнаружены движения или нет
     error: Mapped[str] = mapped_column(String, nullable=True)
+    status: Mapped[str] = mapped_column(String, nullable=False, server_default=AnalysisStatus.COMPLETED) # состояние задачи анализа
+    progress: Mapped[float] = mapped_column(Float, nullable=False, server_default="100") # прогресс анализа в процентах
+    movement_percentage: Mapped[float | None] = mapped_column(Float, nullable=True) # доля кадров с движением
+    duration: Mapped[float | None] = mapped_column(Float, nullable=True) # длительность видео в секундах
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True) # sha256 содержимого файла
+    params_fingerprint: Mapped[str | None] = mapped_column(String(16), nullable=True) # отпечаток параметров анализатора
+    # Покадровая шкала движения (см. app.opencv_cam.timeline), грузится только по запросу
+    timeline: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    fps: Mapped[float | None] = mapped_column(Float, nullable=True) # частота кадров видео
+    width: Mapped[int | None] = mapped_column(Integer, nullable=True) # разрешение исходного видео
+    height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total_frames: Mapped[int | None] = mapped_column(Integer, nullable=True) # кадров в видео
+    analyzed_frames: Mapped[int | None] = mapped_column(Integer, nullable=True) # из них проанализировано
+    analyzer_params: Mapped[dict | None] = mapped_column(JSON, nullable=True) # параметры анализатора (VideoAnalyzer.params)
+
+    __table_args__ = (
+        Index("ix_videoanalysiss_content_hash", "content_hash", "params_fingerprint"),
+        # Постраничная выдача истории по ключу (created_at, id)
+        Index("ix_videoanalysiss_created_at_id", "created_at", "id"),
+        # Видео с движением — обычно малая часть таблицы, частичный индекс под фильтр по ним
+        Index(
+            "ix_videoanalysiss_movement_created_at_id", "created_at", "id",
+            postgresql_where=text("movement_detected IS TRUE"),
+        ),
+        # LIKE 'prefix%' по имени файла при любой collation базы
+        Index("ix_videoanalysiss_filename_prefix", "filename", postgresql_ops={"filename": "varchar_pattern_ops"}),
+    )
+
+
+# Верхние границы интервалов гистограммы времени обработки, секунд; последний интервал — всё, что дольше
+PROCESSING_TIME_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+ROLLUP_COUNTERS = (
+    "total", "completed", "failed", "with_movement",
+    "processing_time_sum", "duration_sum",
+    *(f"pt_bucket_{i}" for i in range(len(PROCESSING_TIME_BUCKETS) + 1)),
+)
+
+
+class AnalysisRollup(Base):
+    """Почасовые итоги по завершённым анализам, пополняются вместе с записью результатов"""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, unique=True) # начало часа
+    total: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    with_movement: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    processing_time_sum: Mapped[float] = mapped_column(Float, nullable=False, server_default="0") # по завершённым
+    duration_sum: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    # Гистограмма времени обработки завершённых анализов по PROCESSING_TIME_BUCKETS
+    pt_bucket_0: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_1: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_2: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_3: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_4: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_5: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_6: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    pt_bucket_7: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
@@ -1,58 +1,793 @@
-from typing import Dict
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Literal
 
-from fastapi import APIRouter, HTTPException, UploadFile, Response, Depends
-from prometheus_client import generate_latest
+from fastapi import APIRouter, HTTPException, UploadFile, Response, Depends, Query, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dao.session_maker import TransactionSessionDep
-from app.opencv_cam.dao import VideoAnalysisDAO
-from app.opencv_cam.metrics import ACTIVE_REQUESTS
-from app.opencv_cam.schemas import VideoCreate, validate_video
-from app.opencv_cam.video_analizer_controller import VideoAnalyzer
+from app.config import get_settings
+from app.dao.database import current_engine
+from app.dao.pool import PoolCollector
+from app.dao.session_maker import SessionDep, TransactionSessionDep, session_manager
+from app.opencv_cam.cache import ResultCache
+from app.opencv_cam.dao import AnalysisRollupDAO, VideoAnalysisDAO
+from app.opencv_cam.detectors import DetectorKind, detector_profiles
+from app.opencv_cam.events import EventBroadcaster, EventMessage, analysis_topic, stream_topic
+from app.opencv_cam.executor import AnalysisExecutor, AnalysisQueueFullError
+from app.opencv_cam.ingest import (
+    TOO_LARGE_DETAIL,
+    IngestedVideo,
+    NotAVideoError,
+    UploadTooLargeError,
+    extract_archive,
+    ingest_upload,
+    is_archive,
+)
+from app.opencv_cam.jobs import AnalysisJobRunner
+from app.opencv_cam.metrics import (
+    ACTIVE_REQUESTS,
+    RESULT_CACHE_HITS,
+    RESULT_CACHE_MISSES,
+    metrics_registry,
+    record_stage_timings,
+    register_process_collector,
+)
+from app.opencv_cam.models import VIDEO_INFO_FIELDS, AnalysisStatus, VideoAnalysis
+from app.opencv_cam.sampling import FrameSampler
+from app.opencv_cam.schemas import (
+    AnalysisCursor,
+    AnalysisListFilter,
+    StreamCreate,
+    VideoCreate,
+    VideoPendingCreate,
+    validate_video,
+)
+from app.opencv_cam.stats import summarize_rollups
+from app.opencv_cam.streaming import StreamEvent, StreamLimitError, StreamMonitor, StreamSession
+from app.opencv_cam.timeline import bucketize_timeline, timeline_to_dict, unpack_timeline
+from app.opencv_cam.timing import Stage
+from app.opencv_cam.writer import AnalysisWriter
+from app.server import analysis_workers, available_cpus, server_processes
 
 router = APIRouter(prefix="", tags=["Cam API"])
-video_analyzer = VideoAnalyzer()
+
+# Метрики пула соединений сервиса в /metrics; до первого обращения к базе пул не создан и не виден
+register_process_collector(PoolCollector(current_engine))
+
+
+# Сервисы создаются при первом обращении (в lifespan), а не при импорте: импорт приложения
+# не читает настройки и не требует переменных DB_*
+@lru_cache(maxsize=1)
+def get_analysis_executor() -> AnalysisExecutor:
+    settings = get_settings()
+    return AnalysisExecutor(
+        # Под gunicorn ядра делятся между пулами всех воркеров
+        max_workers=analysis_workers(settings, available_cpus(), server_processes()),
+        queue_size=settings.ANALYSIS_QUEUE_SIZE,
+        analyzer_params={
+            "sampler": FrameSampler(
+                strategy=settings.SAMPLING_STRATEGY,
+                target_fps=settings.SAMPLING_FPS,
+                frame_count=settings.SAMPLING_FRAME_COUNT,
+            ),
+            "analysis_width": settings.ANALYSIS_WIDTH,
+            "motion_metric": settings.MOTION_METRIC,
+            "detector": settings.MOTION_DETECTOR,
+            "detector_params": settings.MOTION_DETECTOR_PARAMS,
+        },
+        segments=settings.ANALYSIS_SEGMENTS,
+        segment_min_frames=settings.ANALYSIS_SEGMENT_MIN_FRAMES,
+        timing_sample_rate=settings.ANALYSIS_TIMING_SAMPLE_RATE,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_event_broadcaster() -> EventBroadcaster:
+    return EventBroadcaster(buffer_size=get_settings().EVENT_BUFFER_SIZE)
+
+
+@lru_cache(maxsize=1)
+def get_job_runner() -> AnalysisJobRunner:
+    return AnalysisJobRunner(
+        get_analysis_executor(),
+        session_manager,
+        max_pending=get_settings().JOB_QUEUE_SIZE,
+        broadcaster=get_event_broadcaster(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> ResultCache:
+    settings = get_settings()
+    return ResultCache(max_size=settings.RESULT_CACHE_SIZE, ttl=settings.RESULT_CACHE_TTL)
+
+
+@lru_cache(maxsize=1)
+def get_analysis_writer() -> AnalysisWriter:
+    """Отложенная запись; запускается в lifespan, если включён WRITE_BEHIND"""
+    settings = get_settings()
+    return AnalysisWriter(
+        session_manager,
+        batch_size=settings.WRITE_BATCH_SIZE,
+        flush_interval=settings.WRITE_FLUSH_INTERVAL,
+        max_queue=settings.WRITE_QUEUE_SIZE,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_stream_monitor() -> StreamMonitor:
+    settings = get_settings()
+    return StreamMonitor(
+        analyzer_params={
+            "analysis_width": settings.ANALYSIS_WIDTH,
+            "motion_metric": settings.MOTION_METRIC,
+            "detector": settings.MOTION_DETECTOR,
+            "detector_params": settings.MOTION_DETECTOR_PARAMS,
+        },
+        max_streams=settings.STREAM_MAX,
+        analysis_threads=settings.STREAM_ANALYSIS_THREADS,
+    )
+
+
+# Интервал, с которым long-poll перечитывает запись, если задача выполняется в другом воркере
+JOB_POLL_INTERVAL = 1.0
+TERMINAL_STATUSES = (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Сервис перегружен. Повторите попытку позже",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _too_large_error() -> HTTPException:
+    return HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+
+
+def _analysis_to_dict(analysis: VideoAnalysis) -> Dict:
+    data = {
+        "analysis_id": analysis.id,
+        "filename": analysis.filename,
+        "status": analysis.status,
+        "progress": analysis.progress,
+        "has_movement": analysis.movement_detected,
+        "movement_percentage": analysis.movement_percentage,
+        "duration": analysis.duration,
+        "processing_time": analysis.processing_time,
+        **{field: getattr(analysis, field) for field in VIDEO_INFO_FIELDS},
+    }
+    if analysis.error:
+        data["error_message"] = analysis.error
+    return data
+
+
+def _public_result(result: Dict) -> Dict:
+    """Результат анализа без служебных полей, которые не отдаются клиенту"""
+    return {key: value for key, value in result.items() if key not in ("timeline", "timings")}
+
+
+def _timings_to_dict(stages: Dict[str, float], timings: Dict | None, analyzed_frames: int | None) -> Dict:
+    """Разбивка времени запроса по стадиям для ответа с ?debug=true"""
+    stages = {**stages, **(timings["stages"] if timings else {})}
+    ordered = {str(stage): round(stages[stage], 6) for stage in Stage if stage in stages}
+    return {
+        "sampled": bool(timings and timings["sampled"]),
+        "decoded_frames": timings["decoded_frames"] if timings else 0,
+        "analyzed_frames": analyzed_frames or 0,
+        "stages": ordered,
+    }
+
+
+def _make_record(
+        filename: str, result: Dict, video: IngestedVideo, detector: DetectorKind | None = None,
+) -> VideoCreate:
+    error = result.get("error_message")
+    # Границы вместо точной доли (decision_only) не годятся как источник для кэша
+    exact = result.get("percentage_bound") is None
+    executor = get_analysis_executor()
+    return VideoCreate(
+        filename=filename[:255],
+        processing_time=result["processing_time"],
+        movement_detected=result["has_movement"],
+        error=error[:500] if error else None,
+        status=result["status"],
+        movement_percentage=result["movement_percentage"],
+        duration=result["duration"],
+        timeline=result.get("timeline"),
+        content_hash=video.content_hash if exact else None,
+        params_fingerprint=executor.fingerprint_for(detector),
+        analyzer_params=executor.params_for(detector),
+        **{field: result.get(field) for field in VIDEO_INFO_FIELDS},
+    )
+
+
+async def _save_record(session: AsyncSession, record: VideoCreate) -> int:
+    """Сохраняет результат: через отложенную пакетную запись, если она запущена, иначе в транзакции запроса"""
+    writer = get_analysis_writer()
+    if writer.is_running:
+        return await writer.add(record)
+    saved = await VideoAnalysisDAO.add(session=session, values=record)
+    await AnalysisRollupDAO.record(session, [record])
+    return saved.id
+
+
+async def _find_cached_result(
+        session: AsyncSession, content_hash: str, detector: DetectorKind | None = None,
+) -> Dict | None:
+    """Ищет готовый результат для того же содержимого и детектора: сначала в памяти, затем в базе"""
+    fingerprint = get_analysis_executor().fingerprint_for(detector)
+    result_cache = get_result_cache()
+    result = result_cache.get(content_hash, fingerprint)
+    if result is not None:
+        RESULT_CACHE_HITS.labels(tier="memory").inc()
+        return result
+
+    result = await VideoAnalysisDAO.find_cached_result(session, content_hash, fingerprint)
+    if result is not None:
+        RESULT_CACHE_HITS.labels(tier="db").inc()
+        result_cache.set(content_hash, fingerprint, result)
+        return result
+
+    RESULT_CACHE_MISSES.inc()
+    return None
+
+
+async def _release_connection(session: AsyncSession) -> None:
+    """
+    Завершает транзакцию чтения кэша: соединение возвращается в пул на время анализа
+    и берётся заново только для записи результата. Иначе число одновременных анализов
+    ограничивал бы пул соединений, а не пул процессов.
+    """
+    await session.commit()
 
 
 @router.post("/analyze")
 async def get_analyze_video(
+        response: Response,
         file: UploadFile = Depends(validate_video),
+        async_mode: bool = Query(False, alias="async", description="Поставить анализ в очередь и сразу вернуть id"),
+        decision_only: bool = Query(False, description="Остановить анализ, как только известен has_movement"),
+        detector: DetectorKind | None = Query(None, description="Детектор движения; по умолчанию MOTION_DETECTOR"),
+        debug: bool = Query(False, description="Добавить в ответ разбивку времени по стадиям анализа"),
         session: AsyncSession = TransactionSessionDep
 ) -> Dict:
     """Принимает видеофайл, запускает анализ и возвращает результат"""
+    if async_mode:
+        return await _submit_analysis_job(file, session, response, detector)
+
+    settings = get_settings()
+    executor = get_analysis_executor()
+    video: IngestedVideo | None = None
     try:
         ACTIVE_REQUESTS.inc()
 
-        analysis_result = video_analyzer.analyze_video(file)
+        # Стадии запроса вне пула; стадии анализа приходят из воркера в timings
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
+        video = await ingest_upload(
+            file,
+            max_size=settings.UPLOAD_MAX_SIZE,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            allow_zero_copy=True,
+        )
+        stages[Stage.UPLOAD] = time.perf_counter() - started
         filename = file.filename or "unknown"
 
-        db_analysis = VideoCreate(
-            filename=filename,
-            processing_time=analysis_result["processing_time"],
-            movement_detected=analysis_result["has_movement"],
-            error=analysis_result.get("error_message")
-        )
+        analysis_result = await _find_cached_result(session, video.content_hash, detector)
+        cached = analysis_result is not None
+        timings = None
+        if not cached:
+            await _release_connection(session)
+            analysis_result = await executor.analyze(
+                video.path, decision_only=decision_only, detector=detector, timed=debug,
+            )
+            timings = analysis_result.pop("timings", None)
+            if analysis_result["status"] == AnalysisStatus.COMPLETED and not analysis_result.get("percentage_bound"):
+                get_result_cache().set(video.content_hash, executor.fingerprint_for(detector), analysis_result)
+
+        db_analysis = _make_record(filename, analysis_result, video, detector)
 
-        db_save_analysis = await VideoAnalysisDAO.add(session=session, values=db_analysis)
+        started = time.perf_counter()
+        analysis_id = await _save_record(session, db_analysis)
+        stages[Stage.SAVE] = time.perf_counter() - started
+        record_stage_timings(executor.detector_name(detector), stages)
 
         response_data = {
-            "analysis_id": db_save_analysis.id,
+            "analysis_id": analysis_id,
             "filename": filename,
             "has_movement": analysis_result["has_movement"],
             "movement_percentage": analysis_result["movement_percentage"],
             "duration": analysis_result["duration"],
             "processing_time": analysis_result["processing_time"],
-            "status": analysis_result["status"]
+            "status": analysis_result["status"],
+            "cached": cached
         }
 
         if analysis_result.get("error_message"):
             response_data["error_message"] = analysis_result["error_message"]
+        if analysis_result.get("percentage_bound"):
+            response_data["percentage_bound"] = analysis_result["percentage_bound"]
+        if debug:
+            response_data["timings"] = _timings_to_dict(stages, timings, analysis_result.get("analyzed_frames"))
 
         return response_data
+    except AnalysisQueueFullError:
+        raise _queue_full_error()
+    except UploadTooLargeError:
+        raise _too_large_error()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Ошибка сервера. Повторите попытку позже")
+    finally:
+        ACTIVE_REQUESTS.dec()
+        if video is not None:
+            video.cleanup()
+
+
+async def _submit_analysis_job(
+        file: UploadFile, session: AsyncSession, response: Response, detector: DetectorKind | None = None,
+) -> Dict:
+    """Сохраняет запись в статусе pending и передаёт видео фоновой задаче"""
+    settings = get_settings()
+    job_runner = get_job_runner()
+    try:
+        job_runner.reserve()
+    except AnalysisQueueFullError:
+        raise _queue_full_error()
+
+    reserved = True
+    video: IngestedVideo | None = None
+    try:
+        # Файл загрузки закрывается вместе с запросом, поэтому задаче нужна своя копия
+        video = await ingest_upload(
+            file,
+            max_size=settings.UPLOAD_MAX_SIZE,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        )
+        filename = file.filename or "unknown"
+
+        cached_result = await _find_cached_result(session, video.content_hash, detector)
+        await _release_connection(session)
+        if cached_result is not None:
+            # Результат уже известен — задача не нужна
+            analysis_id = await _save_record(session, _make_record(filename, cached_result, video, detector))
+            return {"analysis_id": analysis_id, "filename": filename, **_public_result(cached_result), "cached": True}
+
+        pending = await VideoAnalysisDAO.add(session=session, values=VideoPendingCreate(
+            filename=filename,
+            status=AnalysisStatus.PENDING,
+            progress=0.0,
+            content_hash=video.content_hash,
+            params_fingerprint=get_analysis_executor().fingerprint_for(detector),
+        ))
+        # Коммитим сразу: фоновая задача обновляет запись в своей сессии
+        await session.commit()
+
+        try:
+            job_runner.submit(pending.id, video.path, detector, reserved=True)
+        except Exception as e:
+            # Запись уже видна клиентам и не должна остаться pending без задачи
+            await job_runner.fail(pending.id, f"Не удалось поставить задачу: {e}")
+            raise
+        reserved = False
+        video = None
+    except AnalysisQueueFullError:
+        raise _queue_full_error()
+    except UploadTooLargeError:
+        raise _too_large_error()
     except Exception:
         raise HTTPException(status_code=500, detail="Ошибка сервера. Повторите попытку позже")
+    finally:
+        if reserved:
+            job_runner.release()
+        if video is not None:
+            video.cleanup()
+
+    response.status_code = 202
+    return {
+        "analysis_id": pending.id,
+        "filename": filename,
+        "status": AnalysisStatus.PENDING,
+    }
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+        files: list[UploadFile] = File(..., description="Видеофайлы и/или zip/tar-архивы с видео"),
+        decision_only: bool = Query(False, description="Остановить анализ, как только известен has_movement"),
+        detector: DetectorKind | None = Query(None, description="Детектор движения; по умолчанию MOTION_DETECTOR"),
+        session: AsyncSession = TransactionSessionDep
+) -> Dict:
+    """
+    Анализирует несколько видео за один запрос.
+
+    Файлы анализируются параллельно в пуле, все результаты сохраняются одной пачкой.
+    Ошибка отдельного файла попадает в его элемент ответа и не отменяет остальные.
+    """
+    items: list[tuple[str, IngestedVideo | Exception]] = []
+    try:
+        ACTIVE_REQUESTS.inc()
+        await _ingest_batch(files, items)
+
+        results = await _analyze_batch(session, items, decision_only, detector)
+
+        saved_indexes = [i for i, result in enumerate(results) if isinstance(result, dict)]
+        records = [_make_record(items[i][0], results[i], items[i][1], detector) for i in saved_indexes]
+        saved = await VideoAnalysisDAO.add_many(session=session, values=records) if records else []
+        await AnalysisRollupDAO.record(session, records)
+        analysis_ids = {i: record.id for i, record in zip(saved_indexes, saved)}
+
+        response_items = []
+        for i, (filename, _) in enumerate(items):
+            result = results[i]
+            if isinstance(result, dict):
+                response_items.append({"filename": filename, "analysis_id": analysis_ids[i], **_public_result(result)})
+            else:
+                response_items.append({"filename": filename, "status": AnalysisStatus.FAILED, "error_message": str(result)})
+
+        failed = sum(1 for item in response_items if item["status"] != AnalysisStatus.COMPLETED)
+        return {
+            "total": len(response_items),
+            "completed": len(response_items) - failed,
+            "failed": failed,
+            "results": response_items,
+        }
+    except AnalysisQueueFullError:
+        raise _queue_full_error()
+    except UploadTooLargeError:
+        raise _too_large_error()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Ошибка сервера. Повторите попытку позже")
+    finally:
+        ACTIVE_REQUESTS.dec()
+        for _, item in items:
+            if isinstance(item, IngestedVideo):
+                item.cleanup()
+
+
+async def _ingest_batch(files: list[UploadFile], items: list[tuple[str, IngestedVideo | Exception]]) -> None:
+    """Сохраняет файлы пачки на диск, распаковывая архивы. Заполняет `items` по ходу, чтобы их можно было удалить при ошибке"""
+    settings = get_settings()
+    for upload in files:
+        filename = upload.filename or "unknown"
+        if is_archive(filename):
+            items.extend(await run_in_threadpool(
+                extract_archive,
+                upload.file,
+                filename,
+                settings.UPLOAD_MAX_SIZE,
+                settings.BATCH_MAX_FILES - len(items),
+                settings.UPLOAD_CHUNK_SIZE,
+            ))
+        elif not upload.content_type or not upload.content_type.startswith("video/"):
+            items.append((filename, NotAVideoError("File must be a video")))
+        else:
+            try:
+                items.append((filename, await ingest_upload(
+                    upload,
+                    max_size=settings.UPLOAD_MAX_SIZE,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                    allow_zero_copy=True,
+                )))
+            except UploadTooLargeError as e:
+                items.append((filename, e))
+
+        if len(items) > settings.BATCH_MAX_FILES:
+            raise UploadTooLargeError(f"В пачке больше {settings.BATCH_MAX_FILES} файлов")
+
+
+async def _analyze_batch(
+        session: AsyncSession,
+        items: list[tuple[str, IngestedVideo | Exception]],
+        decision_only: bool = False,
+        detector: DetectorKind | None = None,
+) -> list[Dict | Exception]:
+    """Результаты по файлам пачки: из кэша или из пула; одинаковое содержимое анализируется один раз"""
+    results: list[Dict | Exception | None] = []
+    for _, item in items:
+        if isinstance(item, Exception):
+            results.append(item)
+            continue
+        # Сессия не допускает конкурентных запросов, поэтому кэш проверяется последовательно
+        cached = await _find_cached_result(session, item.content_hash, detector)
+        results.append({**cached, "cached": True} if cached is not None else None)
+    await _release_connection(session)
+
+    paths_by_hash = {
+        item.content_hash: item.path
+        for (_, item), result in zip(items, results)
+        if result is None
+    }
+    hashes = list(paths_by_hash)
+    executor = get_analysis_executor()
+    analyses = await asyncio.gather(
+        *(
+            executor.analyze(paths_by_hash[content_hash], wait=True, decision_only=decision_only, detector=detector)
+            for content_hash in hashes
+        ),
+        return_exceptions=True,
+    )
+    analyzed = dict(zip(hashes, analyses))
+    for content_hash, result in analyzed.items():
+        if isinstance(result, dict):
+            # Замеры стадий уже учтены в метриках пулом и не должны попасть в кэш
+            result.pop("timings", None)
+        if isinstance(result, dict) and result["status"] == AnalysisStatus.COMPLETED and not result.get("percentage_bound"):
+            get_result_cache().set(content_hash, executor.fingerprint_for(detector), result)
+
+    for i, ((_, item), result) in enumerate(zip(items, results)):
+        if result is None:
+            result = analyzed[item.content_hash]
+            results[i] = {**result, "cached": False} if isinstance(result, dict) else result
+    return results
+
+
+@router.get("/analyses")
+async def list_analyses(
+        limit: int = Query(50, ge=1, le=500, description="Записей на странице"),
+        cursor: str | None = Query(None, description="next_cursor предыдущей страницы"),
+        movement_detected: bool | None = Query(None),
+        filename_prefix: str | None = Query(None, min_length=1, max_length=255),
+        created_from: datetime | None = Query(None, description="Не раньше (включительно)"),
+        created_to: datetime | None = Query(None, description="Раньше (не включительно)"),
+        session: AsyncSession = SessionDep
+) -> Dict:
+    """История анализов от новых к старым с постраничной выдачей по курсору"""
+    try:
+        after = AnalysisCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = AnalysisListFilter(
+        movement_detected=movement_detected,
+        filename_prefix=filename_prefix,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    # Лишняя запись показывает, есть ли следующая страница
+    records = await VideoAnalysisDAO.find_page(session, filters, limit=limit + 1, after=after)
+    page = records[:limit]
+    next_cursor = None
+    if len(records) > limit:
+        last = page[-1]
+        next_cursor = AnalysisCursor(created_at=last.created_at, id=last.id).encode()
+
+    return {
+        "items": [{**_analysis_to_dict(record), "created_at": record.created_at} for record in page],
+        "next_cursor": next_cursor,
+    }
+
+
+# Длина интервала статистики и период по умолчанию
+STATS_BUCKETS = {"hour": (timedelta(hours=1), timedelta(days=1)), "day": (timedelta(days=1), timedelta(days=30))}
+
+
+@router.get("/analyses/stats")
+async def analyses_stats(
+        bucket: Literal["hour", "day"] = Query("hour", description="Интервал группировки"),
+        completed_from: datetime | None = Query(
+            None, description="Начало периода по времени завершения (UTC); по умолчанию сутки или 30 дней назад",
+        ),
+        completed_to: datetime | None = Query(None, description="Конец периода по времени завершения (UTC); по умолчанию сейчас"),
+        session: AsyncSession = SessionDep
+) -> Dict:
+    """
+    Число анализов, доля видео с движением и перцентили времени обработки по интервалам.
+
+    Считается по почасовым итогам, которые пополняются при записи результатов,
+    а не по таблице анализов, поэтому стоимость запроса зависит только от длины периода.
+    Анализ попадает в интервал, в котором он завершился, а не в котором был создан.
+    """
+    step, default_period = STATS_BUCKETS[bucket]
+    end = completed_to or datetime.now(timezone.utc).replace(tzinfo=None)
+    start = completed_from or end - default_period
+    rollups = await AnalysisRollupDAO.find_range(session, start, end)
+    items, totals = summarize_rollups(rollups, step)
+    return {"bucket": bucket, "from": start, "to": end, "totals": totals, "items": items}
+
+
+@router.get("/analyze/{analysis_id}")
+async def get_analysis(
+        analysis_id: int,
+        wait: float = Query(0.0, ge=0, le=60, description="Сколько секунд ждать завершения задачи (long-poll)"),
+        session: AsyncSession = SessionDep
+) -> Dict:
+    """Возвращает состояние и результат анализа по id"""
+    analysis = await VideoAnalysisDAO.find_one_or_none_by_id(analysis_id, session)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Анализ не найден")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while analysis.status in (AnalysisStatus.PENDING, AnalysisStatus.PROCESSING):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        # Закрываем сессию, чтобы не держать соединение из пула на время ожидания
+        await session.close()
+        await get_job_runner().wait(analysis_id, min(remaining, JOB_POLL_INTERVAL))
+        analysis = await VideoAnalysisDAO.find_one_or_none_by_id(analysis_id, session)
+        if analysis is None:
+            raise HTTPException(status_code=404, detail="Анализ не найден")
+
+    return _analysis_to_dict(analysis)
+
+
+@router.get("/analyze/{analysis_id}/events")
+async def get_analysis_events(analysis_id: int, session: AsyncSession = SessionDep) -> StreamingResponse:
+    """
+    Server-Sent Events по асинхронной задаче: статус, прогресс (кадры, текущая доля движения) и итог.
+
+    Поток закрывается после события `result`.
+    """
+    if await VideoAnalysisDAO.find_one_or_none_by_id(analysis_id, session) is None:
+        raise HTTPException(status_code=404, detail="Анализ не найден")
+    await session.close()
+    return StreamingResponse(
+        _analysis_event_stream(analysis_id, session), media_type="text/event-stream", headers=SSE_HEADERS,
+    )
+
+
+async def _read_analysis_event(analysis_id: int, session: AsyncSession) -> Dict | None:
+    analysis = await VideoAnalysisDAO.find_one_or_none_by_id(analysis_id, session)
+    # Не держим соединение из пула, пока ждём событий
+    await session.close()
+    if analysis is None:
+        return None
+    event = "result" if analysis.status in TERMINAL_STATUSES else "status"
+    return {"event": event, **_analysis_to_dict(analysis)}
+
+
+async def _analysis_event_stream(analysis_id: int, session: AsyncSession):
+    with get_event_broadcaster().subscribe(analysis_topic(analysis_id)) as subscription:
+        # Запись читается уже после подписки, чтобы не пропустить завершение между ними
+        data = await _read_analysis_event(analysis_id, session)
+        if data is None:
+            return
+        yield EventMessage.create(data).encoded
+        if data["event"] == "result":
+            return
+
+        while True:
+            # Задача другого воркера сюда не публикует — тогда запись перечитывается периодически
+            timeout = None if get_job_runner().has_job(analysis_id) else JOB_POLL_INTERVAL
+            message = await subscription.get(timeout)
+            if message is not None:
+                yield message.encoded
+                continue
+            if subscription.closed:
+                return
+            data = await _read_analysis_event(analysis_id, session)
+            if data is None or data["event"] == "result":
+                if data is not None:
+                    yield EventMessage.create(data).encoded
+                return
+
+
+@router.get("/analyze/{analysis_id}/timeline")
+async def get_analysis_timeline(
+        analysis_id: int,
+        bucket: float | None = Query(None, gt=0, description="Свернуть точки в интервалы по столько секунд"),
+        session: AsyncSession = SessionDep
+) -> Dict:
+    """Возвращает покадровую шкалу движения: время, площадь наибольшего контура и долю изменившихся пикселей"""
+    found, data = await VideoAnalysisDAO.find_timeline(session, analysis_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Анализ не найден")
+
+    points = unpack_timeline(data)
+    if bucket:
+        points = bucketize_timeline(points, bucket)
+    return {"analysis_id": analysis_id, "bucket": bucket, "points": len(points), **timeline_to_dict(points)}
+
+
+def _stream_source_allowed(source: str) -> bool:
+    scheme = source.split("://", 1)[0].lower() if "://" in source else "file"
+    return scheme in get_settings().STREAM_ALLOWED_SCHEMES
+
+
+def _require_streams() -> None:
+    """
+    Потоки и их события хранятся в памяти процесса: запрос к другому воркеру gunicorn потока не найдёт.
+    Поэтому при нескольких воркерах эндпоинты /streams отключены, а потоки обслуживает
+    отдельный однопроцессный сервис; STREAMS_ENABLED=false отключает их и в одном процессе.
+    """
+    if not get_settings().STREAMS_ENABLED or server_processes() > 1:
+        raise HTTPException(status_code=503, detail="Потоки обслуживает отдельный процесс сервиса")
+
+
+StreamsDep = Depends(_require_streams)
+
+
+@router.post("/streams", status_code=201, dependencies=[StreamsDep])
+async def open_stream(data: StreamCreate) -> Dict:
+    """Запускает непрерывный анализ потока; события движения доступны в GET /streams/{stream_id}"""
+    if not _stream_source_allowed(data.source):
+        raise HTTPException(status_code=400, detail="Недопустимый источник потока")
+
+    settings = get_settings()
+    options = {
+        "sample_fps": data.sample_fps if data.sample_fps is not None else settings.STREAM_SAMPLE_FPS,
+        "window_size": data.window_size if data.window_size is not None else settings.STREAM_WINDOW,
+        "start_ratio": data.start_ratio if data.start_ratio is not None else settings.STREAM_START_RATIO,
+    }
+    if data.detector is not None:
+        options["detector"] = data.detector
+    stream_id = data.stream_id or uuid.uuid4().hex
+    try:
+        on_event = get_event_broadcaster().threadsafe_publisher(stream_topic(stream_id), final_events={StreamEvent.STREAM_END})
+        session = get_stream_monitor().open(stream_id, data.source, on_event, **options)
+    except StreamLimitError:
+        raise _queue_full_error()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.status()
+
+
+@router.get("/streams", dependencies=[StreamsDep])
+async def list_streams() -> Dict:
+    """Состояние всех потоков, включая завершившиеся и ещё не закрытые"""
+    return {"items": [session.status() for session in get_stream_monitor().list()]}
+
+
+@router.get("/streams/{stream_id}", dependencies=[StreamsDep])
+async def get_stream(stream_id: str) -> Dict:
+    """Состояние потока и его последние события"""
+    session = get_stream_monitor().get(stream_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Поток не найден")
+    return {**session.status(), "events": list(session.events)}
+
+
+@router.get("/streams/{stream_id}/events", dependencies=[StreamsDep])
+async def get_stream_events(stream_id: str) -> StreamingResponse:
+    """Server-Sent Events потока: начало и конец движения; закрывается событием `stream_end`"""
+    session = get_stream_monitor().get(stream_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Поток не найден")
+    return StreamingResponse(_stream_event_stream(session), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def _stream_event_stream(stream: StreamSession):
+    with get_event_broadcaster().subscribe(stream_topic(stream.stream_id)) as subscription:
+        yield EventMessage.create({"event": "status", **stream.status()}).encoded
+        # Если поток завершился раньше подписки, его события уже разосланы: отдаём сохранённые
+        replay = not stream.is_running
+        while not replay:
+            message = await subscription.get(JOB_POLL_INTERVAL)
+            if message is not None:
+                yield message.encoded
+            elif subscription.closed:
+                return
+            else:
+                replay = not stream.is_running
+        for data in list(stream.events):
+            yield EventMessage.create(data).encoded
+
+
+@router.delete("/streams/{stream_id}", status_code=204, dependencies=[StreamsDep])
+async def close_stream(stream_id: str) -> Response:
+    """Останавливает анализ потока"""
+    closed = await run_in_threadpool(get_stream_monitor().close, stream_id, get_settings().ANALYSIS_SHUTDOWN_TIMEOUT)
+    if not closed:
+        raise HTTPException(status_code=404, detail="Поток не найден")
+    return Response(status_code=204)
+
+
+@router.get("/detectors")
+async def list_detectors() -> Dict:
+    """Доступные детекторы движения с профилями стоимости и детектор по умолчанию"""
+    return {"default": get_settings().MOTION_DETECTOR, "items": detector_profiles()}
 
 
 @router.get("/metrics")
 async def get_metrics():
-    """Отдаёт метрики в формате Prometheus"""
-    return Response(generate_latest(), media_type="text/plain")
\ No newline at end of file
+    """Отдаёт метрики в формате Prometheus; под gunicorn — суммарно по всем воркерам"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
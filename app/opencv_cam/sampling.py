@@ -0,0 +1,112 @@
+from enum import StrEnum
+from typing import Iterator, Sequence
+
+import cv2
+import numpy as np
+
+from app.opencv_cam.timing import StageTimer
+
+
+class SamplingStrategy(StrEnum):
+    FIXED_FPS = "fixed_fps"  # равномерно, `target_fps` кадров в секунду
+    FIXED_COUNT = "fixed_count"  # ровно `frame_count` кадров по всей длине видео
+    KEYFRAMES = "keyframes"  # только ключевые кадры контейнера
+
+
+class FrameSampler:
+    """
+    Выбирает кадры для анализа и декодирует только их.
+
+    Пропущенные кадры проматываются через `grab()` (без конвертации в BGR), а промежутки
+    длиннее `seek_threshold` — перемоткой `CAP_PROP_POS_FRAMES`, если контейнер её поддерживает.
+    Перемотка в OpenCV сама докодирует до нужного кадра, поэтому на коротких промежутках она не выгодна.
+    """
+
+    def __init__(
+            self,
+            strategy: SamplingStrategy = SamplingStrategy.FIXED_FPS,
+            target_fps: float = 2.0,
+            frame_count: int = 100,
+            seek_threshold: int = 120,
+    ):
+        self.strategy = SamplingStrategy(strategy)
+        self.target_fps = target_fps
+        self.frame_count = frame_count
+        self.seek_threshold = seek_threshold
+
+    @property
+    def params(self) -> dict:
+        return {
+            "strategy": str(self.strategy),
+            "target_fps": self.target_fps,
+            "frame_count": self.frame_count,
+        }
+
+    def sample_indices(self, video_path: str, fps: float, total_frames: int) -> Sequence[int]:
+        """Номера кадров (с нуля), которые будут проанализированы"""
+        if self.strategy == SamplingStrategy.FIXED_COUNT:
+            count = min(self.frame_count, total_frames)
+            return np.unique(np.linspace(0, total_frames - 1, count).astype(int)).tolist()
+        if self.strategy == SamplingStrategy.KEYFRAMES:
+            return self._keyframe_indices(video_path) or range(0, total_frames, max(1, int(fps)))
+        step = max(1, int(fps // self.target_fps)) if self.target_fps > 0 else 1
+        return range(step - 1, total_frames, step)
+
+    def iter_frames(
+            self, cap: cv2.VideoCapture, indices: Sequence[int], timer: StageTimer | None = None,
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Отдаёт пары (номер кадра, кадр BGR) для кадров из `indices` (по возрастанию).
+
+        Число успешных grab() — декодированных кадров — добавляется в `timer.decoded_frames`.
+        """
+        position = 0  # номер кадра, который вернёт следующий grab()
+        decoded = 0
+
+        try:
+            for index in indices:
+                gap = index - position
+                if gap > self.seek_threshold and self._seek(cap, index):
+                    position = index
+                while position < index:
+                    if not cap.grab():
+                        return
+                    position += 1
+                    decoded += 1
+
+                if not cap.grab():
+                    return
+                position += 1
+                decoded += 1
+                ret, frame = cap.retrieve()
+                if not ret:
+                    return
+                yield index, frame
+        finally:
+            if timer is not None:
+                timer.decoded_frames += decoded
+
+    @staticmethod
+    def _seek(cap: cv2.VideoCapture, index: int) -> bool:
+        if not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+            return False
+        return int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == index
+
+    @staticmethod
+    def _keyframe_indices(video_path: str) -> list[int]:
+        """Находит ключевые кадры, читая пакеты контейнера без декодирования (только FFmpeg)"""
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            return []
+        try:
+            if not cap.set(cv2.CAP_PROP_FORMAT, -1):
+                return []
+            keyframes = []
+            index = 0
+            while cap.grab():
+                if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                    keyframes.append(index)
+                index += 1
+            return keyframes
+        finally:
+            cap.release()
@@ -1,5 +1,12 @@
+import base64
+import json
+from datetime import datetime
+
 from fastapi import UploadFile, File, HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+
+from app.opencv_cam.detectors import DetectorKind
+from app.opencv_cam.models import AnalysisStatus
 
 
 class VideoBase(BaseModel):
@@ -11,10 +18,112 @@ class VideoBase(BaseModel):
 
 class VideoCreate(VideoBase):
     """Схема для создания новой записи"""
-    pass
+    status: str = Field(AnalysisStatus.COMPLETED, max_length=20, description="Состояние анализа")
+    movement_percentage: float | None = Field(None, ge=0, le=100, description="Доля кадров с движением")
+    duration: float | None = Field(None, ge=0, description="Длительность видео в секундах")
+    content_hash: str | None = Field(None, max_length=64, description="sha256 содержимого файла")
+    params_fingerprint: str | None = Field(None, max_length=16, description="Отпечаток параметров анализатора")
+    timeline: bytes | None = Field(None, description="Покадровая шкала движения")
+    fps: float | None = Field(None, ge=0, description="Частота кадров видео")
+    width: int | None = Field(None, ge=0, description="Ширина кадра исходного видео")
+    height: int | None = Field(None, ge=0, description="Высота кадра исходного видео")
+    total_frames: int | None = Field(None, ge=0, description="Кадров в видео")
+    analyzed_frames: int | None = Field(None, ge=0, description="Проанализировано кадров")
+    analyzer_params: dict | None = Field(None, description="Параметры анализатора")
+
+
+class VideoPendingCreate(BaseModel):
+    """Схема для записи об асинхронной задаче, поставленной в очередь"""
+    filename: str = Field(..., min_length=1, max_length=255, description="Название файла")
+    status: str = Field(..., max_length=20, description="Состояние анализа")
+    progress: float = Field(..., ge=0, le=100, description="Прогресс анализа в процентах")
+    content_hash: str | None = Field(None, max_length=64, description="sha256 содержимого файла")
+    params_fingerprint: str | None = Field(None, max_length=16, description="Отпечаток параметров анализатора")
+
+
+class VideoUpdate(BaseModel):
+    """Схема для обновления состояния задачи анализа"""
+    processing_time: float | None = Field(None, ge=0, description="Время обработки в секундах")
+    movement_detected: bool | None = Field(None, description="Наличие движения в видео")
+    error: str | None = Field(None, max_length=500, description="Сообщение об ошибке")
+    status: str | None = Field(None, max_length=20, description="Состояние анализа")
+    progress: float | None = Field(None, ge=0, le=100, description="Прогресс анализа в процентах")
+    movement_percentage: float | None = Field(None, ge=0, le=100, description="Доля кадров с движением")
+    duration: float | None = Field(None, ge=0, description="Длительность видео в секундах")
+    timeline: bytes | None = Field(None, description="Покадровая шкала движения")
+    fps: float | None = Field(None, ge=0, description="Частота кадров видео")
+    width: int | None = Field(None, ge=0, description="Ширина кадра исходного видео")
+    height: int | None = Field(None, ge=0, description="Высота кадра исходного видео")
+    total_frames: int | None = Field(None, ge=0, description="Кадров в видео")
+    analyzed_frames: int | None = Field(None, ge=0, description="Проанализировано кадров")
+    analyzer_params: dict | None = Field(None, description="Параметры анализатора")
+
+
+class VideoBulkUpdate(VideoUpdate):
+    """Обновление записи по id в пакетных пересчётах (BaseDAO.bulk_update)"""
+    id: int
+
+
+class VideoIdFilter(BaseModel):
+    """Фильтр записи по идентификатору"""
+    id: int
+
+
+class AnalysisListFilter(BaseModel):
+    """Фильтры истории анализов"""
+    movement_detected: bool | None = None
+    filename_prefix: str | None = Field(None, min_length=1, max_length=255)
+    created_from: datetime | None = None  # включительно
+    created_to: datetime | None = None  # не включительно
+
+
+class AnalysisCursor(BaseModel):
+    """Позиция в истории анализов: ключ последней отданной записи"""
+    created_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        payload = json.dumps({"c": self.created_at.isoformat(), "i": self.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "AnalysisCursor":
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(created_at=payload["c"], id=payload["i"])
+        except (ValueError, KeyError, TypeError, ValidationError) as e:
+            raise ValueError("Некорректный курсор") from e
+
+
+class AnalysisRollupIncrement(BaseModel):
+    """Прибавка к почасовым итогам (AnalysisRollup)"""
+    bucket_start: datetime
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    with_movement: int = 0
+    processing_time_sum: float = 0.0
+    duration_sum: float = 0.0
+    pt_bucket_0: int = 0
+    pt_bucket_1: int = 0
+    pt_bucket_2: int = 0
+    pt_bucket_3: int = 0
+    pt_bucket_4: int = 0
+    pt_bucket_5: int = 0
+    pt_bucket_6: int = 0
+    pt_bucket_7: int = 0
 
 
 async def validate_video(file: UploadFile = File(...)) -> UploadFile:
     if not file.content_type or not file.content_type.startswith("video/"):
         raise HTTPException(400, "File must be a video")
-    return file
\ No newline at end of file
+    return file
+
+class StreamCreate(BaseModel):
+    """Схема запуска анализа потока"""
+    source: str = Field(..., min_length=1, max_length=2048, description="URL потока или путь к файлу")
+    stream_id: str | None = Field(None, min_length=1, max_length=64, pattern=r"^[\w.-]+$", description="Идентификатор потока")
+    sample_fps: float | None = Field(None, gt=0, le=60, description="Анализируемых кадров в секунду")
+    window_size: int | None = Field(None, ge=1, le=100, description="Кадров в скользящем окне")
+    start_ratio: float | None = Field(None, gt=0, le=1, description="Доля кадров окна с движением для начала события")
+    detector: DetectorKind | None = Field(None, description="Детектор движения; по умолчанию MOTION_DETECTOR")
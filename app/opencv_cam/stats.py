@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Sequence
+
+from app.opencv_cam.models import PROCESSING_TIME_BUCKETS, ROLLUP_COUNTERS, AnalysisRollup
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def histogram_quantile(q: float, counts: Sequence[int], bounds: Sequence[float] = PROCESSING_TIME_BUCKETS) -> float | None:
+    """
+    Квантиль по гистограмме с линейной интерполяцией внутри интервала, как histogram_quantile в Prometheus.
+
+    `counts` на один длиннее `bounds`: последний интервал открыт сверху, для него
+    возвращается последняя граница.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if i == len(bounds):
+                return bounds[-1]
+            lower = bounds[i - 1] if i else 0.0
+            return lower + (bounds[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+def _summarize(start: datetime, counters: dict) -> dict:
+    completed = counters["completed"]
+    histogram = [counters[f"pt_bucket_{i}"] for i in range(len(PROCESSING_TIME_BUCKETS) + 1)]
+    summary = {
+        "start": start,
+        "total": counters["total"],
+        "completed": completed,
+        "failed": counters["failed"],
+        "with_movement": counters["with_movement"],
+        "movement_rate": round(counters["with_movement"] / completed, 4) if completed else None,
+        "avg_processing_time": round(counters["processing_time_sum"] / completed, 3) if completed else None,
+        "avg_duration": round(counters["duration_sum"] / completed, 3) if completed else None,
+    }
+    for q in QUANTILES:
+        value = histogram_quantile(q, histogram)
+        summary[f"processing_time_p{round(q * 100)}"] = round(value, 3) if value is not None else None
+    return summary
+
+
+def summarize_rollups(rollups: Iterable[AnalysisRollup], bucket: timedelta) -> tuple[list[dict], dict]:
+    """Сводит почасовые итоги в интервалы по `bucket` (кратно часу) и общий итог за весь период"""
+    buckets: dict[datetime, dict] = {}
+    overall = dict.fromkeys(ROLLUP_COUNTERS, 0)
+    for rollup in rollups:
+        start = datetime.min + (rollup.bucket_start - datetime.min) // bucket * bucket
+        counters = buckets.setdefault(start, dict.fromkeys(ROLLUP_COUNTERS, 0))
+        for name in ROLLUP_COUNTERS:
+            counters[name] += getattr(rollup, name)
+            overall[name] += getattr(rollup, name)
+    items = [_summarize(start, counters) for start, counters in sorted(buckets.items())]
+    totals = _summarize(None, overall)
+    totals.pop("start")
+    return items, totals
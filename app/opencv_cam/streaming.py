@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Callable
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from app.opencv_cam.detectors import MotionDetector
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer, params_with_detector
+
+
+class StreamEvent(StrEnum):
+    MOTION_START = "motion_start"
+    MOTION_END = "motion_end"
+    STREAM_END = "stream_end"
+    STREAM_ERROR = "stream_error"
+
+
+class StreamLimitError(Exception):
+    """Превышено число одновременно анализируемых потоков"""
+
+
+def is_live_source(source: str | int) -> bool:
+    """Камера (индекс устройства) или сетевой адрес; локальный файл живым потоком не считается"""
+    return isinstance(source, int) or "://" in source
+
+
+class StreamSession:
+    """
+    Непрерывный анализ одного потока.
+
+    Поток читает кадры в своём потоке (thread), берёт из них `sample_fps` кадров в секунду
+    времени потока и отдаёт их на анализ в общий пул. Анализ тот же, что у файлов:
+    детектор движения из `VideoAnalyzer.new_detector`. Движение по скользящему окну из
+    `window_size` последних кадров: начало — когда доля кадров с движением в окне не меньше
+    `start_ratio`, конец — когда в окне не осталось кадров с движением.
+
+    Для живого источника кадр, пришедший пока идёт анализ предыдущего, ждёт в единственном
+    слоте и вытесняется следующим — отставший анализ пропускает кадры, а не копит их.
+    Файл читается с ожиданием анализа, без пропусков.
+    """
+
+    def __init__(
+            self,
+            stream_id: str,
+            source: str | int,
+            analyzer: VideoAnalyzer,
+            pool: ThreadPoolExecutor,
+            on_event: Callable[[dict], None] | None = None,
+            sample_fps: float = 2.0,
+            window_size: int = 4,
+            start_ratio: float = 0.5,
+            live: bool | None = None,
+            event_buffer: int = 100,
+    ):
+        self.stream_id = stream_id
+        self.source = source
+        self.analyzer = analyzer
+        self.on_event = on_event
+        self.sample_fps = sample_fps
+        self.start_ratio = start_ratio
+        self.live = is_live_source(source) if live is None else live
+        self.analyzed_frames = 0
+        self.dropped_frames = 0
+        self.in_motion = False
+        # Последние события — для опроса состояния; старые вытесняются
+        self.events: deque[dict] = deque(maxlen=event_buffer)
+        self._pool = pool
+        self._window: deque[tuple[float, bool]] = deque(maxlen=window_size)
+        self._detector: MotionDetector | None = None
+        self._last_motion_t = 0.0
+        self._last_t = 0.0
+        self._busy = False
+        self._pending: tuple[np.ndarray, float] | None = None
+        self._idle = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, name=f"stream-{stream_id}", daemon=True)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def status(self) -> dict:
+        return {
+            "stream_id": self.stream_id,
+            "running": self.is_running,
+            "in_motion": self.in_motion,
+            "analyzed_frames": self.analyzed_frames,
+            "dropped_frames": self.dropped_frames,
+        }
+
+    def _emit(self, event: StreamEvent, **data) -> None:
+        payload = {
+            "stream_id": self.stream_id,
+            "event": str(event),
+            "at": datetime.now(timezone.utc).isoformat(),
+            **data,
+        }
+        self.events.append(payload)
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(payload)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика событий потока {self.stream_id}: {e}")
+
+    def _read_loop(self) -> None:
+        cap = cv2.VideoCapture(self.source)
+        try:
+            if not cap.isOpened():
+                self._emit(StreamEvent.STREAM_ERROR, error="Cannot open stream")
+                return
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            started = time.monotonic()
+            interval = 1.0 / self.sample_fps
+            next_sample = 0.0
+            frame_index = 0
+            while not self._stop.is_set() and cap.grab():
+                # Время потока: по номеру кадра, если известна частота, иначе по часам
+                t = frame_index / fps if fps > 0 else time.monotonic() - started
+                frame_index += 1
+                if t + 1e-6 < next_sample:
+                    continue
+                next_sample += interval * max(1, int((t - next_sample) // interval) + 1)
+                ok, frame = cap.retrieve()
+                if ok:
+                    self._submit(frame, t)
+            self._wait_idle()
+        except Exception as e:
+            logger.error(f"Ошибка чтения потока {self.stream_id}: {e}")
+            self._emit(StreamEvent.STREAM_ERROR, error=str(e))
+        finally:
+            cap.release()
+            self._finish()
+
+    def _submit(self, frame: np.ndarray, t: float) -> None:
+        with self._idle:
+            if not self.live:
+                self._idle.wait_for(lambda: not self._busy)
+            if self._busy:
+                if self._pending is not None:
+                    self.dropped_frames += 1
+                self._pending = (frame, t)
+                return
+            self._busy = True
+        self._pool.submit(self._analyze_loop, frame, t)
+
+    def _wait_idle(self) -> None:
+        with self._idle:
+            self._idle.wait_for(lambda: not self._busy)
+
+    def _analyze_loop(self, frame: np.ndarray, t: float) -> None:
+        while True:
+            try:
+                self._analyze(frame, t)
+            except Exception as e:
+                logger.error(f"Ошибка анализа кадра потока {self.stream_id}: {e}")
+            with self._idle:
+                if self._pending is None:
+                    self._busy = False
+                    self._idle.notify_all()
+                    return
+                (frame, t), self._pending = self._pending, None
+
+    def _analyze(self, frame: np.ndarray, t: float) -> None:
+        if self._detector is None:
+            self._detector = self.analyzer.new_detector(frame.shape[1])
+        motion = self._detector.process(frame)
+        self.analyzed_frames += 1
+        self._last_t = t
+        if motion is None:
+            return
+
+        largest_area, _ = motion
+        moving = largest_area > self._detector.min_area
+        if moving:
+            self._last_motion_t = t
+        self._window.append((t, moving))
+
+        moving_in_window = [frame_t for frame_t, frame_moving in self._window if frame_moving]
+        if not self.in_motion and len(moving_in_window) >= self.start_ratio * self._window.maxlen:
+            self.in_motion = True
+            self._emit(StreamEvent.MOTION_START, t=round(moving_in_window[0], 3))
+        elif self.in_motion and not moving_in_window and len(self._window) == self._window.maxlen:
+            self.in_motion = False
+            self._emit(StreamEvent.MOTION_END, t=round(self._last_motion_t, 3))
+
+    def _finish(self) -> None:
+        if self.in_motion:
+            self.in_motion = False
+            self._emit(StreamEvent.MOTION_END, t=round(self._last_motion_t, 3))
+        self._emit(
+            StreamEvent.STREAM_END,
+            t=round(self._last_t, 3),
+            analyzed_frames=self.analyzed_frames,
+            dropped_frames=self.dropped_frames,
+        )
+
+
+class StreamMonitor:
+    """
+    Анализ многих потоков в одном процессе.
+
+    У каждого потока свой поток чтения (декодирование в OpenCV отпускает GIL), анализ
+    кадров идёт в общем пуле из `analysis_threads` потоков. Память на поток ограничена:
+    предыдущий кадр, один ожидающий кадр и окно из флагов движения.
+    """
+
+    def __init__(self, analyzer_params: dict | None = None, max_streams: int = 32, analysis_threads: int | None = None):
+        self.analyzer_params = analyzer_params or {}
+        self.max_streams = max_streams
+        self.analysis_threads = analysis_threads or os.cpu_count() or 1
+        self._pool: ThreadPoolExecutor | None = None
+        self._analyzers: dict[str | None, VideoAnalyzer] = {}
+        self._sessions: dict[str, StreamSession] = {}
+        self._lock = threading.Lock()
+
+    def open(
+            self,
+            stream_id: str,
+            source: str | int,
+            on_event: Callable[[dict], None] | None = None,
+            detector: str | None = None,
+            **options,
+    ) -> StreamSession:
+        """
+        Начинает анализ потока; `options` — параметры окна и выборки `StreamSession`.
+
+        `detector` заменяет детектор из analyzer_params для этого потока.
+        """
+        with self._lock:
+            self._sessions = {key: s for key, s in self._sessions.items() if s.is_running}
+            if stream_id in self._sessions:
+                raise ValueError(f"Поток {stream_id} уже анализируется")
+            if len(self._sessions) >= self.max_streams:
+                raise StreamLimitError(f"Уже анализируется {self.max_streams} потоков")
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.analysis_threads, thread_name_prefix="stream-analysis")
+            session = StreamSession(stream_id, source, self._analyzer(detector), self._pool, on_event, **options)
+            self._sessions[stream_id] = session
+        session.start()
+        logger.info(f"Запущен анализ потока {stream_id}")
+        return session
+
+    def _analyzer(self, detector: str | None) -> VideoAnalyzer:
+        analyzer = self._analyzers.get(detector)
+        if analyzer is None:
+            analyzer = self._analyzers[detector] = VideoAnalyzer(**params_with_detector(self.analyzer_params, detector))
+        return analyzer
+
+    def get(self, stream_id: str) -> StreamSession | None:
+        return self._sessions.get(stream_id)
+
+    def list(self) -> list[StreamSession]:
+        return list(self._sessions.values())
+
+    def close(self, stream_id: str, timeout: float | None = None) -> bool:
+        session = self._sessions.pop(stream_id, None)
+        if session is None:
+            return False
+        session.stop()
+        session.join(timeout)
+        return True
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.stop()
+        for session in sessions:
+            session.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
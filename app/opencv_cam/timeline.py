@@ -0,0 +1,48 @@
+import numpy as np
+
+# Одна точка на проанализированный кадр: время (с), площадь наибольшего контура
+# (в пикселях исходного разрешения) и доля изменившихся пикселей — 12 байт на кадр
+TIMELINE_DTYPE = np.dtype([
+    ("t", "<f4"),
+    ("largest_area", "<f4"),
+    ("changed_ratio", "<f4"),
+])
+
+
+def pack_timeline(points: np.ndarray) -> bytes:
+    return np.ascontiguousarray(points, dtype=TIMELINE_DTYPE).tobytes()
+
+
+def unpack_timeline(data: bytes | None) -> np.ndarray:
+    if not data:
+        return np.empty(0, dtype=TIMELINE_DTYPE)
+    return np.frombuffer(data, dtype=TIMELINE_DTYPE)
+
+
+def bucketize_timeline(points: np.ndarray, bucket_seconds: float) -> np.ndarray:
+    """
+    Сворачивает точки во временные интервалы по `bucket_seconds`.
+
+    Для интервала берётся максимум площади контура и среднее доли изменившихся пикселей,
+    время — начало интервала. Пустые интервалы пропускаются.
+    """
+    if points.size == 0:
+        return points
+    buckets = np.floor(points["t"] / bucket_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, points.size])
+
+    result = np.empty(starts.size, dtype=TIMELINE_DTYPE)
+    result["t"] = buckets[starts] * bucket_seconds
+    result["largest_area"] = np.maximum.reduceat(points["largest_area"], starts)
+    result["changed_ratio"] = np.add.reduceat(points["changed_ratio"], starts) / counts
+    return result
+
+
+def timeline_to_dict(points: np.ndarray) -> dict:
+    """Колоночное представление для JSON"""
+    return {
+        "t": points["t"].astype(np.float64).round(3).tolist(),
+        "largest_area": points["largest_area"].astype(np.float64).round(1).tolist(),
+        "changed_ratio": points["changed_ratio"].astype(np.float64).round(5).tolist(),
+    }
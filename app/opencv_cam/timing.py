@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+from enum import StrEnum
+from typing import Iterator
+
+
+class Stage(StrEnum):
+    UPLOAD = "upload"  # запись загрузки во временный файл и хэш содержимого
+    QUEUE = "queue"  # ожидание свободного воркера в пуле анализа
+    OPEN = "open"  # открытие VideoCapture и чтение параметров контейнера
+    DECODE = "decode"  # grab/retrieve выбранных и пропущенных кадров, перемотка
+    PREPROCESS = "preprocess"  # серый, уменьшение до ширины анализа, размытие
+    DETECT = "detect"  # сравнение с предыдущим кадром или моделью фона, поиск областей
+    SAVE = "save"  # запись результата в базу или в очередь отложенной записи
+
+
+# Стадии, которые замеряются на каждом кадре, — только в выбранных для замера анализах
+FRAME_STAGES = (Stage.DECODE, Stage.PREPROCESS, Stage.DETECT)
+
+
+class StageTimer:
+    """
+    Время по стадиям анализа одного видео и число декодированных кадров.
+
+    Стадии уровня видео (открытие, ожидание в пуле) замеряются всегда — это несколько
+    вызовов `perf_counter` на видео. Стадии из `FRAME_STAGES` требуют замера на каждом
+    кадре, поэтому выполняются, только если `sampled`.
+    """
+
+    def __init__(self, sampled: bool = False):
+        self.sampled = sampled
+        self.stages: dict[str, float] = {}
+        self.decoded_frames = 0
+
+    def add(self, stage: Stage, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage: Stage) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def to_dict(self) -> dict:
+        return {
+            "sampled": self.sampled,
+            "decoded_frames": self.decoded_frames,
+            "stages": {str(stage): seconds for stage, seconds in self.stages.items()},
+        }
+
+
+def merge_timings(timings: list[dict]) -> dict:
+    """Суммирует замеры частей одного анализа (отрезков видео)"""
+    stages: dict[str, float] = {}
+    for part in timings:
+        for stage, seconds in part["stages"].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    return {
+        "sampled": all(part["sampled"] for part in timings),
+        "decoded_frames": sum(part["decoded_frames"] for part in timings),
+        "stages": stages,
+    }
@@ -1,108 +1,429 @@
+import hashlib
+import json
 import os
+import shutil
 import tempfile
 import time
-from typing import Dict
+from typing import Callable, Dict, Iterator, Sequence
 import cv2
+import numpy as np
+
+from app.opencv_cam.detectors import DETECTORS, DetectorKind, MotionDetector
+from app.opencv_cam.motion import MotionMetric
+from app.opencv_cam.sampling import FrameSampler
+from app.opencv_cam.timeline import TIMELINE_DTYPE, pack_timeline
+from app.opencv_cam.timing import Stage, StageTimer, merge_timings
+
+CHUNK_SIZE = 1024 * 1024
+# Видео считается содержащим движение, если движение есть больше чем в этой доле кадров (%)
+MOVEMENT_PERCENTAGE_THRESHOLD = 10.0
+# Через сколько проанализированных кадров сообщать о прогрессе
+PROGRESS_INTERVAL_FRAMES = 25
+
+
+def save_to_tempfile(video_file) -> str:
+    """Сохраняет загруженный файл во временный файл и возвращает путь к нему"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
+        video_file.file.seek(0)
+        shutil.copyfileobj(video_file.file, tmp_file, CHUNK_SIZE)
+        return tmp_file.name
+
+
+def params_with_detector(analyzer_params: Dict, detector: str | None) -> Dict:
+    """
+    Параметры анализатора с детектором `detector` вместо заданного (None — без замены).
+
+    `detector_params` относятся к детектору из `analyzer_params`: у других видов детекторов
+    свои параметры, поэтому для них берутся значения по умолчанию.
+    """
+    if detector is None:
+        return analyzer_params
+    configured = DetectorKind(analyzer_params.get("detector", DetectorKind.FRAME_DIFF))
+    params = {**analyzer_params, "detector": detector}
+    if DetectorKind(detector) != configured:
+        params.pop("detector_params", None)
+    return params
 
 
 class VideoAnalyzer:
-    def __init__(self, movement_threshold: float = 1000.0, min_contour_area: int = 500):
+    def __init__(
+            self,
+            movement_threshold: float = 1000.0,
+            min_contour_area: int = 500,
+            sampler: FrameSampler | None = None,
+            analysis_width: int | None = None,
+            motion_metric: MotionMetric = MotionMetric.CONTOURS,
+            detector: DetectorKind = DetectorKind.FRAME_DIFF,
+            detector_params: dict | None = None,
+    ):
         self.movement_threshold = movement_threshold
         self.min_contour_area = min_contour_area
+        self.sampler = sampler or FrameSampler()
+        # Ширина, до которой уменьшаются кадры перед анализом; None — исходное разрешение
+        self.analysis_width = analysis_width
+        self.motion_metric = MotionMetric(motion_metric)
+        self.detector = DetectorKind(detector)
+        self.detector_params = detector_params or {}
+        # Проверяем параметры детектора сразу, а не на первом видео
+        self.new_detector(0)
+
+    @property
+    def params(self) -> Dict:
+        """Параметры, от которых зависит результат анализа"""
+        return {
+            "movement_threshold": self.movement_threshold,
+            "min_contour_area": self.min_contour_area,
+            "analysis_width": self.analysis_width,
+            "motion_metric": str(self.motion_metric),
+            "sampling": self.sampler.params,
+            "detector": str(self.detector),
+            "detector_params": self.new_detector(0).params,
+        }
+
+    @property
+    def fingerprint(self) -> str:
+        """Короткий отпечаток параметров для ключа кэша результатов"""
+        payload = json.dumps(self.params, sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:16]
 
     def analyze_video(self, video_file) -> Dict:
-        start_time = time.time()
         tmp_path = None
 
         try:
-            # Создаем временный файл
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                tmp_file.write(video_file.file.read())
-                tmp_path = tmp_file.name
+            tmp_path = save_to_tempfile(video_file)
+            return self.analyze_path(tmp_path)
+        except Exception as e:
+            return self._failed_result(0.0, e)
+        finally:
+            # Очистка временного файла
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def analyze_path(
+            self,
+            video_path: str,
+            decision_only: bool = False,
+            on_progress: Callable[[Dict], None] | None = None,
+            timer: StageTimer | None = None,
+    ) -> Dict:
+        """
+        Анализирует видео, уже сохранённое на диск.
+
+        При `decision_only=True` декодирование останавливается, как только значение
+        `has_movement` уже не может измениться; тогда `movement_percentage` — граница,
+        а не точное значение, и `percentage_bound` равен "lower" или "upper".
+        `on_progress` вызывается каждые `PROGRESS_INTERVAL_FRAMES` проанализированных кадров.
+        Замеры времени по стадиям из `timer` возвращаются в поле `timings`.
+        """
+        start_time = time.time()
+        timer = timer or StageTimer()
 
-            # Анализ видео
-            has_movement, movement_percentage, duration = self._detect_movement(tmp_path)
+        try:
+            detection = self._detect_movement(video_path, decision_only, on_progress, timer)
             processing_time = time.time() - start_time
 
             return {
-                "has_movement": has_movement,
-                "movement_percentage": round(movement_percentage, 2),
-                "duration": round(duration, 2),
+                "has_movement": detection["has_movement"],
+                "movement_percentage": round(detection["movement_percentage"], 2),
+                "duration": round(detection["duration"], 2),
                 "processing_time": round(processing_time, 2),
-                "status": "completed"
+                "status": "completed",
+                "percentage_bound": detection["percentage_bound"],
+                "timeline": pack_timeline(detection["timeline"]),
+                "fps": round(detection["fps"], 3),
+                "width": detection["width"],
+                "height": detection["height"],
+                "total_frames": detection["total_frames"],
+                "analyzed_frames": detection["analyzed_frames"],
+                "timings": timer.to_dict(),
             }
 
         except Exception as e:
-            processing_time = time.time() - start_time
-            return {
-                "has_movement": False,
-                "movement_percentage": 0.0,
-                "duration": 0.0,
-                "processing_time": round(processing_time, 2),
-                "status": "failed",
-                "error_message": str(e)
-            }
-        finally:
-            # Очистка временного файла
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            return self._failed_result(time.time() - start_time, e)
+
+    @staticmethod
+    def _failed_result(processing_time: float, error: Exception) -> Dict:
+        return {
+            "has_movement": False,
+            "movement_percentage": 0.0,
+            "duration": 0.0,
+            "processing_time": round(processing_time, 2),
+            "status": "failed",
+            "error_message": str(error)
+        }
+
+    def new_detector(self, frame_width: int) -> MotionDetector:
+        """
+        Детектор движения для видео с кадрами ширины `frame_width`.
+
+        Кадры шире `analysis_width` уменьшаются; минимальная площадь области движения
+        пересчитывается под масштаб, чтобы решение не зависело от разрешения видео.
+        """
+        scale = 1.0
+        if self.analysis_width and frame_width > self.analysis_width:
+            scale = self.analysis_width / frame_width
+        min_area = self.min_contour_area * scale * scale
+        return DETECTORS[self.detector](scale, min_area, self.motion_metric, **self.detector_params)
 
-    def _detect_movement(self, video_path: str) -> tuple[bool, float, float]:
+    @staticmethod
+    def _open_video(video_path: str) -> tuple[cv2.VideoCapture, Dict]:
+        """Открывает видео и читает его параметры из контейнера"""
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise IOError("Cannot open video file")
-
         try:
             fps = cap.get(cv2.CAP_PROP_FPS)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
             if total_frames == 0:
                 raise ValueError("Video has no frames")
+            return cap, {
+                "fps": fps,
+                "total_frames": total_frames,
+                "duration": total_frames / fps if fps > 0 else 0,
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            }
+        except Exception:
+            cap.release()
+            raise
 
-            duration = total_frames / fps if fps > 0 else 0
-            prev_frame = None
-            frames_with_movement = 0
-            frame_count = 0
-            skip_frames = max(1, int(fps // 2))
-
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+    def _iter_motion(
+            self,
+            cap: cv2.VideoCapture,
+            indices: Sequence[int],
+            fps: float,
+            detector: MotionDetector,
+            timer: StageTimer | None = None,
+    ) -> Iterator[tuple[float, float | None, float]]:
+        """
+        Для каждого выбранного кадра — время, площадь наибольшей области движения
+        (None, пока детектору не с чем сравнивать) и доля изменившихся пикселей.
+        """
+        frames = self.sampler.iter_frames(cap, indices, timer)
+        if timer is not None and timer.sampled:
+            frames = self._timed_motion(frames, detector, timer)
+        else:
+            frames = ((index, detector.process(frame)) for index, frame in frames)
 
-                frame_count += 1
+        try:
+            for index, motion in frames:
+                t = index / fps if fps > 0 else 0.0
+                if motion is None:
+                    yield t, None, 0.0
+                else:
+                    yield t, *motion
+        finally:
+            # Закрываем чтение сразу, чтобы число декодированных кадров попало в timer
+            frames.close()
 
-                if frame_count % skip_frames != 0:
-                    continue
+    @staticmethod
+    def _timed_motion(
+            frames: Iterator[tuple[int, np.ndarray]], detector: MotionDetector, timer: StageTimer,
+    ) -> Iterator[tuple[int, tuple[float, float] | None]]:
+        """То же, что `detector.process` по кадрам, с замером декодирования, подготовки и сравнения"""
+        clock = time.perf_counter
+        decode = preprocess = detect = 0.0
+        try:
+            started = clock()
+            for index, frame in frames:
+                decoded = clock()
+                prepared = detector.preprocess(frame)
+                prepared_at = clock()
+                motion = detector.update(prepared)
+                detected = clock()
+                decode += decoded - started
+                preprocess += prepared_at - decoded
+                detect += detected - prepared_at
+                yield index, motion
+                started = clock()
+            decode += clock() - started
+        finally:
+            frames.close()
+            timer.add(Stage.DECODE, decode)
+            timer.add(Stage.PREPROCESS, preprocess)
+            timer.add(Stage.DETECT, detect)
 
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                gray = cv2.GaussianBlur(gray, (21, 21), 0)
+    def _detect_movement(
+            self,
+            video_path: str,
+            decision_only: bool = False,
+            on_progress: Callable[[Dict], None] | None = None,
+            timer: StageTimer | None = None,
+    ) -> Dict:
+        timer = timer or StageTimer()
+        with timer.measure(Stage.OPEN):
+            cap, info = self._open_video(video_path)
 
-                if prev_frame is None:
-                    prev_frame = gray
-                    continue
+        try:
+            fps = info["fps"]
+            detector = self.new_detector(info["width"])
+            min_area = detector.min_area
+            indices = self.sampler.sample_indices(video_path, fps, info["total_frames"])
+            expected_frames = max(1, len(indices))
+            frames_with_movement = 0
+            analyzed_frames = 0
+            percentage_bound = None
+            timeline = np.zeros(expected_frames, dtype=TIMELINE_DTYPE)
+            area_scale = 1.0 / (detector.scale * detector.scale)
 
-                frame_diff = cv2.absdiff(prev_frame, gray)
-                thresh = cv2.threshold(frame_diff, 25, 255, cv2.THRESH_BINARY)[1]
-                thresh = cv2.dilate(thresh, None, iterations=2)
+            for t, largest_area, changed_ratio in self._iter_motion(cap, indices, fps, detector, timer):
+                point = timeline[analyzed_frames]
+                point["t"] = t
+                analyzed_frames += 1
 
-                contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                if largest_area is None:
+                    continue
 
-                movement_detected = any(
-                    cv2.contourArea(contour) > self.min_contour_area
-                    for contour in contours
-                )
+                movement_detected = largest_area > min_area
+                point["largest_area"] = largest_area * area_scale
+                point["changed_ratio"] = changed_ratio
 
                 if movement_detected:
                     frames_with_movement += 1
 
-                prev_frame = gray
+                if on_progress is not None and analyzed_frames % PROGRESS_INTERVAL_FRAMES == 0:
+                    on_progress(self._progress(analyzed_frames, expected_frames, frames_with_movement))
+
+                if decision_only:
+                    # Доля считается от ожидаемого числа кадров: оставшиеся кадры могут
+                    # только увеличить числитель, поэтому обе границы надёжны
+                    lower = frames_with_movement / expected_frames * 100
+                    upper = (frames_with_movement + expected_frames - analyzed_frames) / expected_frames * 100
+                    if lower > MOVEMENT_PERCENTAGE_THRESHOLD:
+                        percentage_bound = "lower"
+                        break
+                    if upper <= MOVEMENT_PERCENTAGE_THRESHOLD:
+                        percentage_bound = "upper"
+                        break
 
-            analyzed_frames = max(1, frame_count // skip_frames)
-            movement_percentage = (frames_with_movement / analyzed_frames) * 100
-            has_movement = movement_percentage > 10.0
+            if percentage_bound == "lower":
+                movement_percentage = lower
+            elif percentage_bound == "upper":
+                movement_percentage = upper
+            else:
+                movement_percentage = (frames_with_movement / max(1, analyzed_frames)) * 100
 
-            return has_movement, movement_percentage, duration
+            return {
+                "has_movement": movement_percentage > MOVEMENT_PERCENTAGE_THRESHOLD,
+                "movement_percentage": movement_percentage,
+                "percentage_bound": percentage_bound,
+                "timeline": timeline[:analyzed_frames],
+                "analyzed_frames": analyzed_frames,
+                **info,
+            }
 
         finally:
-            cap.release()
\ No newline at end of file
+            cap.release()
+
+    @staticmethod
+    def _progress(analyzed_frames: int, expected_frames: int, frames_with_movement: int) -> Dict:
+        return {
+            "analyzed_frames": analyzed_frames,
+            "expected_frames": expected_frames,
+            "progress": round(min(100.0, analyzed_frames / expected_frames * 100), 1),
+            "movement_percentage": round(frames_with_movement / max(1, analyzed_frames) * 100, 2),
+        }
+
+    def plan_segments(self, video_path: str, max_segments: int, min_segment_frames: int) -> Dict:
+        """
+        Делит выбранные кадры видео на отрезки для параллельного анализа.
+
+        Отрезков не больше `max_segments` и не меньше `min_segment_frames` выбранных кадров
+        в каждом. У каждого отрезка, кроме первого, есть опорный кадр — последний выбранный
+        кадр предыдущего отрезка: с ним сравнивается первый кадр отрезка, как при
+        последовательном анализе, но сам он не считается. Детекторы, которым нужна вся
+        история кадров (`DetectorCost.splittable`), получают один отрезок.
+        """
+        cap, info = self._open_video(video_path)
+        cap.release()
+        indices = list(self.sampler.sample_indices(video_path, info["fps"], info["total_frames"]))
+        count = max(1, min(max_segments, len(indices) // max(1, min_segment_frames)))
+        if not DETECTORS[self.detector].cost.splittable:
+            count = 1
+        bounds = np.linspace(0, len(indices), count + 1).astype(int)
+        segments = [
+            {"reference": indices[start - 1] if start > 0 else None, "indices": indices[start:end]}
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        return {**info, "expected_frames": len(indices), "segments": segments}
+
+    def analyze_segment(self, video_path: str, plan: Dict, segment: Dict, timer: StageTimer | None = None) -> Dict:
+        """Анализирует один отрезок из `plan_segments`; перемотка к его началу — в `FrameSampler`"""
+        timer = timer or StageTimer()
+        with timer.measure(Stage.OPEN):
+            cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError("Cannot open video file")
+
+        try:
+            reference = segment["reference"]
+            indices = segment["indices"] if reference is None else [reference, *segment["indices"]]
+            detector = self.new_detector(plan["width"])
+            min_area = detector.min_area
+            area_scale = 1.0 / (detector.scale * detector.scale)
+            timeline = np.zeros(len(segment["indices"]), dtype=TIMELINE_DTYPE)
+            frames_with_movement = 0
+            analyzed_frames = 0
+            points = self._iter_motion(cap, indices, plan["fps"], detector, timer)
+
+            if reference is not None:
+                # Опорный кадр только задаёт предыдущий кадр для первого сравнения
+                if next(points, None) is None:
+                    points.close()
+                    return {
+                        "frames_with_movement": 0,
+                        "analyzed_frames": 0,
+                        "timeline": timeline[:0],
+                        "timings": timer.to_dict(),
+                    }
+
+            for t, largest_area, changed_ratio in points:
+                point = timeline[analyzed_frames]
+                point["t"] = t
+                analyzed_frames += 1
+                if largest_area is None:
+                    continue
+                point["largest_area"] = largest_area * area_scale
+                point["changed_ratio"] = changed_ratio
+                if largest_area > min_area:
+                    frames_with_movement += 1
+
+            return {
+                "frames_with_movement": frames_with_movement,
+                "analyzed_frames": analyzed_frames,
+                "timeline": timeline[:analyzed_frames],
+                "timings": timer.to_dict(),
+            }
+
+        finally:
+            cap.release()
+
+    @staticmethod
+    def merge_segments(plan: Dict, parts: list[Dict], processing_time: float) -> Dict:
+        """
+        Собирает результаты отрезков в результат того же вида, что и `analyze_path`.
+
+        Время стадий суммируется по отрезкам (и планированию из `plan["timings"]`, если есть),
+        то есть это процессорное время воркеров, а не время ожидания клиента.
+        """
+        timings = [part["timings"] for part in parts if "timings" in part]
+        if "timings" in plan:
+            timings.insert(0, plan["timings"])
+        frames_with_movement = sum(part["frames_with_movement"] for part in parts)
+        analyzed_frames = sum(part["analyzed_frames"] for part in parts)
+        movement_percentage = frames_with_movement / max(1, analyzed_frames) * 100
+        return {
+            "has_movement": movement_percentage > MOVEMENT_PERCENTAGE_THRESHOLD,
+            "movement_percentage": round(movement_percentage, 2),
+            "duration": round(plan["duration"], 2),
+            "processing_time": round(processing_time, 2),
+            "status": "completed",
+            "percentage_bound": None,
+            "timeline": pack_timeline(np.concatenate([part["timeline"] for part in parts])),
+            "fps": round(plan["fps"], 3),
+            "width": plan["width"],
+            "height": plan["height"],
+            "total_frames": plan["total_frames"],
+            "analyzed_frames": analyzed_frames,
+            "timings": merge_timings(timings),
+        }
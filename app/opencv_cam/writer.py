@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.dao.session_maker import DatabaseSessionManager
+from app.opencv_cam.dao import AnalysisRollupDAO, VideoAnalysisDAO
+from app.opencv_cam.metrics import WRITE_BATCH_ROWS, WRITE_FLUSH_SECONDS, WRITE_QUEUE_DEPTH
+
+# Маркер остановки в очереди: после него дописывается всё, что успело попасть в очередь
+_STOP = object()
+
+
+class AnalysisWriter:
+    """
+    Отложенная пакетная запись результатов анализа (write-behind).
+
+    Записи копятся в очереди процесса, фоновая задача вставляет их одним многострочным
+    INSERT ... RETURNING и одним коммитом — как только набралось `batch_size` записей или
+    прошло `flush_interval` секунд с первой записи пачки. Вызывающий получает id своей записи
+    после коммита пачки. При остановке очередь дописывается до конца.
+    """
+
+    def __init__(
+            self,
+            session_manager: DatabaseSessionManager,
+            batch_size: int = 100,
+            flush_interval: float = 0.05,
+            max_queue: int = 10000,
+    ):
+        self.session_manager = session_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        # add(), ждущие места в заполненной очереди: их записи могут встать и после _STOP
+        self._putting = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def add(self, values: BaseModel) -> int:
+        """Ставит запись в очередь и ждёт её id. При заполненной очереди ждёт места в ней"""
+        if not self.is_running:
+            raise RuntimeError("Отложенная запись не запущена")
+        future = asyncio.get_running_loop().create_future()
+        self._putting += 1
+        try:
+            await self._queue.put((values, future))
+        finally:
+            self._putting -= 1
+        WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+        return await future
+
+    async def shutdown(self, timeout: float | None = None) -> None:
+        """Дописывает очередь и останавливает фоновую задачу"""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Отложенная запись не завершилась за {timeout} с, в очереди {self._queue.qsize()} записей")
+        self._task = None
+
+    @property
+    def _drained(self) -> bool:
+        return self._queue.empty() and self._putting == 0
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        # После _STOP новые add() уже отклоняются, но начатые ещё могут поставить запись:
+        # задача завершается, только когда очередь пуста и ждущих места нет
+        while not (stopping and self._drained):
+            item = await self._queue.get()
+            if item is _STOP:
+                stopping = True
+                continue
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    if not self._queue.empty():
+                        item = self._queue.get_nowait()
+                    elif stopping:
+                        break
+                    else:
+                        item = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    continue
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[BaseModel, asyncio.Future]]) -> None:
+        start = time.perf_counter()
+        try:
+            async with self.session_manager.create_session() as session:
+                async with self.session_manager.transaction(session):
+                    records = [values for values, _ in batch]
+                    ids = await VideoAnalysisDAO.insert_returning_ids(session, records)
+                    await AnalysisRollupDAO.record(session, records)
+        except Exception as e:
+            logger.error(f"Не удалось записать пачку из {len(batch)} результатов анализа: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            WRITE_FLUSH_SECONDS.observe(time.perf_counter() - start)
+            WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+
+        WRITE_BATCH_ROWS.observe(len(batch))
+        for (_, future), row_id in zip(batch, ids):
+            # Запрос мог быть отменён, пока ждал записи, — сама запись при этом сохраняется
+            if not future.done():
+                future.set_result(row_id)
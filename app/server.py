@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import math
+import os
+import shutil
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Без импорта настроек в рантайме: модуль импортируют и процессы пула анализа
+    from app.config import Settings
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Число воркеров gunicorn для процессов приложения; настройки к этому моменту уже загружены
+SERVER_PROCESSES_ENV = "SERVER_PROCESSES"
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota(cgroup_root: str = CGROUP_ROOT) -> float | None:
+    """Квота CPU контейнера в ядрах из cgroup v2 (cpu.max) или v1 (cfs_quota_us); None — квоты нет"""
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus(cgroup_root: str = CGROUP_ROOT) -> int:
+    """Ядра, доступные процессу: привязка к CPU, ограниченная квотой контейнера (округление вверх)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def server_workers(config: Settings, cpus: int) -> int:
+    """Воркеры gunicorn: SERVER_WORKERS или по ядру на воркер, не больше SERVER_MAX_WORKERS"""
+    if config.SERVER_WORKERS:
+        return config.SERVER_WORKERS
+    return max(1, min(cpus, config.SERVER_MAX_WORKERS))
+
+
+def server_processes() -> int:
+    """Процессов сервиса со своим пулом анализа: gunicorn.conf.py передаёт число воркеров через окружение"""
+    return int(os.environ.get(SERVER_PROCESSES_ENV, 1))
+
+
+def analysis_workers(config: Settings, cpus: int, workers: int) -> int:
+    """
+    Процессов анализа на воркер: ANALYSIS_WORKERS или ядра, поделённые между воркерами.
+
+    У каждого воркера свой пул анализа, поэтому без деления пулы всех воркеров вместе
+    заняли бы в `workers` раз больше процессов, чем есть ядер.
+    """
+    if config.ANALYSIS_WORKERS:
+        return config.ANALYSIS_WORKERS
+    return max(1, cpus // workers)
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Каталог метрик prometheus_client для нескольких процессов; файлы прошлого запуска удаляются"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
@@ -0,0 +1,13 @@
+from uvicorn.workers import UvicornWorker
+
+from app.config import get_settings
+
+
+class ServiceWorker(UvicornWorker):
+    """Воркер gunicorn: uvicorn с циклом событий и HTTP-парсером из настроек, без --reload"""
+    # Модуль импортирует только gunicorn, когда настройки уже прочитаны в gunicorn.conf.py
+    CONFIG_KWARGS = {
+        "loop": get_settings().SERVER_LOOP,
+        "http": get_settings().SERVER_HTTP,
+        "lifespan": "on",
+    }
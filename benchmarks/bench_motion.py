@@ -0,0 +1,99 @@
+"""
+Сравнение оценок области движения: контуры (findContours) против связных компонент.
+
+Маски строятся так же, как в анализаторе, затем для каждой метрики замеряется время
+`score_mask` на кадр и доля кадров, где решение «есть движение» совпадает с контурным.
+
+Запуск: python -m benchmarks.bench_motion --seconds 20 --width 1280 --height 720 --speckle 0.002
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.opencv_cam.motion import MotionMetric, score_mask
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer
+from benchmarks.synthetic import write_synthetic_video
+
+
+def build_masks(video_path: str, analyzer: VideoAnalyzer) -> list[np.ndarray]:
+    """Бинарные маски разницы соседних выбранных кадров, как в `_detect_movement`"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        detector = analyzer.new_detector(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        masks, prev_frame = [], None
+        indices = analyzer.sampler.sample_indices(video_path, fps, total_frames)
+        for _, frame in analyzer.sampler.iter_frames(cap, indices):
+            gray = detector.preprocess(frame)
+            if prev_frame is not None:
+                thresh = cv2.threshold(cv2.absdiff(prev_frame, gray), detector.diff_threshold, 255, cv2.THRESH_BINARY)[1]
+                masks.append(cv2.dilate(thresh, None, iterations=detector.dilate_iterations))
+            prev_frame = gray
+        return masks
+    finally:
+        cap.release()
+
+
+def add_speckle(masks: list[np.ndarray], density: float, seed: int = 0) -> list[np.ndarray]:
+    """Мелкие пятна шума поверх масок — как от шума матрицы, который не убрало размытие"""
+    rng = np.random.default_rng(seed)
+    speckled = []
+    for mask in masks:
+        dots = ((rng.random(mask.shape) < density) * 255).astype(np.uint8)
+        speckled.append(cv2.bitwise_or(mask, cv2.dilate(dots, None)))
+    return speckled
+
+
+def time_metric(
+        masks: list[np.ndarray], metric: MotionMetric, min_area: float, repeat: int,
+) -> tuple[float, list[float]]:
+    """Лучшее время на маску в микросекундах и площади по маскам"""
+    best, areas = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        areas = [score_mask(mask, metric, min_area)[0] for mask in masks]
+        best = min(best, time.perf_counter() - start)
+    return best / max(1, len(masks)) * 1e6, areas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--noise", type=int, default=0)
+    parser.add_argument("--speckle", type=float, default=0.0, help="доля пикселей маски с шумовыми пятнами")
+    parser.add_argument("--analysis-width", type=int, default=0, help="0 — исходное разрешение")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    analyzer = VideoAnalyzer(analysis_width=args.analysis_width or None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_synthetic_video(
+            os.path.join(tmp_dir, "clip.mp4"), args.width, args.height, args.fps, args.seconds,
+            motion_density=0.5, noise=args.noise,
+        )
+        masks = build_masks(video_path, analyzer)
+    if args.speckle:
+        masks = add_speckle(masks, args.speckle)
+
+    min_area = analyzer.new_detector(args.width).min_area
+    results = {metric: time_metric(masks, metric, min_area, args.repeat) for metric in MotionMetric}
+    baseline_time, baseline_areas = results[MotionMetric.CONTOURS]
+    baseline_moving = np.array(baseline_areas) > min_area
+
+    print(f"{len(masks)} masks, min_area={min_area:.0f}")
+    print(f"{'metric':<14}{'us/frame':>10}{'speedup':>10}{'agreement':>11}")
+    for metric, (per_frame, areas) in results.items():
+        agreement = np.mean((np.array(areas) > min_area) == baseline_moving) * 100
+        print(f"{metric:<14}{per_frame:>10.1f}{baseline_time / per_frame:>9.2f}x{agreement:>10.1f}%")
+
+
+if __name__ == "__main__":
+    main()
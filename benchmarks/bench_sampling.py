@@ -0,0 +1,84 @@
+"""
+Сравнение времени декодирования: полный `cap.read()` против выборки через `FrameSampler`.
+
+Запуск: python -m benchmarks.bench_sampling --seconds 60 --width 1280 --height 720
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from app.opencv_cam.sampling import FrameSampler, SamplingStrategy
+from benchmarks.synthetic import write_synthetic_video
+
+
+def decode_with_read(video_path: str, target_fps: float) -> int:
+    """Прежнее поведение: декодировать всё и отбросить лишние кадры"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        skip_frames = max(1, int(cap.get(cv2.CAP_PROP_FPS) // target_fps))
+        frame_count = analyzed = 0
+        while True:
+            ret, _ = cap.read()
+            if not ret:
+                break
+            frame_count += 1
+            if frame_count % skip_frames == 0:
+                analyzed += 1
+        return analyzed
+    finally:
+        cap.release()
+
+
+def decode_with_sampler(video_path: str, sampler: FrameSampler) -> int:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return sum(1 for _ in sampler.iter_frames(cap, sampler.sample_indices(video_path, fps, total_frames)))
+    finally:
+        cap.release()
+
+
+def best_of(repeat: int, func, *args) -> tuple[float, int]:
+    best, frames = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--target-fps", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_synthetic_video(
+            os.path.join(tmp_dir, "clip.mp4"), args.width, args.height, args.fps, args.seconds,
+        )
+        cases = [
+            ("read() + skip", decode_with_read, (video_path, args.target_fps)),
+            ("grab() fixed_fps", decode_with_sampler, (video_path, FrameSampler(target_fps=args.target_fps))),
+            ("seek fixed_count", decode_with_sampler, (video_path, FrameSampler(SamplingStrategy.FIXED_COUNT, frame_count=int(args.seconds * args.target_fps)))),
+            ("keyframes", decode_with_sampler, (video_path, FrameSampler(SamplingStrategy.KEYFRAMES))),
+        ]
+
+        baseline = None
+        print(f"{'mode':<20}{'frames':>8}{'seconds':>10}{'speedup':>10}")
+        for name, func, func_args in cases:
+            elapsed, frames = best_of(args.repeat, func, *func_args)
+            baseline = baseline or elapsed
+            print(f"{name:<20}{frames:>8}{elapsed:>10.3f}{baseline / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Воспроизводимый замер производительности анализа на синтетических роликах.
+
+Для каждого ролика из набора (разрешение, fps, длина, доля движения) замеряются:
+- `detect` — `VideoAnalyzer._detect_movement` с параметрами сервиса из настроек;
+- `api` — полный путь POST /analyze через TestClient: загрузка, пул процессов, запись в базу.
+
+Каждый случай выполняется в отдельном процессе, чтобы пиковый RSS относился только к нему
+(для `api` — максимум из процесса приложения и воркеров пула). Результат — JSON с кадрами
+в секунду, p50/p99 задержки и пиковым RSS; с `--baseline` сравнивается с сохранённым
+результатом и завершается с кодом 1, если пропускная способность упала больше `--max-regression`.
+
+Для `api` нужна база с таблицами сервиса: `--db-url`, по умолчанию TEST_DB_URL, как в тестах.
+Кэш результатов при замере отключён, иначе повторные загрузки не доходили бы до анализа.
+
+Запуск:
+    python -m benchmarks.bench_suite --preset quick --output bench.json
+    python -m benchmarks.bench_suite --preset quick --baseline bench.json --max-regression 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import write_synthetic_video
+
+TARGETS = ("detect", "api")
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    width: int
+    height: int
+    fps: float
+    seconds: float
+    motion_density: float
+    noise: int = 0
+
+    @property
+    def name(self) -> str:
+        name = f"{self.width}x{self.height}@{self.fps:g}fps/{self.seconds:g}s/d{self.motion_density:g}"
+        return f"{name}/n{self.noise}" if self.noise else name
+
+    @property
+    def total_frames(self) -> int:
+        return int(self.fps * self.seconds)
+
+
+PRESETS: dict[str, list[ClipSpec]] = {
+    "quick": [
+        ClipSpec(640, 360, 15.0, 10.0, 0.3),
+        ClipSpec(1280, 720, 30.0, 10.0, 0.3),
+        ClipSpec(1280, 720, 30.0, 10.0, 0.0, noise=10),
+    ],
+    "full": [
+        ClipSpec(width, height, fps, 30.0, density)
+        for width, height in ((640, 360), (1280, 720), (1920, 1080))
+        for fps in (15.0, 30.0)
+        for density in (0.0, 0.3, 1.0)
+    ] + [ClipSpec(1280, 720, 30.0, 120.0, 0.3), ClipSpec(1280, 720, 30.0, 30.0, 0.0, noise=20)],
+}
+
+
+def clip_path(clip_dir: str, spec: ClipSpec) -> str:
+    """Путь к ролику; существующий файл переиспользуется между запусками"""
+    path = os.path.join(clip_dir, spec.name.replace("/", "_") + ".mp4")
+    if not os.path.exists(path):
+        write_synthetic_video(
+            path, spec.width, spec.height, spec.fps, spec.seconds,
+            motion_density=spec.motion_density, noise=spec.noise,
+        )
+    return path
+
+
+def _peak_rss_mb(include_children: bool) -> float:
+    # ru_maxrss в Linux — в килобайтах; у дочерних процессов учитываются уже завершённые
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / 1024, 1)
+
+
+def _bench_detect(video_path: str, repeat: int, detector: str | None) -> tuple[list[float], int]:
+    from app.opencv_cam.router import get_analysis_executor
+    from app.opencv_cam.video_analizer_controller import VideoAnalyzer, params_with_detector
+
+    params = get_analysis_executor().analyzer_params
+    analyzer = VideoAnalyzer(**params_with_detector(params, detector))
+    analyzer._detect_movement(video_path)  # прогрев: загрузка кодеков и OpenCV
+
+    latencies, analyzed = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        analyzed = analyzer._detect_movement(video_path)["analyzed_frames"]
+        latencies.append(time.perf_counter() - started)
+    return latencies, analyzed
+
+
+def _bench_api(video_path: str, repeat: int, detector: str | None, db_url: str) -> tuple[list[float], int]:
+    import asyncio
+    from unittest.mock import patch
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import NullPool
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.config import get_settings
+    from app.dao.session_maker import DatabaseSessionManager, session_manager
+    from app.main import app
+    from app.opencv_cam import router
+    from app.opencv_cam.models import Base
+
+    engine = create_async_engine(db_url, poolclass=NullPool)
+    bench_sessions = DatabaseSessionManager(async_sessionmaker(
+        bind=engine, autocommit=False, autoflush=False, expire_on_commit=False, class_=AsyncSession,
+    ))
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def bench_session():
+        async with bench_sessions.create_session() as session:
+            yield session
+
+    async def no_cached_result(*args, **kwargs):
+        return None
+
+    asyncio.run(create_tables())
+    # Отложенная запись идёт через общий session_manager, поэтому замеряется запись в транзакции запроса
+    get_settings().WRITE_BEHIND = False
+    app.dependency_overrides[session_manager.get_session] = bench_session
+    app.dependency_overrides[session_manager.get_transaction_session] = bench_session
+    url = "/analyze" if detector is None else f"/analyze?detector={detector}"
+    with open(video_path, "rb") as f:
+        content = f.read()
+
+    latencies, analyzed = [], 0
+    with patch.object(router, "_find_cached_result", no_cached_result), TestClient(app) as client:
+        for run in range(repeat + 1):
+            started = time.perf_counter()
+            response = client.post(url, files={"file": ("clip.mp4", content, "video/mp4")}, params={"debug": "true"})
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            if run == 0:
+                continue  # прогрев: запуск процессов пула
+            latencies.append(elapsed)
+            analyzed = response.json()["timings"]["analyzed_frames"]
+    return latencies, analyzed
+
+
+def run_case(
+        target: str, spec: ClipSpec, video_path: str, repeat: int, detector: str | None, db_url: str, log_level: str,
+) -> dict:
+    """Замер одного случая; выполняется в отдельном процессе"""
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level=log_level)
+    if target == "detect":
+        latencies, analyzed = _bench_detect(video_path, repeat, detector)
+    else:
+        latencies, analyzed = _bench_api(video_path, repeat, detector, db_url)
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        "case": f"{target}/{spec.name}",
+        "target": target,
+        "clip": asdict(spec),
+        "frames": spec.total_frames,
+        "analyzed_frames": analyzed,
+        "runs": len(latencies),
+        "frames_per_second": round(spec.total_frames / p50, 1),
+        "analyzed_per_second": round(analyzed / p50, 1),
+        "p50_ms": round(p50 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "peak_rss_mb": _peak_rss_mb(include_children=target == "api"),
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], max_regression: float) -> tuple[list[dict], list[dict]]:
+    """
+    Сравнивает кадры в секунду со снимком `baseline` по совпадающим случаям.
+
+    Возвращает строки сравнения и регрессии — случаи, где пропускная способность упала
+    больше чем на долю `max_regression`.
+    """
+    previous = {row["case"]: row for row in baseline}
+    rows = []
+    for row in results:
+        before = previous.get(row["case"])
+        if before is None:
+            continue
+        change = row["frames_per_second"] / before["frames_per_second"] - 1
+        rows.append({
+            "case": row["case"],
+            "baseline_fps": before["frames_per_second"],
+            "fps": row["frames_per_second"],
+            "change": round(change, 4),
+            "p99_ms": row["p99_ms"],
+            "baseline_p99_ms": before["p99_ms"],
+        })
+    return rows, [row for row in rows if row["change"] < -max_regression]
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="замеров на случай после прогрева")
+    parser.add_argument("--detector", default=None, help="детектор вместо MOTION_DETECTOR")
+    parser.add_argument("--clip-dir", default=os.path.join(tempfile.gettempdir(), "movement_bench_clips"))
+    parser.add_argument("--db-url", default=os.getenv("TEST_DB_URL"), help="база для api; по умолчанию TEST_DB_URL")
+    parser.add_argument("--log-level", default="WARNING", help="уровень логов сервиса во время замера")
+    parser.add_argument("--output", help="куда сохранить JSON с результатами")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="допустимое падение кадров в секунду")
+    args = parser.parse_args()
+
+    if "api" in args.targets and not args.db_url:
+        from app.config import get_database_url
+        args.db_url = get_database_url(for_tests=True)
+
+    os.makedirs(args.clip_dir, exist_ok=True)
+    specs = PRESETS[args.preset]
+    paths = {spec: clip_path(args.clip_dir, spec) for spec in specs}
+
+    results = []
+    print(f"{'case':<52}{'fps':>10}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>9}", file=sys.stderr)
+    for target in args.targets:
+        for spec in specs:
+            # Новый процесс на случай: пиковый RSS и состояние пула не переходят между случаями
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                row = pool.submit(
+                    run_case, target, spec, paths[spec], args.repeat, args.detector, args.db_url, args.log_level,
+                ).result()
+            results.append(row)
+            print(
+                f"{row['case']:<52}{row['frames_per_second']:>10.1f}{row['p50_ms']:>10.1f}"
+                f"{row['p99_ms']:>10.1f}{row['peak_rss_mb']:>9.1f}",
+                file=sys.stderr,
+            )
+
+    report = {
+        "environment": environment(),
+        "preset": args.preset,
+        "repeat": args.repeat,
+        "detector": args.detector,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline["results"], args.max_regression)
+        print(f"\n{'case':<52}{'baseline':>10}{'fps':>10}{'change':>9}", file=sys.stderr)
+        for row in rows:
+            print(f"{row['case']:<52}{row['baseline_fps']:>10.1f}{row['fps']:>10.1f}{row['change']:>+9.1%}", file=sys.stderr)
+        if regressions:
+            print(f"\nПадение больше {args.max_regression:.0%}: {', '.join(row['case'] for row in regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Замер холодного запуска сервиса: сколько проходит от старта интерпретатора до готовности.
+
+Каждый запуск — новый процесс Python, по стадиям:
+- `interpreter` — пустой `python -c pass`, нижняя граница;
+- `import` — `import app.main`;
+- `ready` — импорт, lifespan и первый ответ GET /detectors (через TestClient, без сокета);
+- `first_analysis` — от готовности до результата первого анализа: запуск процесса пула
+  и импорт OpenCV в нём, открытие ролика;
+- `exit` — остановка приложения и выход процесса; зависшие потоки драйвера базы видны здесь.
+
+Результат — медиана и минимум по `--repeat` запускам и список модулей, загруженных
+к моменту готовности. С `--baseline` сравнивается с сохранённым JSON и завершается с кодом 1,
+если медиана какой-либо стадии выросла больше чем на `--max-regression`.
+`--importtime N` печатает N самых долгих импортов `app.main` (python -X importtime).
+
+Запуск:
+    python -m benchmarks.startup --repeat 5 --output startup.json
+    python -m benchmarks.startup --baseline startup.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ("interpreter", "import", "ready", "first_analysis", "exit")
+# Модули, которые сервис должен загружать только по необходимости
+HEAVY_MODULES = ("cv2", "numpy", "asyncpg", "aiosqlite")
+
+# Выполняется в новом процессе; модуль не импортируется, чтобы не загружать лишнего
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.opencv_cam.router import get_analysis_executor
+with TestClient(app.main.app) as client:
+    client.get("/detectors").raise_for_status()
+    ready = time.perf_counter()
+    loaded = [name for name in {heavy!r} if name in sys.modules]
+    result = client.portal.call(get_analysis_executor().analyze, sys.argv[1])
+    assert result["status"] == "completed", result
+    analyzed = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "ready": ready - started,
+    "first_analysis": analyzed - ready,
+    "stopped": time.perf_counter(),
+    "loaded_at_ready": loaded,
+}}))
+""".format(heavy=HEAVY_MODULES)
+
+
+def service_env() -> dict[str, str]:
+    env = dict(os.environ)
+    # База при запуске не открывается, но поля DB_* обязательны в настройках
+    defaults = {"DB_USER": "startup", "DB_PASSWORD": "startup", "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "startup"}
+    for name, value in defaults.items():
+        env.setdefault(name, value)
+    return env
+
+
+def run_once(video_path: str, env: dict[str, str]) -> dict:
+    """Один холодный запуск; время стадий в секундах"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True, env=env)
+    interpreter = time.perf_counter() - started
+
+    process = subprocess.run([sys.executable, "-c", PROBE, video_path], env=env, capture_output=True, text=True)
+    finished = time.perf_counter()
+    if process.returncode:
+        sys.stderr.write(process.stderr)
+        raise RuntimeError(f"Процесс замера завершился с кодом {process.returncode}")
+    probe = json.loads(process.stdout.strip().splitlines()[-1])
+    # perf_counter общий для процессов одной машины: выход считается от остановки приложения
+    return {
+        "interpreter": interpreter,
+        "import": probe["import"],
+        "ready": probe["ready"],
+        "first_analysis": probe["first_analysis"],
+        "exit": finished - probe["stopped"],
+        "loaded_at_ready": probe["loaded_at_ready"],
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    return {
+        stage: {
+            "median_ms": round(statistics.median(run[stage] for run in runs) * 1000, 1),
+            "min_ms": round(min(run[stage] for run in runs) * 1000, 1),
+        }
+        for stage in STAGES
+    }
+
+
+def compare(stages: dict, baseline: dict, max_regression: float) -> tuple[list[dict], list[dict]]:
+    """Строки сравнения медиан со снимком `baseline` и стадии, ставшие медленнее больше чем на долю `max_regression`"""
+    rows = []
+    for stage, row in stages.items():
+        before = baseline.get(stage)
+        if before is None or not before["median_ms"]:
+            continue
+        rows.append({
+            "stage": stage,
+            "baseline_ms": before["median_ms"],
+            "median_ms": row["median_ms"],
+            "change": round(row["median_ms"] / before["median_ms"] - 1, 4),
+        })
+    return rows, [row for row in rows if row["change"] > max_regression]
+
+
+def slowest_imports(env: dict[str, str], top: int) -> list[dict]:
+    """Самые долгие импорты `app.main` по суммарному времени вместе с вложенными"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], check=True, env=env, capture_output=True, text=True,
+    )
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imports.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda row: row["cumulative_ms"], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="холодных запусков")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="показать N самых долгих импортов")
+    parser.add_argument("--output", help="куда сохранить JSON с результатами")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="допустимый рост медианы стадии")
+    args = parser.parse_args()
+
+    # Тяжёлые модули нужны только здесь, а не в замеряемых процессах
+    from benchmarks.bench_suite import environment
+    from benchmarks.synthetic import write_synthetic_video
+
+    env = service_env()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = write_synthetic_video(os.path.join(tmp_dir, "clip.mp4"), 320, 240, 15.0, 2.0, motion_density=0.5)
+        runs = [run_once(video_path, env) for _ in range(args.repeat)]
+
+    stages = summarize(runs)
+    print(f"{'stage':<16}{'median ms':>11}{'min ms':>10}", file=sys.stderr)
+    for stage, row in stages.items():
+        print(f"{stage:<16}{row['median_ms']:>11.1f}{row['min_ms']:>10.1f}", file=sys.stderr)
+    print(f"загружены к готовности: {', '.join(runs[-1]['loaded_at_ready']) or '-'}", file=sys.stderr)
+
+    report = {
+        "environment": environment(),
+        "repeat": args.repeat,
+        "stages": stages,
+        "loaded_at_ready": runs[-1]["loaded_at_ready"],
+    }
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports(env, args.importtime)
+        for row in report["slowest_imports"]:
+            print(f"{row['module']:<48}{row['cumulative_ms']:>10.1f}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(stages, baseline["stages"], args.max_regression)
+        print(f"\n{'stage':<16}{'baseline':>10}{'median':>10}{'change':>9}", file=sys.stderr)
+        for row in rows:
+            print(f"{row['stage']:<16}{row['baseline_ms']:>10.1f}{row['median_ms']:>10.1f}{row['change']:>+9.1%}", file=sys.stderr)
+        if regressions:
+            print(f"\nРост больше {args.max_regression:.0%}: {', '.join(row['stage'] for row in regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+
+def write_synthetic_video(
+        path: str,
+        width: int = 640,
+        height: int = 480,
+        fps: float = 30.0,
+        seconds: float = 10.0,
+        motion_density: float = 1.0,
+        noise: int = 0,
+        seed: int = 0,
+) -> str:
+    """
+    Генерирует тестовый ролик: статичный фон и квадрат, который движется
+    в доле `motion_density` кадров (движение — в начале ролика, дальше квадрат стоит).
+    """
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Cannot open video writer for {path}")
+
+    background = np.full((height, width, 3), 40, dtype=np.uint8)
+    cv2.putText(background, "synthetic", (width // 10, height // 5), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (90, 90, 90), 2)
+    size = max(8, min(width, height) // 8)
+    total_frames = int(fps * seconds)
+    moving_frames = int(total_frames * motion_density)
+    step = max(1, (width - size) // max(1, int(fps * 2)))
+
+    try:
+        x = 0
+        for i in range(total_frames):
+            frame = background.copy()
+            if i < moving_frames:
+                x = (i * step) % (width - size)
+            y = height // 2 - size // 2
+            cv2.rectangle(frame, (x, y), (x + size, y + size), (230, 230, 230), -1)
+            if noise:
+                frame = cv2.add(frame, rng.integers(0, noise, frame.shape, dtype=np.uint8))
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
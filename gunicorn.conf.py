@@ -0,0 +1,57 @@
+"""
+Продакшен-запуск: gunicorn app.main:app
+
+Число воркеров и процессов анализа считается по квоте CPU контейнера, если не задано
+в SERVER_WORKERS / ANALYSIS_WORKERS. Конфиг выполняется до импорта приложения, поэтому
+здесь же через окружение передаются число воркеров (пул анализа делит ядра между ними)
+и каталог PROMETHEUS_MULTIPROC_DIR: prometheus_client выбирает режим нескольких процессов при импорте.
+
+Потоки /streams хранятся в памяти процесса, поэтому с несколькими воркерами они отключены
+(503); для них нужен отдельный запуск с SERVER_WORKERS=1.
+"""
+import os
+
+from app.config import get_settings
+from app.server import (
+    SERVER_PROCESSES_ENV,
+    analysis_workers,
+    available_cpus,
+    prepare_multiprocess_dir,
+    server_workers,
+)
+
+settings = get_settings()
+_cpus = available_cpus()
+
+bind = f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+workers = server_workers(settings, _cpus)
+worker_class = "app.worker.ServiceWorker"
+preload_app = settings.SERVER_PRELOAD
+timeout = settings.SERVER_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+# Воркер при остановке дожидается текущих анализов (lifespan), не дольше ANALYSIS_SHUTDOWN_TIMEOUT
+graceful_timeout = int(settings.ANALYSIS_SHUTDOWN_TIMEOUT) + 5
+accesslog = "-"
+
+os.environ[SERVER_PROCESSES_ENV] = str(workers)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+# Предзагруженное приложение создаёт файлы метрик ещё до on_starting
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    # Файлы прошлого запуска и мастера; воркеры после fork открывают свои по pid
+    prepare_multiprocess_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    server.log.info(
+        f"CPU: {_cpus}, воркеров: {workers}, процессов анализа на воркер: {analysis_workers(settings, _cpus, workers)}"
+    )
+    if workers > 1 and settings.STREAMS_ENABLED:
+        server.log.warning(
+            f"Потоки /streams не делятся между {workers} воркерами и отключены: для них нужен запуск с SERVER_WORKERS=1"
+        )
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -6,12 +6,15 @@ from sqlalchemy import NullPool
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.opencv_cam.models import Base
-from app.config import get_database_url
+from app.config import get_database_url, get_settings
 from app.dao.session_maker import DatabaseSessionManager, session_manager
 from app.main import app
+from benchmarks.synthetic import write_synthetic_video
 
 
 TEST_DB_URL = os.getenv("TEST_DB_URL", get_database_url(for_tests=True))
+# Тесты с TestClient проходят lifespan; процессы пула нужны лишь немногим из них
+get_settings().ANALYSIS_PREWARM = False
 
 test_engine = create_async_engine(
     TEST_DB_URL,
@@ -44,6 +47,23 @@ async def init_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(scope="session")
+def video_factory(tmp_path_factory):
+    """Создаёт синтетические ролики 1280x720 с заданной долей движения"""
+    directory = tmp_path_factory.mktemp("videos")
+
+    def factory(motion_density: float, noise: int = 0) -> str:
+        path = directory / f"clip_{motion_density}_{noise}.mp4"
+        if not path.exists():
+            write_synthetic_video(
+                str(path), width=1280, height=720, fps=10.0, seconds=6.0,
+                motion_density=motion_density, noise=noise,
+            )
+        return str(path)
+
+    return factory
+
+
 @pytest.fixture
 def client():
     app.dependency_overrides = {}
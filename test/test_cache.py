@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from app.opencv_cam.cache import ResultCache
+
+
+class TestResultCache:
+    """Тесты LRU-кэша результатов"""
+
+    def test_evicts_least_recently_used(self):
+        """Тест вытеснения давно не использованной записи"""
+        cache = ResultCache(max_size=2)
+        cache.set("a", "p", {"status": "completed"})
+        cache.set("b", "p", {"status": "completed"})
+        cache.get("a", "p")
+        cache.set("c", "p", {"status": "completed"})
+
+        assert cache.get("a", "p") is not None
+        assert cache.get("b", "p") is None
+        assert len(cache) == 2
+
+    def test_expires_by_ttl(self):
+        """Тест устаревания записи по TTL"""
+        cache = ResultCache(ttl=10)
+        with patch("app.opencv_cam.cache.time.monotonic", return_value=100.0):
+            cache.set("a", "p", {"status": "completed"})
+        with patch("app.opencv_cam.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a", "p") is None
+        assert len(cache) == 0
+
+    def test_key_includes_params_fingerprint(self):
+        """Тест: другие параметры анализатора — другой ключ"""
+        cache = ResultCache()
+        cache.set("a", "p1", {"status": "completed"})
+
+        assert cache.get("a", "p2") is None
@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+
+from app.opencv_cam.dao import AnalysisRollupDAO, VideoAnalysisDAO
+from app.opencv_cam.models import AnalysisStatus, VideoAnalysis
+from app.opencv_cam.schemas import (
+    AnalysisCursor,
+    AnalysisListFilter,
+    VideoBulkUpdate,
+    VideoCreate,
+    VideoPendingCreate,
+    VideoUpdate,
+)
+from test.conftest import TestingSessionLocal
+
+
+def make_analysis(**overrides) -> VideoCreate:
+    values = {
+        "filename": "clip.mp4",
+        "processing_time": 1.5,
+        "movement_detected": True,
+        "status": AnalysisStatus.COMPLETED,
+        "movement_percentage": 42.0,
+        "duration": 12.0,
+        "content_hash": "a" * 64,
+        "params_fingerprint": "f" * 16,
+        "fps": 25.0,
+        "width": 1280,
+        "height": 720,
+        "total_frames": 300,
+        "analyzed_frames": 24,
+        "analyzer_params": {"min_contour_area": 500},
+    }
+    values.update(overrides)
+    return VideoCreate(**values)
+
+
+class VideoUpsert(VideoCreate):
+    id: int
+
+
+async def add_history(count: int, start: datetime) -> None:
+    """Записи с заданным created_at: по две на каждую секунду, движение — в каждой третьей"""
+    async with TestingSessionLocal.create_session() as session:
+        session.add_all([
+            VideoAnalysis(
+                filename=f"{'cam' if i % 2 else 'door'}_{i}.mp4",
+                movement_detected=i % 3 == 0,
+                created_at=start + timedelta(seconds=i // 2),
+            )
+            for i in range(count)
+        ])
+        await session.commit()
+
+
+class TestVideoAnalysisDAO:
+    """Тесты запросов VideoAnalysisDAO"""
+
+    @pytest.mark.asyncio
+    async def test_find_cached_result(self):
+        """Тест поиска готового результата по хэшу содержимого и параметрам"""
+        async with TestingSessionLocal.create_session() as session:
+            await VideoAnalysisDAO.add_many(session, [
+                make_analysis(),
+                make_analysis(status=AnalysisStatus.FAILED, movement_percentage=0.0),
+            ])
+            await session.commit()
+
+        async with TestingSessionLocal.create_session() as session:
+            result = await VideoAnalysisDAO.find_cached_result(session, "a" * 64, "f" * 16)
+            other_params = await VideoAnalysisDAO.find_cached_result(session, "a" * 64, "e" * 16)
+
+        assert result == {
+            "has_movement": True,
+            "movement_percentage": 42.0,
+            "duration": 12.0,
+            "processing_time": 1.5,
+            "status": AnalysisStatus.COMPLETED,
+            "timeline": None,
+            "fps": 25.0,
+            "width": 1280,
+            "height": 720,
+            "total_frames": 300,
+            "analyzed_frames": 24,
+        }
+        assert other_params is None
+
+    @pytest.mark.asyncio
+    async def test_add_logs_timeline_size(self):
+        """Тест: в лог добавления попадает размер таймлайна, а не его байты"""
+        messages = []
+        handler_id = logger.add(messages.append, level="INFO", format="{message}")
+        try:
+            async with TestingSessionLocal.create_session() as session:
+                await VideoAnalysisDAO.add(session, make_analysis(timeline=b"\x00\xff" * 512))
+                await session.commit()
+        finally:
+            logger.remove(handler_id)
+
+        logged = "".join(messages)
+        assert "timeline': '<1024 байт>'" in logged
+        assert "\\x00" not in logged
+
+    @pytest.mark.asyncio
+    async def test_insert_returning_ids(self):
+        """Тест пакетной вставки: id в порядке записей, незаданные поля получают значения по умолчанию"""
+        async with TestingSessionLocal.create_session() as session:
+            ids = await VideoAnalysisDAO.insert_returning_ids(session, [
+                make_analysis(filename="a.mp4"),
+                VideoPendingCreate(filename="b.mp4", status=AnalysisStatus.PENDING, progress=0.0),
+                make_analysis(filename="c.mp4"),
+            ])
+            await session.commit()
+
+        async with TestingSessionLocal.create_session() as session:
+            records = [await VideoAnalysisDAO.find_one_or_none_by_id(row_id, session) for row_id in ids]
+
+        assert len(set(ids)) == 3
+        assert [record.filename for record in records] == ["a.mp4", "b.mp4", "c.mp4"]
+        assert records[0].progress == 100.0
+        assert records[0].analyzer_params == {"min_contour_area": 500}
+        assert (records[0].width, records[0].height, records[0].analyzed_frames) == (1280, 720, 24)
+        assert records[1].status == AnalysisStatus.PENDING
+
+    @pytest.mark.asyncio
+    async def test_find_page_walks_history(self):
+        """Тест постраничной выдачи по курсору: без пропусков и повторов при одинаковом created_at"""
+        await add_history(11, datetime(2026, 1, 1))
+        seen, after = [], None
+
+        async with TestingSessionLocal.create_session() as session:
+            while True:
+                page = await VideoAnalysisDAO.find_page(session, AnalysisListFilter(), limit=3, after=after)
+                if not page:
+                    break
+                seen.extend(page)
+                after = AnalysisCursor(created_at=page[-1].created_at, id=page[-1].id)
+
+        keys = [(record.created_at, record.id) for record in seen]
+        assert len(keys) == 11
+        assert keys == sorted(keys, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_find_page_filters(self):
+        """Тест фильтров по движению, префиксу имени и интервалу времени"""
+        start = datetime(2026, 1, 1)
+        await add_history(12, start)
+
+        async with TestingSessionLocal.create_session() as session:
+            moving = await VideoAnalysisDAO.find_page(session, AnalysisListFilter(movement_detected=True), limit=100)
+            cams = await VideoAnalysisDAO.find_page(session, AnalysisListFilter(filename_prefix="cam_"), limit=100)
+            window = await VideoAnalysisDAO.find_page(session, AnalysisListFilter(
+                created_from=start + timedelta(seconds=1),
+                created_to=start + timedelta(seconds=3),
+                movement_detected=False,
+            ), limit=100)
+            escaped = await VideoAnalysisDAO.find_page(session, AnalysisListFilter(filename_prefix="c%"), limit=100)
+
+        assert sorted(record.filename for record in moving) == sorted(f"{'cam' if i % 2 else 'door'}_{i}.mp4" for i in (0, 3, 6, 9))
+        assert len(cams) == 6 and all(record.filename.startswith("cam_") for record in cams)
+        assert sorted(record.filename for record in window) == ["cam_5.mp4", "door_2.mp4", "door_4.mp4"]
+        assert escaped == []
+
+    @pytest.mark.asyncio
+    async def test_bulk_update(self):
+        """Тест пакетного обновления: разные наборы полей, записи без id и несуществующие id"""
+        async with TestingSessionLocal.create_session() as session:
+            ids = await VideoAnalysisDAO.insert_returning_ids(session, [make_analysis() for _ in range(5)])
+            updated = await VideoAnalysisDAO.bulk_update(session, [
+                VideoBulkUpdate(id=ids[0], movement_detected=False, movement_percentage=None),
+                VideoBulkUpdate(id=ids[1], movement_detected=False, movement_percentage=None),
+                VideoBulkUpdate(id=ids[2], movement_detected=False, movement_percentage=None),
+                VideoBulkUpdate(id=ids[3], error="rescored"),
+                VideoBulkUpdate(id=999_999, error="missing"),
+            ], chunk_size=2)
+            await session.commit()
+
+        async with TestingSessionLocal.create_session() as session:
+            records = [await VideoAnalysisDAO.find_one_or_none_by_id(row_id, session) for row_id in ids]
+
+        assert updated == 4
+        assert [record.movement_detected for record in records] == [False, False, False, True, True]
+        assert records[0].movement_percentage is None
+        assert records[3].error == "rescored" and records[3].movement_percentage == 42.0
+
+    @pytest.mark.asyncio
+    async def test_upsert_many(self):
+        """Тест upsert: вставка новых, обновление существующих, последний из повторов побеждает"""
+        async with TestingSessionLocal.create_session() as session:
+            ids = await VideoAnalysisDAO.insert_returning_ids(session, [make_analysis(filename="old.mp4")])
+            affected = await VideoAnalysisDAO.upsert_many(session, [
+                VideoUpsert(id=ids[0], filename="first.mp4", processing_time=1.0, movement_detected=True),
+                VideoUpsert(id=ids[0], filename="updated.mp4", processing_time=1.0, movement_detected=False),
+                VideoUpsert(id=ids[0] + 1, filename="new.mp4", processing_time=2.0, movement_detected=True),
+            ], index_elements=["id"], update_fields=["filename", "movement_detected"])
+            skipped = await VideoAnalysisDAO.upsert_many(session, [
+                VideoUpsert(id=ids[0], filename="ignored.mp4", processing_time=1.0, movement_detected=True),
+            ], index_elements=["id"], update_fields=[])
+            await session.commit()
+
+        async with TestingSessionLocal.create_session() as session:
+            existing = await VideoAnalysisDAO.find_one_or_none_by_id(ids[0], session)
+            inserted = await VideoAnalysisDAO.find_one_or_none_by_id(ids[0] + 1, session)
+
+        assert affected == 2
+        assert skipped == 0
+        assert existing.filename == "updated.mp4" and existing.movement_detected is False
+        assert existing.processing_time == 1.5
+        assert inserted.filename == "new.mp4"
+
+    @pytest.mark.asyncio
+    async def test_upsert_many_unsupported_dialect(self):
+        """Тест upsert: для диалекта без ON CONFLICT — ValueError с его именем"""
+        session = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+
+        with pytest.raises(ValueError, match="mysql"):
+            await VideoAnalysisDAO.upsert_many(session, [], index_elements=["id"])
+
+
+class TestAnalysisRollupDAO:
+    """Тесты почасовых итогов"""
+
+    @pytest.mark.asyncio
+    async def test_record_accumulates(self):
+        """Тест: итоги прибавляются к строке часа, незавершённые записи не учитываются"""
+        at = datetime(2026, 3, 1, 10, 15)
+        async with TestingSessionLocal.create_session() as session:
+            await AnalysisRollupDAO.record(session, [
+                make_analysis(processing_time=0.4),
+                make_analysis(processing_time=3.0, movement_detected=False),
+                VideoUpdate(status=AnalysisStatus.PROCESSING),
+            ], at=at)
+            await AnalysisRollupDAO.record(session, [
+                VideoUpdate(status=AnalysisStatus.FAILED, error="boom"),
+                make_analysis(processing_time=90.0),
+            ], at=at + timedelta(minutes=30))
+            await AnalysisRollupDAO.record(session, [make_analysis()], at=at + timedelta(hours=1))
+            await session.commit()
+
+        async with TestingSessionLocal.create_session() as session:
+            rollups = await AnalysisRollupDAO.find_range(session, datetime(2026, 3, 1), datetime(2026, 3, 2))
+
+        assert [rollup.bucket_start for rollup in rollups] == [datetime(2026, 3, 1, 10), datetime(2026, 3, 1, 11)]
+        first = rollups[0]
+        assert (first.total, first.completed, first.failed, first.with_movement) == (4, 3, 1, 2)
+        assert first.processing_time_sum == pytest.approx(93.4)
+        assert (first.pt_bucket_0, first.pt_bucket_3, first.pt_bucket_7) == (1, 1, 1)
+        assert rollups[1].total == 1
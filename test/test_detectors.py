@@ -0,0 +1,85 @@
+import pytest
+
+from app.opencv_cam.detectors import DETECTORS, DetectorKind, FrameDiffDetector, detector_profiles
+from app.opencv_cam.executor import AnalysisExecutor
+from app.opencv_cam.streaming import StreamMonitor
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer, params_with_detector
+
+
+class TestDetectors:
+    """Тесты детекторов движения"""
+
+    @pytest.mark.parametrize("motion_density", [0.0, 0.05, 0.3, 1.0])
+    def test_mog2_matches_frame_diff(self, video_factory, motion_density):
+        """Тест: MOG2 при меньшей ширине анализа принимает то же решение, что и разница кадров"""
+        video_path = video_factory(motion_density)
+
+        frame_diff = VideoAnalyzer(analysis_width=640)._detect_movement(video_path)
+        mog2 = VideoAnalyzer(analysis_width=320, detector=DetectorKind.MOG2)._detect_movement(video_path)
+
+        assert mog2["has_movement"] == frame_diff["has_movement"]
+        assert mog2["movement_percentage"] == pytest.approx(frame_diff["movement_percentage"], abs=10.0)
+
+    @pytest.mark.parametrize("detector", [DetectorKind.MOG2, DetectorKind.KNN])
+    def test_background_model_ignores_noise(self, video_factory, detector):
+        """Тест: шум сенсора на статичной сцене уходит в фон"""
+        video_path = video_factory(0.0, noise=20)
+
+        result = VideoAnalyzer(analysis_width=320, detector=detector)._detect_movement(video_path)
+
+        assert result["has_movement"] is False
+
+    @pytest.mark.parametrize("motion_density, expected", [(0.05, False), (1.0, True)])
+    def test_knn_clear_cases(self, video_factory, motion_density, expected):
+        """
+        Тест KNN на однозначных роликах. Остановившийся объект KNN считает движущимся,
+        пока тот не войдёт в модель фона, поэтому промежуточные доли не сравниваются.
+        """
+        video_path = video_factory(motion_density)
+
+        result = VideoAnalyzer(analysis_width=320, detector=DetectorKind.KNN)._detect_movement(video_path)
+
+        assert result["has_movement"] is expected
+
+    def test_detector_changes_fingerprint(self):
+        """Тест: детектор и его параметры входят в отпечаток параметров анализа"""
+        fingerprints = {VideoAnalyzer(detector=kind).fingerprint for kind in DetectorKind}
+        tuned = VideoAnalyzer(detector=DetectorKind.MOG2, detector_params={"history": 50})
+
+        assert len(fingerprints) == len(DetectorKind)
+        assert tuned.fingerprint not in fingerprints
+        assert tuned.params["detector_params"]["history"] == 50
+
+    def test_unknown_detector_params(self):
+        """Тест: неизвестный параметр детектора отклоняется при создании анализатора"""
+        with pytest.raises(TypeError):
+            VideoAnalyzer(detector=DetectorKind.MOG2, detector_params={"blur_size": 21})
+
+    def test_params_of_other_detector_dropped(self):
+        """Тест: параметры заданного детектора не передаются детектору другого вида из запроса"""
+        params = {"detector": DetectorKind.FRAME_DIFF, "detector_params": {"diff_threshold": 30}}
+
+        assert params_with_detector(params, None) is params
+        assert params_with_detector(params, "frame_diff")["detector_params"] == {"diff_threshold": 30}
+        assert "detector_params" not in params_with_detector(params, "mog2")
+
+        executor = AnalysisExecutor(max_workers=1, analyzer_params=params)
+        assert executor.params_for("mog2")["detector_params"]["history"] == 200
+        assert executor.params_for(None)["detector_params"]["diff_threshold"] == 30
+        assert StreamMonitor(analyzer_params=params)._analyzer("knn").detector == DetectorKind.KNN
+
+    def test_background_model_not_split(self, video_factory):
+        """Тест: видео с моделью фона анализируется одним отрезком"""
+        video_path = video_factory(0.3)
+
+        plan = VideoAnalyzer(detector=DetectorKind.MOG2).plan_segments(video_path, max_segments=4, min_segment_frames=2)
+
+        assert len(plan["segments"]) == 1
+
+    def test_profiles(self):
+        """Тест профилей стоимости"""
+        profiles = {profile["detector"]: profile for profile in detector_profiles()}
+
+        assert set(profiles) == set(DETECTORS)
+        assert profiles[DetectorKind.FRAME_DIFF]["relative_cost"] == FrameDiffDetector.cost.relative_cost
+        assert all(profile["relative_cost"] >= 1.0 for profile in profiles.values())
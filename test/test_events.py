@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.opencv_cam.events import EventBroadcaster, EventMessage
+
+
+def decode(message: EventMessage) -> dict:
+    event_line, data_line = message.encoded.decode().strip().split("\n")
+    assert event_line == f"event: {message.data['event']}"
+    return json.loads(data_line.removeprefix("data: "))
+
+
+class TestEventBroadcaster:
+    """Тесты рассылки событий подписчикам"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_encodes_once(self):
+        """Тест: событие кодируется один раз и доходит до всех подписчиков темы"""
+        broadcaster = EventBroadcaster()
+
+        with broadcaster.subscribe("analysis:1") as first, broadcaster.subscribe("analysis:1") as second, \
+                broadcaster.subscribe("analysis:2") as other:
+            broadcaster.publish("analysis:1", {"event": "progress", "progress": 50.0})
+
+            received = [await first.get(1), await second.get(1)]
+            assert received[0] is received[1]
+            assert decode(received[0]) == {"event": "progress", "progress": 50.0}
+            assert await other.get(0.01) is None
+            assert broadcaster.subscribers("analysis:1") == 2
+
+        assert broadcaster.subscribers("analysis:1") == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_keeps_latest_events(self):
+        """Тест: буфер медленного подписчика ограничен, вытесняются старые события, итог доходит"""
+        broadcaster = EventBroadcaster(buffer_size=3)
+
+        with broadcaster.subscribe("analysis:1") as subscription:
+            for i in range(10):
+                broadcaster.publish("analysis:1", {"event": "progress", "analyzed_frames": i})
+            broadcaster.publish("analysis:1", {"event": "result", "status": "completed"}, final=True)
+
+            received = [message.data async for message in subscription]
+
+        assert [data.get("analyzed_frames") for data in received] == [8, 9, None]
+        assert received[-1]["event"] == "result"
+        assert subscription.dropped == 8
+        assert subscription.closed
+
+    @pytest.mark.asyncio
+    async def test_threadsafe_publisher(self):
+        """Тест публикации из другого потока: событие из final_events закрывает тему"""
+        broadcaster = EventBroadcaster()
+
+        with broadcaster.subscribe("stream:cam") as subscription:
+            publish = broadcaster.threadsafe_publisher("stream:cam", final_events={"stream_end"})
+            thread = threading.Thread(target=lambda: [publish({"event": "motion_start"}), publish({"event": "stream_end"})])
+            thread.start()
+
+            received = await asyncio.wait_for(self._collect(subscription), 5)
+            thread.join()
+
+        assert received == ["motion_start", "stream_end"]
+
+    @staticmethod
+    async def _collect(subscription) -> list[str]:
+        return [message.data["event"] async for message in subscription]
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.opencv_cam.executor import AnalysisExecutor, AnalysisQueueFullError
+from benchmarks.synthetic import write_synthetic_video
+
+
+class TestAnalysisExecutor:
+    """Тесты пула процессов анализа"""
+
+    @pytest.mark.asyncio
+    async def test_analyze_runs_in_worker_process(self, tmp_path):
+        """Тест анализа в отдельном процессе: ошибка чтения возвращается как результат"""
+        executor = AnalysisExecutor(max_workers=1, queue_size=0)
+        executor.start()
+        try:
+            result = await executor.analyze(str(tmp_path / "missing.mp4"))
+        finally:
+            await executor.shutdown(timeout=10)
+
+        assert result["status"] == "failed"
+        assert "Cannot open video file" in result["error_message"]
+
+    @pytest.mark.asyncio
+    async def test_prewarm_starts_all_workers(self, tmp_path):
+        """Тест: прогрев запускает все процессы пула без ожидания и не занимает места в очереди"""
+        executor = AnalysisExecutor(max_workers=2, queue_size=0)
+        executor.start()
+        try:
+            executor.prewarm()
+            assert len(executor._pool._processes) == 2
+
+            result = await executor.analyze(str(tmp_path / "missing.mp4"))
+        finally:
+            await executor.shutdown(timeout=10)
+
+        assert result["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_analyze_rejects_when_saturated(self):
+        """Тест отказа при исчерпании мест в очереди"""
+        executor = AnalysisExecutor(max_workers=1, queue_size=0)
+        executor.start()
+        await executor._slots.acquire()
+        try:
+            with pytest.raises(AnalysisQueueFullError):
+                await executor.analyze("video.mp4")
+        finally:
+            executor._slots.release()
+            await executor.shutdown(timeout=10)
+
+    @pytest.mark.asyncio
+    async def test_analyze_rejects_after_shutdown(self):
+        """Тест отказа после остановки пула"""
+        executor = AnalysisExecutor(max_workers=1, queue_size=0)
+        executor.start()
+        await executor.shutdown(timeout=10)
+
+        with pytest.raises(AnalysisQueueFullError):
+            await asyncio.wait_for(executor.analyze("video.mp4"), 1)
+
+    @pytest.mark.asyncio
+    async def test_progress_from_worker(self, tmp_path):
+        """Тест: прогресс анализа из процесса-воркера приходит в event loop вызывающего"""
+        path = write_synthetic_video(str(tmp_path / "clip.mp4"), width=160, height=120, fps=10.0, seconds=30.0)
+        progress = []
+        executor = AnalysisExecutor(max_workers=1, queue_size=0)
+        executor.start()
+        try:
+            result = await executor.analyze(path, on_progress=progress.append)
+            # Сообщения о прогрессе идут отдельным каналом и могут прийти чуть позже результата
+            for _ in range(100):
+                if len(progress) == 2:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await executor.shutdown(timeout=10)
+
+        assert result["status"] == "completed"
+        assert [item["analyzed_frames"] for item in progress] == [25, 50]
+        assert progress[0]["expected_frames"] == result["analyzed_frames"] == 60
+        assert progress[1]["progress"] == pytest.approx(83.3)
+        assert not executor._progress_handlers
+
+    @pytest.mark.asyncio
+    async def test_split_analysis_matches_sequential(self, tmp_path):
+        """Тест: длинное видео анализируется по отрезкам в разных воркерах с тем же результатом"""
+        path = write_synthetic_video(str(tmp_path / "clip.mp4"), width=160, height=120, fps=10.0, seconds=30.0,
+                                     motion_density=0.4)
+        sequential = AnalysisExecutor(max_workers=1, queue_size=0)
+        split = AnalysisExecutor(max_workers=3, queue_size=0, segments=0, segment_min_frames=20)
+        progress = []
+        sequential.start()
+        split.start()
+        try:
+            expected = await sequential.analyze(path)
+            result = await split.analyze(path, on_progress=progress.append)
+        finally:
+            await sequential.shutdown(timeout=10)
+            await split.shutdown(timeout=10)
+
+        assert result["status"] == "completed"
+        for key in ("has_movement", "movement_percentage", "analyzed_frames", "timeline", "width", "total_frames"):
+            assert result[key] == expected[key]
+        assert [item["analyzed_frames"] for item in progress] == [20, 40, 60]
@@ -0,0 +1,141 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.opencv_cam.ingest import (
+    NotAVideoError,
+    RequestSizeLimitMiddleware,
+    UploadTooLargeError,
+    extract_archive,
+    ingest_upload,
+)
+
+
+class TestIngestUpload:
+    """Тесты потокового сохранения загрузок"""
+
+    @pytest.mark.asyncio
+    async def test_copies_in_chunks(self):
+        """Тест копирования загрузки кусками во временный файл"""
+        content = os.urandom(10_000)
+        upload = UploadFile(filename="clip.avi", file=io.BytesIO(content))
+
+        video = await ingest_upload(upload, max_size=20_000, chunk_size=1024)
+        try:
+            assert video.owned
+            assert video.size == len(content)
+            assert video.path.endswith(".avi")
+            assert video.content_hash == hashlib.sha256(content).hexdigest()
+            with open(video.path, "rb") as f:
+                assert f.read() == content
+        finally:
+            video.cleanup()
+
+        assert not os.path.exists(video.path)
+
+    @pytest.mark.asyncio
+    async def test_rejects_too_large_upload(self, tmp_path, monkeypatch):
+        """Тест отказа при превышении размера: временный файл удаляется"""
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        upload = UploadFile(filename="clip.mp4", file=io.BytesIO(b"x" * 5000))
+
+        with pytest.raises(UploadTooLargeError):
+            await ingest_upload(upload, max_size=4096, chunk_size=1024)
+
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_zero_copy_for_spooled_file(self):
+        """Тест передачи пути к уже сброшенному на диск файлу загрузки без копирования"""
+        content = os.urandom(4096)
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(content)
+        upload = UploadFile(filename="clip.mp4", file=spooled)
+
+        video = await ingest_upload(upload, max_size=10_000, allow_zero_copy=True)
+
+        assert not video.owned
+        assert video.size == len(content)
+        assert video.content_hash == hashlib.sha256(content).hexdigest()
+        with open(video.path, "rb") as f:
+            assert f.read() == content
+        video.cleanup()
+        assert not spooled.closed
+        spooled.close()
+
+    def test_extract_tar_archive(self):
+        """Тест распаковки tar.gz: видео сохраняются, прочие файлы и слишком большие видео — ошибки"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for name, content in [("a.mp4", b"a" * 100), ("big.avi", b"b" * 5000), ("notes.txt", b"text")]:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+
+        items = dict(extract_archive(buffer, "clips.tar.gz", max_size=1000, max_files=10, chunk_size=256))
+        try:
+            assert items["a.mp4"].size == 100
+            assert items["a.mp4"].content_hash == hashlib.sha256(b"a" * 100).hexdigest()
+            assert isinstance(items["big.avi"], UploadTooLargeError)
+            assert isinstance(items["notes.txt"], NotAVideoError)
+        finally:
+            items["a.mp4"].cleanup()
+
+        with pytest.raises(UploadTooLargeError):
+            extract_archive(buffer, "clips.tar.gz", max_size=1000, max_files=1)
+
+
+class TestRequestSizeLimit:
+    """Тесты ограничения размера тела запроса до разбора формы"""
+
+    @staticmethod
+    def make_client() -> TestClient:
+        app = FastAPI()
+        app.add_middleware(RequestSizeLimitMiddleware, limits={"/upload": 1000})
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            return {"size": len(await file.read())}
+
+        @app.post("/other")
+        async def other(file: UploadFile = File(...)):
+            return {"size": len(await file.read())}
+
+        return TestClient(app)
+
+    def test_small_upload_passes(self):
+        """Тест: тело в пределах лимита доходит до эндпоинта"""
+        response = self.make_client().post("/upload", files={"file": ("a.mp4", b"a" * 100)})
+        assert response.status_code == 200
+        assert response.json() == {"size": 100}
+
+    def test_content_length_over_limit(self):
+        """Тест: Content-Length больше лимита отклоняется с 413 без чтения тела"""
+        response = self.make_client().post("/upload", files={"file": ("a.mp4", b"a" * 5000)})
+        assert response.status_code == 413
+        assert response.headers["connection"] == "close"
+
+    def test_streamed_body_over_limit(self):
+        """Тест: тело без Content-Length прерывается с 413 на первом куске сверх лимита"""
+        boundary = "limit"
+        chunks = [f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.mp4\"\r\n\r\n".encode()]
+        chunks += [b"a" * 400] * 5
+        chunks.append(f"\r\n--{boundary}--\r\n".encode())
+
+        response = self.make_client().post(
+            "/upload",
+            content=iter(chunks),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+        assert response.status_code == 413
+
+    def test_other_paths_unlimited(self):
+        """Тест: пути без лимита не ограничиваются"""
+        response = self.make_client().post("/other", files={"file": ("a.mp4", b"a" * 5000)})
+        assert response.status_code == 200
@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.opencv_cam.motion import MotionMetric, largest_motion_area, score_mask
+
+
+@pytest.fixture
+def ring_mask():
+    """Маска с кольцом 41x41 (дыра 20x20) и маленьким кругом в стороне"""
+    mask = np.zeros((100, 130), dtype=np.uint8)
+    cv2.rectangle(mask, (10, 10), (50, 50), 255, -1)
+    mask[20:40, 20:40] = 0
+    cv2.circle(mask, (100, 80), 5, 255, -1)
+    return mask
+
+
+class TestMotionMetric:
+    """Тесты оценки области движения на маске"""
+
+    def test_contours_include_holes(self, ring_mask):
+        """Тест: площадь контура включает дыру, площадь в пикселях — нет"""
+        assert largest_motion_area(ring_mask, MotionMetric.CONTOURS) == 1600.0
+        assert largest_motion_area(ring_mask, MotionMetric.COMPONENTS) == 41 * 41 - 400
+        assert largest_motion_area(ring_mask, MotionMetric.BLOCKS, block_size=8) == 41 * 41 - 400
+
+    @pytest.mark.parametrize("metric", list(MotionMetric))
+    def test_empty_mask(self, metric):
+        """Тест пустой маски"""
+        assert score_mask(np.zeros((48, 64), dtype=np.uint8), metric, 10.0) == (0.0, 0)
+
+    def test_small_change_skips_search(self, ring_mask):
+        """Тест: изменившихся пикселей не больше порога — области не ищутся, площадь нулевая"""
+        changed = cv2.countNonZero(ring_mask)
+
+        assert score_mask(ring_mask, MotionMetric.BLOCKS, min_area=changed) == (0.0, changed)
+        assert score_mask(ring_mask, MotionMetric.COMPONENTS, min_area=changed) == (0.0, changed)
+        assert score_mask(ring_mask, MotionMetric.CONTOURS, min_area=changed) == (1600.0, changed)
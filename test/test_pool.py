@@ -0,0 +1,62 @@
+import pytest
+from prometheus_client import CollectorRegistry
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.dao.database import create_engine_from_settings
+from app.dao.pool import DB_POOL_WAIT_SECONDS, PoolCollector
+from test.conftest import TEST_DB_URL
+
+
+def sample(registry: CollectorRegistry, name: str) -> float:
+    return registry.get_sample_value(name)
+
+
+def sample_wait_count() -> float:
+    """Число замеров ожидания соединения в глобальном реестре"""
+    return next(
+        s.value for metric in DB_POOL_WAIT_SECONDS.collect() for s in metric.samples if s.name.endswith("_count")
+    )
+
+
+class TestPoolMetrics:
+    """Тесты настроек пула соединений и его метрик"""
+
+    @pytest.mark.asyncio
+    async def test_collector_reports_pool_state(self):
+        """Тест: пул создаётся по настройкам, метрики отражают занятые и свободные соединения"""
+        engine = create_engine_from_settings(
+            TEST_DB_URL, get_settings().model_copy(update={"DB_POOL_SIZE": 2, "DB_MAX_OVERFLOW": 1}),
+        )
+        registry = CollectorRegistry()
+        registry.register(PoolCollector(engine))
+        waits_before = sample_wait_count()
+        try:
+            async with engine.connect() as first, engine.connect() as second:
+                await first.execute(text("SELECT 1"))
+                await second.execute(text("SELECT 1"))
+                assert sample(registry, "db_pool_size") == 2
+                assert sample(registry, "db_pool_checked_out") == 2
+                assert sample(registry, "db_pool_overflow") == 0
+
+            assert sample(registry, "db_pool_checked_out") == 0
+            assert sample(registry, "db_pool_idle") == 2
+            assert sample_wait_count() == waits_before + 2
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_collector_waits_for_engine(self):
+        """Тест: коллектор с функцией ничего не отдаёт, пока движок не создан, затем — состояние его пула"""
+        engines = []
+        registry = CollectorRegistry()
+        registry.register(PoolCollector(lambda: engines[0] if engines else None))
+        assert sample(registry, "db_pool_size") is None
+
+        engines.append(create_engine_from_settings(
+            TEST_DB_URL, get_settings().model_copy(update={"DB_POOL_SIZE": 3}),
+        ))
+        try:
+            assert sample(registry, "db_pool_size") == 3
+        finally:
+            await engines[0].dispose()
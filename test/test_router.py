@@ -1,10 +1,58 @@
+import asyncio
+import json
+import zipfile
+from datetime import datetime
 from unittest.mock import patch, AsyncMock, MagicMock
 
+import numpy as np
 import pytest
 from fastapi import UploadFile
 import io
 
-from app.opencv_cam.router import video_analyzer
+from app.opencv_cam.dao import AnalysisRollupDAO, VideoAnalysisDAO
+from app.opencv_cam.executor import AnalysisQueueFullError
+from app.opencv_cam.jobs import AnalysisJobRunner
+from app.config import get_settings
+from app.opencv_cam.router import (
+    get_analysis_executor,
+    get_analysis_writer,
+    get_event_broadcaster,
+    get_job_runner,
+    get_result_cache,
+    get_stream_monitor,
+)
+from app.opencv_cam.timeline import TIMELINE_DTYPE, pack_timeline
+from app.server import SERVER_PROCESSES_ENV
+from test.conftest import TestingSessionLocal
+from benchmarks.synthetic import write_synthetic_video
+from test.test_dao import add_history, make_analysis
+
+settings = get_settings()
+analysis_executor = get_analysis_executor()
+analysis_writer = get_analysis_writer()
+event_broadcaster = get_event_broadcaster()
+job_runner = get_job_runner()
+result_cache = get_result_cache()
+stream_monitor = get_stream_monitor()
+
+
+def parse_sse(body: str) -> list[dict]:
+    """Разбирает ответ text/event-stream в список событий"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event_line, data_line = frame.split("\n")
+        data = json.loads(data_line.removeprefix("data: "))
+        assert event_line == f"event: {data['event']}"
+        events.append(data)
+    return events
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """Все тесты загружают одинаковое содержимое, поэтому кэш результатов сбрасывается"""
+    result_cache.clear()
+    yield
+    result_cache.clear()
 
 
 class TestAnalyzeVideo:
@@ -43,7 +91,7 @@ class TestAnalyzeVideo:
             mock_analysis_result
     , client):
         """Тест успешного анализа видео"""
-        video_analyzer.analyze_video = MagicMock(return_value=mock_analysis_result)
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
 
         with patch('app.opencv_cam.router.VideoAnalysisDAO.add') as mock_dao:
             mock_dao.return_value = AsyncMock()
@@ -70,6 +118,73 @@ class TestAnalyzeVideo:
 
         mock_metrics.inc.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_analyze_video_with_detector(self, mock_analysis_result, client):
+        """Тест выбора детектора: он передаётся в пул, а кэш результатов разделён по детекторам"""
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
+        content = b"detector video content"
+
+        for detector in ("mog2", "mog2", None):
+            url = "/analyze" if detector is None else f"/analyze?detector={detector}"
+            response = client.post(url, files={"file": ("test_video.mp4", io.BytesIO(content), "video/mp4")})
+            assert response.status_code == 200
+
+        # Повторный запрос с mog2 взят из кэша, запрос с детектором по умолчанию анализируется заново
+        calls = analysis_executor.analyze.call_args_list
+        assert [call.kwargs["detector"] for call in calls] == ["mog2", None]
+        assert analysis_executor.fingerprint_for("mog2") != analysis_executor.fingerprint
+
+    @pytest.mark.asyncio
+    async def test_analyze_video_debug_timings(self, mock_analysis_result, client):
+        """Тест ?debug=true: в ответе разбивка по стадиям, замер по кадрам включается для запроса"""
+        analysis_executor.analyze = AsyncMock(return_value={
+            **mock_analysis_result,
+            "analyzed_frames": 12,
+            "timings": {"sampled": True, "decoded_frames": 60, "stages": {"decode": 0.2, "open": 0.01, "queue": 0.05}},
+        })
+
+        response = client.post(
+            "/analyze?debug=true",
+            files={"file": ("test_video.mp4", io.BytesIO(b"debug video content"), "video/mp4")}
+        )
+
+        assert response.status_code == 200
+        timings = response.json()["timings"]
+        assert analysis_executor.analyze.call_args.kwargs["timed"] is True
+        assert list(timings["stages"]) == ["upload", "queue", "open", "decode", "save"]
+        assert (timings["sampled"], timings["decoded_frames"], timings["analyzed_frames"]) == (True, 60, 12)
+
+        # Без флага разбивки в ответе нет, а в кэш замеры не попадают
+        response = client.post(
+            "/analyze",
+            files={"file": ("test_video.mp4", io.BytesIO(b"debug video content"), "video/mp4")}
+        )
+        assert response.json()["cached"] is True
+        assert "timings" not in response.json()
+
+    @pytest.mark.asyncio
+    async def test_analyze_video_unknown_detector(self, client):
+        """Тест неизвестного детектора"""
+        response = client.post(
+            "/analyze?detector=optical_flow",
+            files={"file": ("test_video.mp4", io.BytesIO(b"fake video content"), "video/mp4")}
+        )
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_list_detectors(self, client):
+        """Тест списка детекторов с профилями стоимости"""
+        response = client.get("/detectors")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["default"] == settings.MOTION_DETECTOR
+        profiles = {item["detector"]: item for item in data["items"]}
+        assert set(profiles) == {"frame_diff", "mog2", "knn"}
+        assert profiles["frame_diff"]["splittable"] is True
+        assert profiles["mog2"]["splittable"] is False
+
     @pytest.mark.asyncio
     async def test_analyze_video_not_video_file(self, client):
         """Тест загрузки не видео файла"""
@@ -96,7 +211,7 @@ class TestAnalyzeVideo:
             "status": "error",
             "error_message": "Analysis failed"
         }
-        video_analyzer.analyze_video = MagicMock(return_value=error_result)
+        analysis_executor.analyze = AsyncMock(return_value=error_result)
 
         with patch('app.opencv_cam.router.VideoAnalysisDAO.add') as mock_dao:
             mock_dao.return_value = AsyncMock()
@@ -122,7 +237,7 @@ class TestAnalyzeVideo:
             mock_analysis_result
     , client):
         """Тест исключения при сохранении в базу данных"""
-        video_analyzer.analyze_video = MagicMock(return_value=mock_analysis_result)
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
 
         with patch('app.opencv_cam.router.VideoAnalysisDAO.add') as mock_dao:
             mock_dao.side_effect = Exception("Database error")
@@ -141,7 +256,7 @@ class TestAnalyzeVideo:
     @pytest.mark.asyncio
     async def test_analyze_video_analyzer_exception(self, mock_video_file, client):
         """Тест исключения в анализаторе видео"""
-        video_analyzer.analyze_video = MagicMock(side_effect=Exception("Analyzer error"))
+        analysis_executor.analyze = AsyncMock(side_effect=Exception("Analyzer error"))
 
         with patch('app.opencv_cam.router.ACTIVE_REQUESTS') as mock_metrics:
             mock_metrics.inc = MagicMock()
@@ -154,6 +269,106 @@ class TestAnalyzeVideo:
         assert response.status_code == 500
         assert "Ошибка сервера" in response.json()["detail"]
 
+    @pytest.mark.asyncio
+    async def test_analyze_video_queue_full(self, mock_video_file, client):
+        """Тест отказа при заполненной очереди анализа"""
+        analysis_executor.analyze = AsyncMock(side_effect=AnalysisQueueFullError("Очередь анализа заполнена"))
+
+        response = client.post(
+            "/analyze",
+            files={"file": ("test_video.mp4", mock_video_file.file, "video/mp4")}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_analyze_video_duplicate_served_from_cache(self, mock_analysis_result, client):
+        """Тест: повторная загрузка того же файла не запускает анализ"""
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
+
+        responses = [
+            client.post(
+                "/analyze",
+                files={"file": ("test_video.mp4", io.BytesIO(b"same video content"), "video/mp4")}
+            )
+            for _ in range(2)
+        ]
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert responses[0].json()["cached"] is False
+        assert responses[1].json()["cached"] is True
+        assert responses[1].json()["movement_percentage"] == 15.5
+        analysis_executor.analyze.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_analyze_video_cached_in_database(self, mock_analysis_result, client):
+        """Тест: результат берётся из базы, если его нет в памяти процесса"""
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
+
+        with patch('app.opencv_cam.router.VideoAnalysisDAO.find_cached_result') as mock_find:
+            mock_find.return_value = mock_analysis_result
+            response = client.post(
+                "/analyze",
+                files={"file": ("test_video.mp4", io.BytesIO(b"db cached content"), "video/mp4")}
+            )
+
+        assert response.status_code == 200
+        assert response.json()["cached"] is True
+        assert response.json()["has_movement"] is True
+        analysis_executor.analyze.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("url, files", [
+        ("/analyze", [("file", ("a.mp4", b"connection video", "video/mp4"))]),
+        ("/analyze/batch", [
+            ("files", ("a.mp4", b"connection video", "video/mp4")),
+            ("files", ("b.mp4", b"another connection video", "video/mp4")),
+        ]),
+    ])
+    async def test_connection_released_during_analysis(self, mock_analysis_result, url, files, client):
+        """Тест: на время анализа сессия запроса не держит транзакцию и соединение из пула"""
+        sessions = []
+        in_transaction = []
+        original_find = VideoAnalysisDAO.find_cached_result
+
+        async def find_cached_result(session, content_hash, fingerprint):
+            sessions.append(session)
+            return await original_find(session, content_hash, fingerprint)
+
+        async def analyze(video_path, **kwargs):
+            in_transaction.append(sessions[-1].in_transaction())
+            return dict(mock_analysis_result)
+
+        analysis_executor.analyze = AsyncMock(side_effect=analyze)
+        with patch('app.opencv_cam.router.VideoAnalysisDAO.find_cached_result', side_effect=find_cached_result):
+            response = client.post(url, files=[(field, (name, io.BytesIO(content), kind)) for field, (name, content, kind) in files])
+
+        assert response.status_code == 200
+        assert in_transaction and not any(in_transaction)
+
+    @pytest.mark.asyncio
+    async def test_analyze_video_decision_only(self, mock_video_file, client):
+        """Тест режима decision_only: граница доли возвращается клиенту, результат не кэшируется"""
+        analysis_executor.analyze = AsyncMock(return_value={
+            "has_movement": True,
+            "movement_percentage": 12.5,
+            "duration": 100.0,
+            "processing_time": 0.3,
+            "status": "completed",
+            "percentage_bound": "lower"
+        })
+
+        response = client.post(
+            "/analyze?decision_only=true",
+            files={"file": ("test_video.mp4", mock_video_file.file, "video/mp4")}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["percentage_bound"] == "lower"
+        assert analysis_executor.analyze.await_args.kwargs["decision_only"] is True
+        assert len(result_cache) == 0
+
     @pytest.mark.asyncio
     async def test_analyze_video_no_filename(self, client):
         """Тест загрузки видео без имени файла"""
@@ -165,3 +380,372 @@ class TestAnalyzeVideo:
         assert response.status_code == 422
 
 
+    @pytest.mark.asyncio
+    async def test_analyze_with_write_behind(self, mock_analysis_result, client):
+        """Тест: при включённой отложенной записи id приходит из очереди записи, а не из сессии запроса"""
+        analysis_executor.analyze = AsyncMock(return_value=mock_analysis_result)
+
+        with patch.object(type(analysis_writer), 'is_running', True), \
+                patch.object(analysis_writer, 'add', AsyncMock(return_value=77)) as mock_add, \
+                patch('app.opencv_cam.router.VideoAnalysisDAO.add') as mock_dao:
+            response = client.post(
+                "/analyze",
+                files={"file": ("test_video.mp4", io.BytesIO(b"fake video content"), "video/mp4")}
+            )
+
+        assert response.status_code == 200
+        assert response.json()["analysis_id"] == 77
+        assert mock_add.call_args.args[0].filename == "test_video.mp4"
+        mock_dao.assert_not_called()
+
+
+class TestAnalysisJobs:
+    """Тесты асинхронного режима /analyze"""
+
+    @pytest.fixture(autouse=True)
+    def job_session_manager(self):
+        """Фоновые задачи пишут в тестовую базу"""
+        original = job_runner.session_manager
+        job_runner.session_manager = TestingSessionLocal
+        yield
+        job_runner.session_manager = original
+
+    @pytest.mark.asyncio
+    async def test_submit_and_wait_for_result(self, client):
+        """Тест постановки задачи в очередь и ожидания результата"""
+        analysis_executor.analyze = AsyncMock(return_value={
+            "has_movement": True,
+            "movement_percentage": 15.5,
+            "duration": 10.0,
+            "processing_time": 2.5,
+            "status": "completed"
+        })
+
+        response = client.post(
+            "/analyze?async=true",
+            files={"file": ("test_video.mp4", io.BytesIO(b"fake video content"), "video/mp4")}
+        )
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "pending"
+
+        response = client.get(f"/analyze/{data['analysis_id']}?wait=5")
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["status"] == "completed"
+        assert result["progress"] == 100.0
+        assert result["has_movement"] is True
+        assert result["processing_time"] == 2.5
+
+    @pytest.mark.asyncio
+    async def test_progress_events(self, client):
+        """Тест Server-Sent Events задачи: статус, прогресс и итог, после которого поток закрывается"""
+        async def analyze(video_path, wait=False, decision_only=False, on_progress=None, detector=None):
+            # Анализ начинается, когда клиент уже подписан
+            for _ in range(500):
+                if event_broadcaster._topics:
+                    break
+                await asyncio.sleep(0.01)
+            on_progress({"analyzed_frames": 25, "expected_frames": 50, "progress": 50.0, "movement_percentage": 8.0})
+            on_progress({"analyzed_frames": 50, "expected_frames": 50, "progress": 100.0, "movement_percentage": 16.0})
+            return {
+                "has_movement": True,
+                "movement_percentage": 16.0,
+                "duration": 10.0,
+                "processing_time": 2.5,
+                "status": "completed"
+            }
+
+        analysis_executor.analyze = analyze
+        analysis_id = client.post(
+            "/analyze?async=true",
+            files={"file": ("test_video.mp4", io.BytesIO(b"fake video content"), "video/mp4")}
+        ).json()["analysis_id"]
+
+        response = client.get(f"/analyze/{analysis_id}/events")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [event["event"] for event in events][-3:] == ["progress", "progress", "result"]
+        assert events[0]["event"] == "status" and events[0]["analysis_id"] == analysis_id
+        assert events[-2]["movement_percentage"] == 16.0
+        assert events[-1]["status"] == "completed" and events[-1]["has_movement"] is True
+
+        # Завершённая задача: сразу итог из базы
+        finished = parse_sse(client.get(f"/analyze/{analysis_id}/events").text)
+        assert [event["event"] for event in finished] == ["result"]
+        assert finished[0]["progress"] == 100.0
+        assert client.get("/analyze/999999/events").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_submit_when_queue_full(self, client):
+        """Тест отказа при заполненной очереди задач"""
+        with patch.object(type(job_runner), 'is_full', True):
+            response = client.post(
+                "/analyze?async=true",
+                files={"file": ("test_video.mp4", io.BytesIO(b"fake video content"), "video/mp4")}
+            )
+
+        assert response.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_submit_failure_marks_record_failed(self, client):
+        """Тест: если задачу не удалось поставить после коммита, запись не остаётся pending, место в очереди свободно"""
+        with patch.object(job_runner, 'submit', side_effect=RuntimeError("loop closed")):
+            response = client.post(
+                "/analyze?async=true",
+                files={"file": ("orphan.mp4", io.BytesIO(b"orphan video content"), "video/mp4")}
+            )
+
+        assert response.status_code == 500
+        async with TestingSessionLocal.create_session() as session:
+            records = await VideoAnalysisDAO.find_all(session, None)
+        assert [(record.filename, record.status) for record in records] == [("orphan.mp4", "failed")]
+        assert "loop closed" in records[0].error
+        assert job_runner._reserved == 0
+
+    @pytest.mark.asyncio
+    async def test_reserved_slot_counts_toward_limit(self):
+        """Тест: зарезервированное место занимает очередь до submit или release"""
+        runner = AnalysisJobRunner(analysis_executor, TestingSessionLocal, max_pending=1)
+
+        runner.reserve()
+        assert runner.is_full
+        with pytest.raises(AnalysisQueueFullError):
+            runner.reserve()
+        runner.release()
+
+        assert not runner.is_full
+
+    @pytest.mark.asyncio
+    async def test_timeline(self, client):
+        """Тест сохранения шкалы движения и её выдачи с разбиением на интервалы"""
+        points = np.zeros(4, dtype=TIMELINE_DTYPE)
+        points["t"] = [0.0, 0.5, 1.0, 1.5]
+        points["largest_area"] = [0.0, 800.0, 300.0, 0.0]
+        points["changed_ratio"] = [0.0, 0.2, 0.1, 0.3]
+        analysis_executor.analyze = AsyncMock(return_value={
+            "has_movement": True,
+            "movement_percentage": 50.0,
+            "duration": 2.0,
+            "processing_time": 0.5,
+            "status": "completed",
+            "timeline": pack_timeline(points),
+        })
+
+        response = client.post(
+            "/analyze?async=true",
+            files={"file": ("timeline.mp4", io.BytesIO(b"timeline video content"), "video/mp4")}
+        )
+        analysis_id = response.json()["analysis_id"]
+        result = client.get(f"/analyze/{analysis_id}?wait=5").json()
+        assert "timeline" not in result
+
+        response = client.get(f"/analyze/{analysis_id}/timeline")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["points"] == 4
+        assert data["largest_area"] == [0.0, 800.0, 300.0, 0.0]
+
+        data = client.get(f"/analyze/{analysis_id}/timeline?bucket=1").json()
+
+        assert data["t"] == [0.0, 1.0]
+        assert data["largest_area"] == [800.0, 300.0]
+        assert data["changed_ratio"] == pytest.approx([0.1, 0.2])
+
+        assert client.get("/analyze/999999/timeline").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_analysis(self, client):
+        """Тест запроса несуществующего анализа"""
+        response = client.get("/analyze/999")
+
+        assert response.status_code == 404
+
+
+class TestListAnalyses:
+    """Тесты истории анализов /analyses"""
+
+    @pytest.mark.asyncio
+    async def test_pages_with_cursor(self, client):
+        """Тест обхода истории по next_cursor с фильтром по движению"""
+        await add_history(6, datetime(2026, 1, 1))
+
+        first = client.get("/analyses?limit=1&movement_detected=true").json()
+        second = client.get(f"/analyses?limit=1&movement_detected=true&cursor={first['next_cursor']}").json()
+
+        assert [item["filename"] for item in first["items"]] == ["cam_3.mp4"]
+        assert [item["filename"] for item in second["items"]] == ["door_0.mp4"]
+        assert second["next_cursor"] is None
+        assert all(item["has_movement"] for item in first["items"] + second["items"])
+
+    @pytest.mark.asyncio
+    async def test_stats_from_rollups(self, client):
+        """Тест статистики по почасовым итогам за указанный период"""
+        async with TestingSessionLocal.create_session() as session:
+            await AnalysisRollupDAO.record(session, [
+                make_analysis(processing_time=1.0),
+                make_analysis(processing_time=2.0, movement_detected=False),
+            ], at=datetime(2026, 3, 1, 10, 5))
+            await AnalysisRollupDAO.record(session, [make_analysis(processing_time=3.0)], at=datetime(2026, 3, 1, 14))
+            await session.commit()
+
+        period = "completed_from=2026-03-01T00:00:00&completed_to=2026-03-02T00:00:00"
+        response = client.get(f"/analyses/stats?bucket=day&{period}")
+        hourly = client.get(f"/analyses/stats?{period}").json()
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) == 1
+        assert data["totals"]["total"] == 3
+        assert data["totals"]["movement_rate"] == pytest.approx(0.6667)
+        assert data["totals"]["avg_processing_time"] == 2.0
+        assert [item["start"] for item in hourly["items"]] == ["2026-03-01T10:00:00", "2026-03-01T14:00:00"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, client):
+        """Тест некорректного курсора"""
+        response = client.get("/analyses?cursor=not-a-cursor")
+
+        assert response.status_code == 400
+
+
+class TestStreams:
+    """Тесты анализа потоков /streams"""
+
+    @pytest.mark.asyncio
+    async def test_stream_lifecycle(self, tmp_path, monkeypatch, client):
+        """Тест: запуск анализа локального файла, события в состоянии потока и закрытие"""
+        path = write_synthetic_video(str(tmp_path / "stream.mp4"), width=160, height=120, fps=10.0, seconds=4.0,
+                                     motion_density=0.5)
+
+        assert client.post("/streams", json={"source": path}).status_code == 400
+        assert client.post("/streams", json={"source": "http://127.0.0.1:8000/metrics"}).status_code == 400
+
+        monkeypatch.setattr(settings, "STREAM_ALLOWED_SCHEMES", ["file"])
+        response = client.post("/streams", json={"source": path, "stream_id": "cam-1", "window_size": 2})
+        assert response.status_code == 201
+        assert response.json()["stream_id"] == "cam-1"
+        assert client.post("/streams", json={"source": path, "stream_id": "cam-1"}).status_code == 409
+
+        stream_monitor.get("cam-1").join(timeout=30)
+        data = client.get("/streams/cam-1").json()
+
+        assert not data["running"]
+        assert [event["event"] for event in data["events"]] == ["motion_start", "motion_end", "stream_end"]
+        assert [item["stream_id"] for item in client.get("/streams").json()["items"]] == ["cam-1"]
+        events = parse_sse(client.get("/streams/cam-1/events").text)
+        assert [event["event"] for event in events] == ["status", "motion_start", "motion_end", "stream_end"]
+        assert client.delete("/streams/cam-1").status_code == 204
+        assert client.get("/streams/cam-1").status_code == 404
+        assert client.delete("/streams/cam-1").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_streams_disabled(self, monkeypatch, client):
+        """Тест: в воркерах без потоков эндпоинты /streams отвечают 503"""
+        monkeypatch.setattr(settings, "STREAMS_ENABLED", False)
+
+        assert client.get("/streams").status_code == 503
+        assert client.get("/streams/cam-1").status_code == 503
+        assert client.post("/streams", json={"source": "rtsp://camera/1"}).status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_streams_disabled_with_several_workers(self, monkeypatch, client):
+        """Тест: при нескольких воркерах gunicorn потоки отключены, даже если STREAMS_ENABLED"""
+        monkeypatch.setattr(settings, "STREAMS_ENABLED", True)
+        monkeypatch.setenv(SERVER_PROCESSES_ENV, "2")
+
+        assert client.get("/streams").status_code == 503
+
+
+class TestAnalyzeBatch:
+    """Тесты эндпоинта /analyze/batch"""
+
+    @pytest.fixture
+    def zip_archive(self):
+        """Фикстура zip-архива с видео и текстовым файлом"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("clips/archived.mp4", b"archived video content")
+            archive.writestr("clips/readme.txt", b"not a video")
+        buffer.seek(0)
+        return buffer
+
+    @pytest.mark.asyncio
+    async def test_batch_partial_failure(self, zip_archive, client):
+        """Тест пачки: ошибки отдельных файлов не мешают сохранить остальные"""
+        async def analyze(video_path, wait=False, decision_only=False, detector=None):
+            with open(video_path, "rb") as f:
+                content = f.read()
+            if content == b"broken video content":
+                return {
+                    "has_movement": False,
+                    "movement_percentage": 0.0,
+                    "duration": 0.0,
+                    "processing_time": 0.1,
+                    "status": "failed",
+                    "error_message": "Cannot open video file"
+                }
+            return {
+                "has_movement": True,
+                "movement_percentage": 50.0,
+                "duration": 3.0,
+                "processing_time": 0.5,
+                "status": "completed"
+            }
+
+        analysis_executor.analyze = AsyncMock(side_effect=analyze)
+
+        with patch('app.opencv_cam.router.VideoAnalysisDAO.add_many', wraps=VideoAnalysisDAO.add_many) as mock_add_many:
+            response = client.post(
+                "/analyze/batch",
+                files=[
+                    ("files", ("first.mp4", io.BytesIO(b"first video content"), "video/mp4")),
+                    ("files", ("broken.mp4", io.BytesIO(b"broken video content"), "video/mp4")),
+                    ("files", ("notes.txt", io.BytesIO(b"text"), "text/plain")),
+                    ("files", ("archive.zip", zip_archive, "application/zip")),
+                ]
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 5
+        assert data["completed"] == 2
+        assert data["failed"] == 3
+
+        results = {item["filename"]: item for item in data["results"]}
+        assert results["first.mp4"]["has_movement"] is True
+        assert results["clips/archived.mp4"]["status"] == "completed"
+        assert results["broken.mp4"]["error_message"] == "Cannot open video file"
+        assert "analysis_id" in results["broken.mp4"]
+        assert "analysis_id" not in results["notes.txt"]
+        assert results["clips/readme.txt"]["error_message"] == "File must be a video"
+        assert mock_add_many.call_count == 1
+        assert len(mock_add_many.call_args.kwargs["values"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_batch_analyzes_duplicates_once(self, client):
+        """Тест: одинаковые файлы в пачке анализируются один раз"""
+        analysis_executor.analyze = AsyncMock(return_value={
+            "has_movement": True,
+            "movement_percentage": 50.0,
+            "duration": 3.0,
+            "processing_time": 0.5,
+            "status": "completed"
+        })
+
+        response = client.post(
+            "/analyze/batch",
+            files=[
+                ("files", ("a.mp4", io.BytesIO(b"same content"), "video/mp4")),
+                ("files", ("b.mp4", io.BytesIO(b"same content"), "video/mp4")),
+            ]
+        )
+
+        assert response.status_code == 200
+        assert response.json()["completed"] == 2
+        analysis_executor.analyze.assert_awaited_once()
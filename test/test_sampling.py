@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.opencv_cam.sampling import FrameSampler, SamplingStrategy
+from benchmarks.synthetic import write_synthetic_video
+
+
+@pytest.fixture(scope="module")
+def synthetic_video(tmp_path_factory):
+    """Синтетический ролик 4 секунды, 10 fps"""
+    path = tmp_path_factory.mktemp("video") / "clip.mp4"
+    return write_synthetic_video(str(path), width=160, height=120, fps=10.0, seconds=4.0)
+
+
+def sample(video_path: str, sampler: FrameSampler) -> list[tuple[int, np.ndarray]]:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return list(sampler.iter_frames(cap, sampler.sample_indices(video_path, fps, total_frames)))
+    finally:
+        cap.release()
+
+
+def read_all(video_path: str) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+class TestFrameSampler:
+    """Тесты выборки кадров"""
+
+    def test_fixed_fps_matches_read_and_skip(self, synthetic_video):
+        """Тест: fixed_fps выбирает те же кадры, что и прежний цикл read() с пропуском"""
+        all_frames = read_all(synthetic_video)
+        sampled = sample(synthetic_video, FrameSampler(target_fps=2.0))
+
+        assert [index for index, _ in sampled] == list(range(4, 40, 5))
+        for index, frame in sampled:
+            assert np.array_equal(frame, all_frames[index])
+
+    def test_fixed_count_with_seek(self, synthetic_video):
+        """Тест: fixed_count с перемоткой возвращает ровно заданное число кадров"""
+        all_frames = read_all(synthetic_video)
+        sampled = sample(synthetic_video, FrameSampler(SamplingStrategy.FIXED_COUNT, frame_count=4, seek_threshold=0))
+
+        assert [index for index, _ in sampled] == [0, 13, 26, 39]
+        for index, frame in sampled:
+            assert np.array_equal(frame, all_frames[index])
+
+    def test_keyframes(self, synthetic_video):
+        """Тест: keyframes выбирает ключевые кадры, первый кадр всегда ключевой"""
+        indices = [index for index, _ in sample(synthetic_video, FrameSampler(SamplingStrategy.KEYFRAMES))]
+
+        assert indices[0] == 0
+        assert 1 < len(indices) < 40
@@ -0,0 +1,174 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY, generate_latest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import get_settings
+from app.dao.database import create_engine_from_settings
+from app.dao.pool import PoolCollector
+from app.dao.session_maker import DatabaseSessionManager
+from app.opencv_cam import metrics
+from app.opencv_cam.metrics import metrics_registry
+from app.server import (
+    SERVER_PROCESSES_ENV,
+    analysis_workers,
+    available_cpus,
+    cpu_quota,
+    prepare_multiprocess_dir,
+    server_processes,
+    server_workers,
+)
+from test.conftest import TEST_DB_URL
+
+settings = get_settings()
+
+
+@pytest.fixture
+def cgroup_dir(tmp_path):
+    """Каталог cgroup с заданными файлами: {"cpu.max": "200000 100000"}"""
+    def factory(files: dict[str, str]) -> str:
+        for name, content in files.items():
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content + "\n")
+        return str(tmp_path)
+    return factory
+
+
+class TestServerProfile:
+    """Тесты расчёта воркеров продакшен-запуска"""
+
+    @pytest.mark.parametrize("files, expected", [
+        ({"cpu.max": "150000 100000"}, 1.5),
+        ({"cpu.max": "max 100000"}, None),
+        ({"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"}, 2.0),
+        ({"cpu/cpu.cfs_quota_us": "-1", "cpu/cpu.cfs_period_us": "100000"}, None),
+        ({}, None),
+    ])
+    def test_cpu_quota(self, cgroup_dir, files, expected):
+        """Тест чтения квоты CPU из cgroup v2 и v1"""
+        assert cpu_quota(cgroup_dir(files)) == expected
+
+    def test_available_cpus_capped_by_quota(self, cgroup_dir):
+        """Тест: дробная квота округляется вверх и не превышает привязку процесса к ядрам"""
+        affinity = len(os.sched_getaffinity(0))
+
+        assert available_cpus(cgroup_dir({"cpu.max": "50000 100000"})) == 1
+        assert available_cpus(cgroup_dir({"cpu.max": "max 100000"})) == affinity
+
+    @pytest.mark.parametrize("cpus, expected", [(1, 1), (3, 3), (16, 4)])
+    def test_server_workers_auto(self, monkeypatch, cpus, expected):
+        """Тест: по воркеру на ядро, не больше SERVER_MAX_WORKERS"""
+        monkeypatch.setattr(settings, "SERVER_WORKERS", None)
+        monkeypatch.setattr(settings, "SERVER_MAX_WORKERS", 4)
+
+        assert server_workers(settings, cpus) == expected
+
+    def test_explicit_workers(self, monkeypatch):
+        """Тест: явные SERVER_WORKERS и ANALYSIS_WORKERS не пересчитываются"""
+        monkeypatch.setattr(settings, "SERVER_WORKERS", 6)
+        monkeypatch.setattr(settings, "ANALYSIS_WORKERS", 3)
+
+        assert server_workers(settings, 2) == 6
+        assert analysis_workers(settings, 2, 6) == 3
+
+    @pytest.mark.parametrize("cpus, workers, expected", [(8, 4, 2), (3, 2, 1), (1, 4, 1)])
+    def test_analysis_workers_split(self, monkeypatch, cpus, workers, expected):
+        """Тест: ядра под анализ делятся между воркерами, но хотя бы один процесс на воркер"""
+        monkeypatch.setattr(settings, "ANALYSIS_WORKERS", None)
+
+        assert analysis_workers(settings, cpus, workers) == expected
+
+    def test_server_processes_from_env(self, monkeypatch):
+        """Тест: число воркеров приходит из окружения, без gunicorn — один процесс"""
+        monkeypatch.delenv(SERVER_PROCESSES_ENV, raising=False)
+        assert server_processes() == 1
+
+        monkeypatch.setenv(SERVER_PROCESSES_ENV, "4")
+        assert server_processes() == 4
+
+    def test_prepare_multiprocess_dir_clears_files(self, tmp_path):
+        """Тест: файлы метрик прошлого запуска удаляются"""
+        path = tmp_path / "metrics"
+        path.mkdir()
+        (path / "counter_123.db").write_bytes(b"stale")
+
+        prepare_multiprocess_dir(str(path))
+
+        assert os.listdir(path) == []
+
+    def test_metrics_registry_multiprocess(self, monkeypatch, tmp_path):
+        """Тест: с PROMETHEUS_MULTIPROC_DIR метрики собираются из каталога, пул соединений — локально"""
+        engine = create_engine_from_settings(TEST_DB_URL, settings)
+        monkeypatch.setattr(metrics, "_PROCESS_COLLECTORS", [PoolCollector(engine)])
+        monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+        assert metrics_registry() is REGISTRY
+
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        registry = metrics_registry()
+
+        assert registry is not REGISTRY
+        assert b"db_pool_size" in generate_latest(registry)
+
+
+class TestColdStart:
+    """Тесты запуска без побочных эффектов импорта"""
+
+    def test_import_has_no_side_effects(self):
+        """
+        Тест: импорт приложения и моделей без переменных DB_* не читает настройки,
+        не создаёт движок и сервисы, не загружает драйвер и ничего не печатает
+        """
+        code = (
+            "import sys\n"
+            "import app.opencv_cam.models\n"
+            "import app.main\n"
+            "from app.config import get_settings\n"
+            "from app.dao.database import get_engine\n"
+            "from app.opencv_cam import router\n"
+            "getters = [get_settings, get_engine, router.get_analysis_executor, router.get_event_broadcaster,\n"
+            "           router.get_job_runner, router.get_result_cache, router.get_analysis_writer, router.get_stream_monitor]\n"
+            "print(sum(getter.cache_info().currsize for getter in getters), 'asyncpg' in sys.modules, file=sys.stderr)\n"
+        )
+        # Без DB_* создание настроек при импорте завершилось бы ошибкой валидации
+        env = {name: value for name, value in os.environ.items() if not name.startswith(("DB_", "TEST_DB_", "DATABASE_"))}
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+
+        assert result.stdout == ""
+        assert result.stderr.splitlines()[-1] == "0 False"
+
+    def test_dao_does_not_import_feature_packages(self):
+        """Тест: слой app.dao не зависит от app.opencv_cam"""
+        code = (
+            "import sys\n"
+            "import app.dao.base, app.dao.database, app.dao.pool, app.dao.session_maker\n"
+            "print(sorted(name for name in sys.modules if name.startswith('app.opencv_cam')))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        assert result.stdout.strip() == "[]"
+
+    @pytest.mark.asyncio
+    async def test_session_maker_created_on_first_session(self):
+        """Тест: менеджер с функцией-фабрикой создаёт фабрику сессий при первой сессии и один раз"""
+        engine = create_engine_from_settings(TEST_DB_URL, settings)
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return async_sessionmaker(engine)
+
+        manager = DatabaseSessionManager(factory)
+        assert calls == []
+        try:
+            async with manager.create_session():
+                pass
+            async with manager.create_session():
+                pass
+        finally:
+            await engine.dispose()
+
+        assert len(calls) == 1
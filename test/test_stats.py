@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.opencv_cam.models import AnalysisRollup
+from app.opencv_cam.stats import histogram_quantile, summarize_rollups
+
+
+def make_rollup(start: datetime, **counters) -> AnalysisRollup:
+    values = {name: 0 for name in ("total", "completed", "failed", "with_movement")}
+    values.update({"processing_time_sum": 0.0, "duration_sum": 0.0})
+    values.update({f"pt_bucket_{i}": 0 for i in range(8)})
+    values.update(counters)
+    return AnalysisRollup(bucket_start=start, **values)
+
+
+class TestStats:
+    """Тесты сводки почасовых итогов"""
+
+    def test_histogram_quantile(self):
+        """Тест квантиля по гистограмме: интерполяция внутри интервала, открытый последний интервал"""
+        counts = [0, 10, 10, 0, 0, 0, 0, 0]  # (0.5, 1] и (1, 2]
+
+        assert histogram_quantile(0.5, counts) == pytest.approx(1.0)
+        assert histogram_quantile(0.75, counts) == pytest.approx(1.5)
+        assert histogram_quantile(0.99, [0] * 7 + [3]) == 60.0
+        assert histogram_quantile(0.5, [0] * 8) is None
+
+    def test_summarize_into_days(self):
+        """Тест сведения часов в сутки и общего итога"""
+        day = datetime(2026, 3, 1)
+        rollups = [
+            make_rollup(day + timedelta(hours=1), total=3, completed=2, failed=1, with_movement=1,
+                        processing_time_sum=1.0, duration_sum=20.0, pt_bucket_0=2),
+            make_rollup(day + timedelta(hours=5), total=2, completed=2, with_movement=2,
+                        processing_time_sum=3.0, duration_sum=10.0, pt_bucket_2=2),
+            make_rollup(day + timedelta(days=1), total=1, failed=1),
+        ]
+
+        items, totals = summarize_rollups(rollups, timedelta(days=1))
+
+        assert [item["start"] for item in items] == [day, day + timedelta(days=1)]
+        assert items[0]["total"] == 5 and items[0]["completed"] == 4
+        assert items[0]["movement_rate"] == 0.75
+        assert items[0]["avg_processing_time"] == 1.0
+        assert items[0]["processing_time_p50"] == pytest.approx(0.5)
+        assert items[1]["movement_rate"] is None
+        assert totals["total"] == 6 and totals["failed"] == 2
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.opencv_cam.detectors import FrameDiffDetector
+from app.opencv_cam.streaming import StreamLimitError, StreamMonitor, StreamSession
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer
+from benchmarks.synthetic import write_synthetic_video
+
+
+@pytest.fixture(scope="module")
+def synthetic_stream(tmp_path_factory):
+    """Синтетический ролик 6 секунд, 10 fps: квадрат движется первые 3 секунды"""
+    path = tmp_path_factory.mktemp("streams") / "stream.mp4"
+    return write_synthetic_video(str(path), width=320, height=240, fps=10.0, seconds=6.0, motion_density=0.5)
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(2)
+    yield pool
+    pool.shutdown()
+
+
+def run_session(source: str, pool: ThreadPoolExecutor, analyzer: VideoAnalyzer | None = None, **options) -> StreamSession:
+    session = StreamSession("test", source, analyzer or VideoAnalyzer(), pool, **options)
+    session.start()
+    session.join(timeout=30)
+    assert not session.is_running
+    return session
+
+
+class TestStreamSession:
+    """Тесты анализа потока"""
+
+    def test_motion_events_from_file(self, synthetic_stream, pool):
+        """Тест: начало и конец движения определяются по скользящему окну, файл читается без пропусков"""
+        received = []
+
+        session = run_session(synthetic_stream, pool, on_event=received.append, sample_fps=2.0, window_size=4)
+
+        assert [event["event"] for event in received] == ["motion_start", "motion_end", "stream_end"]
+        start, end, stream_end = received
+        assert start["t"] == pytest.approx(0.5)
+        assert end["t"] == pytest.approx(3.0, abs=0.5)
+        assert stream_end["analyzed_frames"] == session.analyzed_frames == 12
+        assert stream_end["dropped_frames"] == 0
+        assert list(session.events) == received
+        assert not session.in_motion
+
+    def test_static_stream_has_no_motion(self, tmp_path, pool):
+        """Тест: на ролике без движения есть только событие конца потока"""
+        path = write_synthetic_video(str(tmp_path / "static.mp4"), width=160, height=120, fps=10.0, seconds=2.0,
+                                     motion_density=0.0)
+
+        session = run_session(path, pool, sample_fps=5.0)
+
+        assert [event["event"] for event in session.events] == ["stream_end"]
+
+    def test_live_source_drops_frames_when_behind(self, synthetic_stream, pool):
+        """Тест: живой поток при медленном анализе пропускает кадры, а не копит их"""
+        process = FrameDiffDetector.process
+
+        def slow_process(detector, frame):
+            time.sleep(0.02)
+            return process(detector, frame)
+
+        with patch.object(FrameDiffDetector, "process", slow_process):
+            session = run_session(synthetic_stream, pool, sample_fps=10.0, live=True)
+
+        assert session.dropped_frames > 0
+        assert session.analyzed_frames + session.dropped_frames == 60
+
+    def test_unavailable_source(self, tmp_path, pool):
+        """Тест: недоступный источник даёт событие ошибки"""
+        session = run_session(str(tmp_path / "missing.mp4"), pool)
+
+        assert [event["event"] for event in session.events] == ["stream_error", "stream_end"]
+
+
+class TestStreamMonitor:
+    """Тесты анализа нескольких потоков"""
+
+    def test_many_streams_and_limit(self, synthetic_stream):
+        """Тест: потоки анализируются параллельно в общем пуле, лишний поток отклоняется"""
+        monitor = StreamMonitor(max_streams=3, analysis_threads=2)
+        finished = threading.Semaphore(0)
+
+        def on_event(event):
+            if event["event"] == "stream_end":
+                finished.release()
+
+        try:
+            sessions = [monitor.open(f"cam-{i}", synthetic_stream, on_event, window_size=4) for i in range(3)]
+            with pytest.raises(StreamLimitError):
+                monitor.open("cam-3", synthetic_stream)
+            with pytest.raises(ValueError):
+                monitor.open("cam-0", synthetic_stream)
+
+            for _ in sessions:
+                assert finished.acquire(timeout=30)
+            for session in sessions:
+                session.join(timeout=5)
+                assert [event["event"] for event in session.events] == ["motion_start", "motion_end", "stream_end"]
+
+            # Завершившиеся потоки не занимают место
+            monitor.open("cam-3", synthetic_stream)
+            assert monitor.close("cam-3", timeout=5)
+            assert not monitor.close("cam-3")
+        finally:
+            monitor.shutdown(timeout=5)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.opencv_cam.timeline import (
+    TIMELINE_DTYPE,
+    bucketize_timeline,
+    pack_timeline,
+    timeline_to_dict,
+    unpack_timeline,
+)
+
+
+def make_points(t, areas, ratios) -> np.ndarray:
+    points = np.zeros(len(t), dtype=TIMELINE_DTYPE)
+    points["t"] = t
+    points["largest_area"] = areas
+    points["changed_ratio"] = ratios
+    return points
+
+
+class TestTimeline:
+    """Тесты покадровой шкалы движения"""
+
+    def test_pack_roundtrip(self):
+        """Тест упаковки в байты: 12 байт на точку, распаковка без потерь"""
+        points = make_points([0.0, 0.5], [10.0, 20.0], [0.1, 0.2])
+
+        data = pack_timeline(points)
+
+        assert len(data) == 24
+        assert np.array_equal(unpack_timeline(data), points)
+        assert unpack_timeline(None).size == 0
+
+    def test_bucketize(self):
+        """Тест свёртки в интервалы: максимум площади, среднее доли, пустые интервалы пропускаются"""
+        points = make_points([0.0, 0.4, 0.8, 2.1], [5.0, 50.0, 10.0, 7.0], [0.1, 0.3, 0.2, 0.4])
+
+        buckets = timeline_to_dict(bucketize_timeline(points, 1.0))
+
+        assert buckets["t"] == [0.0, 2.0]
+        assert buckets["largest_area"] == [50.0, 7.0]
+        assert buckets["changed_ratio"] == [0.2, 0.4]
@@ -0,0 +1,99 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app.opencv_cam.detectors import DetectorKind
+from app.opencv_cam.executor import AnalysisExecutor
+from app.opencv_cam.timing import FRAME_STAGES, Stage, StageTimer, merge_timings
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer
+
+
+def stage_count(stage: Stage, detector: str) -> float:
+    return REGISTRY.get_sample_value(
+        "analysis_stage_seconds_count", {"stage": str(stage), "detector": detector},
+    ) or 0.0
+
+
+class TestStageTimer:
+    """Тесты замеров времени по стадиям анализа"""
+
+    def test_unsampled_skips_frame_stages(self, video_factory):
+        """Тест: без замера по кадрам остаются только стадии уровня видео, кадры считаются всегда"""
+        video_path = video_factory(0.3)
+
+        result = VideoAnalyzer(analysis_width=320).analyze_path(video_path)
+        timings = result["timings"]
+
+        assert timings["sampled"] is False
+        assert set(timings["stages"]) == {Stage.OPEN}
+        # 60 кадров при выборке 2 кадра/с из 10: декодируются все, анализируется каждый пятый
+        assert timings["decoded_frames"] == 60
+        assert result["analyzed_frames"] == 12
+
+    def test_sampled_matches_unsampled(self, video_factory):
+        """Тест: покадровый замер не меняет результат анализа"""
+        video_path = video_factory(0.3)
+        analyzer = VideoAnalyzer(analysis_width=320)
+
+        plain = analyzer.analyze_path(video_path)
+        timed = analyzer.analyze_path(video_path, timer=StageTimer(sampled=True))
+
+        assert set(timed["timings"]["stages"]) == {Stage.OPEN, *FRAME_STAGES}
+        assert all(seconds > 0 for seconds in timed["timings"]["stages"].values())
+        assert timed["timings"]["decoded_frames"] == plain["timings"]["decoded_frames"]
+        assert timed["timeline"] == plain["timeline"]
+        assert timed["movement_percentage"] == plain["movement_percentage"]
+
+    @pytest.mark.parametrize("detector", [DetectorKind.FRAME_DIFF, DetectorKind.MOG2])
+    def test_decision_only_decodes_less(self, video_factory, detector):
+        """Тест: ранняя остановка видна по числу декодированных кадров"""
+        video_path = video_factory(1.0)
+        analyzer = VideoAnalyzer(analysis_width=320, detector=detector)
+
+        decided = analyzer.analyze_path(video_path, decision_only=True, timer=StageTimer(sampled=True))
+
+        assert decided["percentage_bound"] == "lower"
+        assert decided["timings"]["decoded_frames"] < 60
+
+    def test_segments_sum_timings(self, video_factory):
+        """Тест: замеры отрезков складываются, кадры на границах декодируются повторно"""
+        video_path = video_factory(0.3)
+        analyzer = VideoAnalyzer(analysis_width=320)
+        plan = analyzer.plan_segments(video_path, max_segments=3, min_segment_frames=2)
+
+        parts = [analyzer.analyze_segment(video_path, plan, segment) for segment in plan["segments"]]
+        merged = VideoAnalyzer.merge_segments(plan, parts, 0.0)
+
+        assert merged["timings"]["decoded_frames"] == sum(part["timings"]["decoded_frames"] for part in parts)
+        assert merged["timings"]["decoded_frames"] >= 60
+        assert merged["analyzed_frames"] == 12
+
+    def test_merge_timings(self):
+        """Тест сложения замеров"""
+        merged = merge_timings([
+            {"sampled": True, "decoded_frames": 10, "stages": {"open": 0.5, "decode": 1.0}},
+            {"sampled": True, "decoded_frames": 5, "stages": {"decode": 2.0}},
+        ])
+
+        assert merged == {"sampled": True, "decoded_frames": 15, "stages": {"open": 0.5, "decode": 3.0}}
+
+    @pytest.mark.asyncio
+    async def test_executor_records_metrics(self, video_factory):
+        """Тест: пул записывает стадии анализа и счётчики кадров в метрики по детектору"""
+        video_path = video_factory(0.3)
+        executor = AnalysisExecutor(max_workers=1, queue_size=0, analyzer_params={"analysis_width": 320})
+        before = {stage: stage_count(stage, "frame_diff") for stage in (Stage.QUEUE, Stage.OPEN, Stage.DECODE)}
+        decoded_before = REGISTRY.get_sample_value("frames_decoded_total", {"detector": "frame_diff"}) or 0.0
+
+        executor.start()
+        try:
+            plain = await executor.analyze(video_path)
+            timed = await executor.analyze(video_path, timed=True)
+        finally:
+            await executor.shutdown(timeout=10)
+
+        assert plain["timings"]["sampled"] is False
+        assert timed["timings"]["sampled"] is True
+        assert stage_count(Stage.QUEUE, "frame_diff") == before[Stage.QUEUE] + 2
+        assert stage_count(Stage.OPEN, "frame_diff") == before[Stage.OPEN] + 2
+        assert stage_count(Stage.DECODE, "frame_diff") == before[Stage.DECODE] + 1
+        assert REGISTRY.get_sample_value("frames_decoded_total", {"detector": "frame_diff"}) == decoded_before + 120
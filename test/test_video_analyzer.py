@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.opencv_cam.motion import MotionMetric
+from app.opencv_cam.sampling import FrameSampler
+from app.opencv_cam.timeline import unpack_timeline
+from app.opencv_cam.video_analizer_controller import VideoAnalyzer
+
+
+class TestVideoAnalyzer:
+    """Тесты анализатора движения"""
+
+    @pytest.mark.parametrize("motion_density", [0.0, 0.05, 0.3, 1.0])
+    @pytest.mark.parametrize("analysis_width", [640, 320])
+    def test_downscaled_matches_native(self, video_factory, motion_density, analysis_width):
+        """Тест: решение о движении при уменьшенном разрешении совпадает с исходным"""
+        video_path = video_factory(motion_density)
+
+        native = VideoAnalyzer()._detect_movement(video_path)
+        downscaled = VideoAnalyzer(analysis_width=analysis_width)._detect_movement(video_path)
+
+        assert downscaled["has_movement"] == native["has_movement"]
+        assert downscaled["movement_percentage"] == pytest.approx(native["movement_percentage"], abs=10.0)
+        assert downscaled["duration"] == native["duration"]
+
+    def test_downscaled_matches_native_with_noise(self, video_factory):
+        """Тест: на шумном ролике без движения уменьшение разрешения не даёт ложных срабатываний"""
+        video_path = video_factory(0.0, noise=20)
+
+        native = VideoAnalyzer()._detect_movement(video_path)
+        downscaled = VideoAnalyzer(analysis_width=640)._detect_movement(video_path)
+
+        assert downscaled["has_movement"] == native["has_movement"] is False
+
+    def test_analysis_geometry_scales_parameters(self):
+        """Тест пересчёта ядра размытия и площади контура под масштаб"""
+        analyzer = VideoAnalyzer(min_contour_area=500, analysis_width=960)
+
+        detector = analyzer.new_detector(3840)
+
+        assert detector.scale == 0.25
+        assert detector.blur_size % 2 == 1 and detector.blur_size == 5
+        assert detector.dilate_iterations == 1
+        assert detector.min_area == pytest.approx(500 / 16)
+        native = analyzer.new_detector(640)
+        assert (native.scale, native.blur_size, native.dilate_iterations, native.min_area) == (1.0, 21, 2, 500)
+
+    @pytest.mark.parametrize("motion_density, bound", [(1.0, "lower"), (0.0, "upper")])
+    def test_decision_only_exits_early(self, video_factory, motion_density, bound):
+        """Тест: decision_only даёт тот же вердикт, останавливаясь раньше, и возвращает границу доли"""
+        video_path = video_factory(motion_density)
+        analyzer = VideoAnalyzer(analysis_width=320)
+
+        full = analyzer._detect_movement(video_path)
+        decoded = []
+        iter_frames = analyzer.sampler.iter_frames
+
+        def counting_iter_frames(cap, indices, timer=None):
+            for index, frame in iter_frames(cap, indices, timer):
+                decoded.append(index)
+                yield index, frame
+
+        with patch.object(analyzer.sampler, "iter_frames", side_effect=counting_iter_frames):
+            decided = analyzer._detect_movement(video_path, decision_only=True)
+
+        assert decided["has_movement"] == full["has_movement"]
+        assert decided["percentage_bound"] == bound
+        assert full["percentage_bound"] is None
+        assert len(decoded) < 12
+        if bound == "lower":
+            assert decided["movement_percentage"] <= full["movement_percentage"]
+            assert len(decoded) == 3
+        else:
+            assert decided["movement_percentage"] >= full["movement_percentage"]
+
+    def test_timeline_per_sampled_frame(self, video_factory):
+        """Тест: шкала движения содержит точку на каждый проанализированный кадр"""
+        video_path = video_factory(0.3)
+
+        result = VideoAnalyzer(analysis_width=320).analyze_path(video_path)
+        points = unpack_timeline(result["timeline"])
+
+        assert len(points) == result["analyzed_frames"] == 12
+        assert (result["width"], result["height"], result["fps"], result["total_frames"]) == (1280, 720, 10.0, 60)
+        assert (points["t"][1:] > points["t"][:-1]).all()
+        assert (points["changed_ratio"] >= 0).all() and (points["changed_ratio"] <= 1).all()
+        moving = (points["largest_area"] > 500).sum()
+        assert moving / len(points) * 100 == pytest.approx(result["movement_percentage"], abs=10.0)
+
+    @pytest.mark.parametrize("metric", [MotionMetric.COMPONENTS, MotionMetric.BLOCKS])
+    @pytest.mark.parametrize("motion_density", [0.0, 0.05, 0.3, 1.0])
+    def test_motion_metrics_agree(self, video_factory, metric, motion_density):
+        """Тест: метрики площади в пикселях дают тот же вердикт, что и контуры"""
+        video_path = video_factory(motion_density)
+
+        contours = VideoAnalyzer(analysis_width=640)._detect_movement(video_path)
+        result = VideoAnalyzer(analysis_width=640, motion_metric=metric)._detect_movement(video_path)
+
+        assert result["has_movement"] == contours["has_movement"]
+        assert result["movement_percentage"] == pytest.approx(contours["movement_percentage"], abs=10.0)
+        assert VideoAnalyzer(motion_metric=metric).fingerprint != VideoAnalyzer().fingerprint
+
+    @pytest.mark.parametrize("seek_threshold", [0, 120])
+    @pytest.mark.parametrize("segments", [2, 5])
+    @pytest.mark.parametrize("motion_density", [0.05, 0.3, 1.0])
+    def test_segments_match_sequential(self, video_factory, motion_density, segments, seek_threshold):
+        """Тест: анализ по отрезкам с опорным кадром на границе совпадает с последовательным"""
+        video_path = video_factory(motion_density)
+        analyzer = VideoAnalyzer(analysis_width=320, sampler=FrameSampler(seek_threshold=seek_threshold))
+
+        sequential = analyzer.analyze_path(video_path)
+        plan = analyzer.plan_segments(video_path, max_segments=segments, min_segment_frames=2)
+        parts = [analyzer.analyze_segment(video_path, plan, segment) for segment in plan["segments"]]
+        merged = VideoAnalyzer.merge_segments(plan, parts, processing_time=0.0)
+
+        assert len(plan["segments"]) == segments
+        assert [segment["reference"] for segment in plan["segments"]][0] is None
+        for key in ("has_movement", "movement_percentage", "duration", "analyzed_frames", "fps", "total_frames"):
+            assert merged[key] == sequential[key]
+        assert merged["timeline"] == sequential["timeline"]
+
+    def test_segment_count_adapts_to_length(self, video_factory):
+        """Тест: короткое видео не делится, число отрезков ограничено сверху"""
+        video_path = video_factory(0.3)
+        analyzer = VideoAnalyzer()
+
+        assert len(analyzer.plan_segments(video_path, max_segments=8, min_segment_frames=300)["segments"]) == 1
+        assert len(analyzer.plan_segments(video_path, max_segments=8, min_segment_frames=5)["segments"]) == 2
+        assert len(analyzer.plan_segments(video_path, max_segments=3, min_segment_frames=1)["segments"]) == 3
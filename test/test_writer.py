@@ -0,0 +1,84 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.opencv_cam.dao import VideoAnalysisDAO
+from app.opencv_cam.writer import _STOP, AnalysisWriter
+from test.conftest import TestingSessionLocal
+from test.test_dao import make_analysis
+
+
+class TestAnalysisWriter:
+    """Тесты отложенной пакетной записи результатов"""
+
+    @pytest.mark.asyncio
+    async def test_batches_by_size(self):
+        """Тест: записи вставляются пачками по batch_size, каждый получает id своей записи"""
+        writer = AnalysisWriter(TestingSessionLocal, batch_size=3, flush_interval=0.5)
+        writer.start()
+        insert = VideoAnalysisDAO.insert_returning_ids
+        with patch.object(VideoAnalysisDAO, "insert_returning_ids", side_effect=insert) as spy:
+            try:
+                ids = await asyncio.gather(*[writer.add(make_analysis(filename=f"{i}.mp4")) for i in range(7)])
+            finally:
+                await writer.shutdown(timeout=5)
+
+        assert [len(call.args[1]) for call in spy.call_args_list] == [3, 3, 1]
+        async with TestingSessionLocal.create_session() as session:
+            for i, row_id in enumerate(ids):
+                record = await VideoAnalysisDAO.find_one_or_none_by_id(row_id, session)
+                assert record.filename == f"{i}.mp4"
+
+    @pytest.mark.asyncio
+    async def test_shutdown_drains_queue(self):
+        """Тест: остановка дописывает всё, что уже в очереди"""
+        writer = AnalysisWriter(TestingSessionLocal, batch_size=100, flush_interval=10)
+        writer.start()
+        pending = [asyncio.create_task(writer.add(make_analysis())) for _ in range(5)]
+        await asyncio.sleep(0)
+
+        await writer.shutdown(timeout=5)
+
+        assert all(task.done() for task in pending)
+        assert len({task.result() for task in pending}) == 5
+        with pytest.raises(RuntimeError):
+            await writer.add(make_analysis())
+
+    @pytest.mark.asyncio
+    async def test_shutdown_waits_for_blocked_adds(self):
+        """Тест: записи, ждавшие места в заполненной очереди, записываются и после маркера остановки"""
+        writer = AnalysisWriter(TestingSessionLocal, batch_size=1, flush_interval=10, max_queue=1)
+        insert = VideoAnalysisDAO.insert_returning_ids
+
+        async def stop_during_flush(session, records):
+            # Запись только что взята из очереди, разбуженный add() ещё не успел встать:
+            # маркер остановки занимает освободившееся место раньше него
+            if not writer._closing:
+                writer._closing = True
+                writer._queue.put_nowait(_STOP)
+            return await insert(session, records)
+
+        writer.start()
+        with patch.object(VideoAnalysisDAO, "insert_returning_ids", side_effect=stop_during_flush):
+            pending = [asyncio.create_task(writer.add(make_analysis())) for _ in range(3)]
+            results = await asyncio.wait_for(asyncio.gather(*pending), timeout=5)
+            await writer.shutdown(timeout=5)
+
+        assert len(set(results)) == 3
+
+    @pytest.mark.asyncio
+    async def test_flush_error_fails_batch(self):
+        """Тест: ошибка вставки передаётся всем ожидающим записям пачки, запись продолжает работать"""
+        writer = AnalysisWriter(TestingSessionLocal, batch_size=2, flush_interval=0.01)
+        writer.start()
+        try:
+            with patch.object(VideoAnalysisDAO, "insert_returning_ids", side_effect=RuntimeError("db down")):
+                results = await asyncio.gather(writer.add(make_analysis()), writer.add(make_analysis()),
+                                               return_exceptions=True)
+            row_id = await writer.add(make_analysis())
+        finally:
+            await writer.shutdown(timeout=5)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert isinstance(row_id, int)